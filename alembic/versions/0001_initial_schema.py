@@ -0,0 +1,47 @@
+"""Initial schema (documents table as created by init_db)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "documents",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("document_type", sa.Enum("PDF", "URL", "TEXT", name="documenttypeenum"), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", name="documentstatusenum"),
+            nullable=False
+        ),
+        sa.Column("filename", sa.String(length=255), nullable=True),
+        sa.Column("url", sa.Text(), nullable=True),
+        sa.Column("title", sa.String(length=500), nullable=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("word_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.Column("extra_metadata", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_documents_type", "documents", ["document_type"])
+    op.create_index("idx_documents_status", "documents", ["status"])
+    op.create_index("idx_documents_created_at", "documents", ["created_at"])
+    op.create_index("idx_documents_type_status", "documents", ["document_type", "status"])
+
+
+def downgrade() -> None:
+    op.drop_table("documents")
+    sa.Enum(name="documentstatusenum").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="documenttypeenum").drop(op.get_bind(), checkfirst=True)
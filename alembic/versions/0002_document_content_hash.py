@@ -0,0 +1,24 @@
+"""Add documents.content_hash for deduplication
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index("idx_documents_content_hash", "documents", ["content_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_documents_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
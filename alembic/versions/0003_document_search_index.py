@@ -0,0 +1,70 @@
+"""Full-text search index on documents (tsvector + GIN, FTS5 on SQLite)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRES_UPGRADE = [
+    """
+    ALTER TABLE documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', left(coalesce(content, ''), 1000000)), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX idx_documents_search_vector ON documents USING GIN (search_vector)",
+]
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE documents_fts USING fts5(
+        title, content, content='documents', content_rowid='rowid', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER documents_fts_update AFTER UPDATE OF title, content ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+        INSERT INTO documents_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+    # Index the rows that already exist
+    "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    # The generated column backfills existing rows while the table is rewritten
+    statements = {"postgresql": POSTGRES_UPGRADE, "sqlite": SQLITE_UPGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS idx_documents_search_vector")
+        op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("documents_fts_insert", "documents_fts_delete", "documents_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS documents_fts")
@@ -0,0 +1,127 @@
+"""Move document bodies to the blob store: content_ref, content_preview, app-maintained search index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+The search index can no longer be derived from documents.content (it is NULL
+for offloaded bodies), so the generated tsvector column / external-content
+FTS5 table are replaced by ones that app.db.crud fills on insert. Existing
+rows keep their inline content and are indexed from it here; move them to
+the blob store later with ``crud.offload_inline_content``.
+
+Downgrading requires every body to be inline again.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREVIEW_BACKFILL = """
+    UPDATE documents SET content_preview = CASE
+        WHEN length(content) > 200 THEN substr(content, 1, 200) || '...'
+        ELSE content
+    END
+    WHERE content_preview IS NULL
+"""
+
+POSTGRES_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', left(coalesce(content, ''), 1000000)), 'B')
+"""
+
+POSTGRES_UPGRADE = [
+    "DROP INDEX IF EXISTS idx_documents_search_vector",
+    "ALTER TABLE documents DROP COLUMN IF EXISTS search_vector",
+    "ALTER TABLE documents ADD COLUMN search_vector tsvector",
+    f"UPDATE documents SET search_vector = {POSTGRES_SEARCH_VECTOR}",
+    "CREATE INDEX idx_documents_search_vector ON documents USING GIN (search_vector)",
+]
+
+SQLITE_DROP_OLD = [
+    "DROP TRIGGER IF EXISTS documents_fts_insert",
+    "DROP TRIGGER IF EXISTS documents_fts_delete",
+    "DROP TRIGGER IF EXISTS documents_fts_update",
+    "DROP TABLE IF EXISTS documents_fts",
+]
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE documents_fts USING fts5(title, content, tokenize='porter unicode61')",
+    """
+    CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    INSERT INTO documents_fts(rowid, title, content)
+    SELECT rowid, coalesce(title, ''), coalesce(content, '') FROM documents
+    """,
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # The batch rebuild below renumbers rowids, which the FTS table is keyed by
+        for statement in SQLITE_DROP_OLD:
+            op.execute(statement)
+
+    with op.batch_alter_table("documents") as batch:
+        batch.add_column(sa.Column("content_ref", sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column("content_preview", sa.Text(), nullable=True))
+        batch.alter_column("content", existing_type=sa.Text(), nullable=True)
+        batch.create_index("idx_documents_content_ref", ["content_ref"])
+    op.execute(PREVIEW_BACKFILL)
+
+    statements = {"postgresql": POSTGRES_UPGRADE, "sqlite": SQLITE_UPGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS idx_documents_search_vector")
+        op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for statement in SQLITE_DROP_OLD:
+            op.execute(statement)
+
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_index("idx_documents_content_ref")
+        batch.alter_column("content", existing_type=sa.Text(), nullable=False)
+        batch.drop_column("content_preview")
+        batch.drop_column("content_ref")
+
+    # Recreate the index of revision 0003
+    if dialect == "postgresql":
+        op.execute(f"ALTER TABLE documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({POSTGRES_SEARCH_VECTOR}) STORED")
+        op.execute("CREATE INDEX idx_documents_search_vector ON documents USING GIN (search_vector)")
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE documents_fts USING fts5("
+            "title, content, content='documents', content_rowid='rowid', tokenize='porter unicode61')"
+        )
+        op.execute("""
+            CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content)
+                VALUES ('delete', old.rowid, old.title, old.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER documents_fts_update AFTER UPDATE OF title, content ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content)
+                VALUES ('delete', old.rowid, old.title, old.content);
+                INSERT INTO documents_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content);
+            END
+        """)
+        op.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
@@ -1,9 +1,11 @@
 # FastAPI imports
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
-from typing import Optional
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.db import crud
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db, SessionLocal, AsyncSessionLocal
+from app.db import crud, async_crud, transfer
 from app.db.models import DocumentTypeEnum
 from app.rag.pipeline import get_pipeline
 
@@ -12,10 +14,18 @@ from app.api.v1.schemas import (
     DocumentIngestResponse,
     URLIngestRequest,
     TextIngestRequest,
+    BatchTextIngestRequest,
+    BatchIngestItem,
+    BatchIngestResponse,
+    ImportResponse,
+    CrawlRequest,
+    CrawlStatusResponse,
     DocumentListResponse,
     DocumentMetadata,
     DocumentDetail,
     DocumentDeleteResponse,
+    BatchDeleteRequest,
+    BatchDeleteResponse,
     DocumentType,
     DocumentStatus
 )
@@ -25,9 +35,12 @@ from app.core.utils import (
     save_uploaded_file,
     calculate_word_count,
     get_content_preview,
-    generate_document_id
+    generate_document_id,
+    calculate_content_hash,
+    calculate_file_hash
 )
 from app.core.config import settings
+from app.core.cache import get_processed_cache, make_cache_key
 from app.core.exceptions import (
     DocumentNotFoundError,
     UnsupportedFileTypeError,
@@ -36,32 +49,126 @@ from app.core.exceptions import (
 )
 
 # Ingestion modules
-from app.ingestion.pdf_parser import parse_pdf
-from app.ingestion.web_scraper import scrape_url
-from app.ingestion.cleaner import clean_text  
+from app.ingestion.pdf_parser import parse_pdf, PARSER_VERSION
+from app.ingestion.web_scraper import get_async_scraper
+from app.ingestion.cleaner import clean_text, CLEANER_VERSION
+from app.ingestion.crawler import SiteCrawler, new_crawl_id, load_crawl_progress
 
 # Standard library
+import asyncio
 import os
 from datetime import datetime
+import logging
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/documents", tags=["ingestion"])
 
+CONTENT_PREVIEW_LENGTH = 200
+CONTENT_STREAM_CHUNK_SIZE = 256 * 1024  # Characters read from the database per streamed chunk
+
+# Crawls running in this process, by crawl ID
+_crawls: Dict[str, SiteCrawler] = {}
+
+
+async def _duplicate_response(db: AsyncSession, document) -> DocumentIngestResponse:
+    """Build the ingest response for a document that was already ingested."""
+    preview = document.content_preview
+    if preview is None:
+        # Older rows without a stored preview: read only the characters it needs
+        preview_source = await async_crud.get_content_slice(db, document.id, 0, CONTENT_PREVIEW_LENGTH + 1)
+        preview = get_content_preview(preview_source, CONTENT_PREVIEW_LENGTH)
+    return DocumentIngestResponse(
+        document_id=str(document.id),
+        document_type=DocumentType(document.document_type),
+        status=DocumentStatus(document.status),
+        filename=document.filename,
+        url=document.url,
+        content_preview=preview,
+        word_count=document.word_count,
+        created_at=document.created_at,
+        duplicate=True,
+        message="Identical document already ingested; returning existing document."
+    )
+
+
+def _clean_cached(text: str, source_key: str) -> str:
+    """Clean text parsed from ``source_key``, reusing a cached result for the same cleaner version.
+
+    Only worth it when the key is already known (the PDF parse key): hashing
+    the raw text to build one costs about as much as cleaning it.
+    """
+    cache_key = make_cache_key("clean", source_key, CLEANER_VERSION)
+    return get_processed_cache().get_or_set(cache_key, lambda: clean_text(text))
+
+
+def _is_indexed(document) -> bool:
+    """Only COMPLETED documents are duplicates; others (failed or interrupted indexing) are indexed again."""
+    return DocumentStatus(document.status) == DocumentStatus.COMPLETED
+
+
+async def _create_or_get_document(db: AsyncSession, document_data: dict):
+    """Create a document, falling back to the existing row if its content hash is taken.
+
+    Returns a ``(document, created)`` tuple.
+    """
+    try:
+        return await async_crud.create_document(db, document_data), True
+    except IntegrityError:
+        # Another request stored the same content between our lookup and insert
+        await db.rollback()
+        existing = await async_crud.get_document_by_hash(db, document_data["content_hash"])
+        if existing is None:
+            raise
+        return existing, False
+
+
+async def _index_and_mark(db: AsyncSession, document_id, content: str, metadata: dict) -> dict:
+    """Index a stored document, then mark it COMPLETED or FAILED. Returns the index result."""
+    index_result = await asyncio.to_thread(
+        get_pipeline().index_document, content=content, document_id=str(document_id), metadata=metadata
+    )
+    if index_result["success"]:
+        await async_crud.set_document_status(db, [document_id], DocumentStatus.COMPLETED)
+    else:
+        logger.error(f"Indexing document {document_id} failed: {index_result.get('error')}")
+        await async_crud.set_document_status(db, [document_id], DocumentStatus.FAILED)
+    return index_result
+
+
+def _ingest_message(index_result: dict, ingested: str) -> str:
+    if index_result["success"]:
+        return ingested
+    return f"Document stored but indexing failed ({index_result.get('error')}); upload it again to retry."
+
+
 @router.post("/upload", response_model=DocumentIngestResponse)
-async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_pdf(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
     """Endpoint to upload and ingest a PDF document."""
     file_path = None
     try:
         # Save uploaded file to raw data directory
         file_path = await save_uploaded_file(file, settings.RAW_DATA_DIR)
 
-        # Parse PDF to extract text
-        text = parse_pdf(file_path)
+        # Short-circuit re-uploads of an identical file
+        content_hash = await asyncio.to_thread(calculate_file_hash, file_path)
+        existing = await async_crud.get_document_by_hash(db, content_hash)
+        if existing and _is_indexed(existing):
+            os.remove(file_path)
+            return await _duplicate_response(db, existing)
+
+        # Parse PDF to extract text (cached by file hash and parser version)
+        source_key = make_cache_key(content_hash, PARSER_VERSION)
+        text = await asyncio.to_thread(
+            get_processed_cache().get_or_set,
+            make_cache_key("pdf", source_key),
+            lambda: parse_pdf(file_path)
+        )
 
         if not text or not text.strip():
             raise DocumentProcessingError("No text extracted from PDF.")
 
-        text = clean_text(text)
+        text = await asyncio.to_thread(_clean_cached, text, source_key)
 
         # Generate document metadata
         word_count = calculate_word_count(text)
@@ -69,24 +176,28 @@ async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)
 
         document_data = {
             "document_type": DocumentType.PDF,
-            "status": DocumentStatus.COMPLETED,  
+            "status": DocumentStatus.PROCESSING,
             "filename": file.filename,
             "url": None,
             "title": os.path.splitext(file.filename)[0],
             "content": text,
+            "content_hash": content_hash,
             "word_count": word_count,
             "extra_metadata": {}
         }
 
         # Store document in the document store (returns document_id)
-        db_document = crud.create_document(db, document_data)
+        db_document = existing
+        if db_document is None:
+            db_document, created = await _create_or_get_document(db, document_data)
+            if not created and _is_indexed(db_document):
+                os.remove(file_path)
+                return await _duplicate_response(db, db_document)
 
         # Index in RAG
-        pipeline = get_pipeline()
-        index_result = pipeline.index_document(
-            content=text,
-            document_id=str(db_document.id),
-            metadata={"filename": file.filename, "title": document_data["title"], "document_type": "pdf"}
+        index_result = await _index_and_mark(
+            db, db_document.id, text,
+            {"filename": file.filename, "title": document_data["title"], "document_type": "pdf"}
         )
         if index_result["success"]:
             print(f"PDF indexed: {index_result.get('total_chunks', 0)} chunks")
@@ -94,12 +205,12 @@ async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)
         return DocumentIngestResponse(
             document_id=str(db_document.id),
             document_type=DocumentType.PDF,
-            status=DocumentStatus.COMPLETED,
+            status=DocumentStatus.COMPLETED if index_result["success"] else DocumentStatus.FAILED,
             filename=file.filename,
             url=None,
             content_preview=content_preview,
             word_count=word_count,
-            message="PDF document ingested successfully."
+            message=_ingest_message(index_result, "PDF document ingested successfully.")
         )
     
     except (UnsupportedFileTypeError, FileTooLargeError, DocumentProcessingError) as e:
@@ -118,12 +229,18 @@ async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)
 @router.post("/url", response_model=DocumentIngestResponse)
 async def ingest_url(
     request: URLIngestRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Endpoint to ingest a document from a URL."""
     try:
-        # Scrape the URL to extract content
-        result = scrape_url(str(request.url))  # Convert HttpUrl to string
+        # Scrape the URL to extract content (revalidated with ETag/Last-Modified)
+        result = await get_async_scraper().scrape(str(request.url))  # Convert HttpUrl to string
+
+        # Unchanged page: skip re-cleaning and re-embedding, unless it was never indexed
+        if result.get("not_modified"):
+            existing = await async_crud.get_document_by_url(db, str(request.url))
+            if existing and _is_indexed(existing):
+                return await _duplicate_response(db, existing)
 
         content = result.get("content", "")
         title = result.get("title", "Untitled")
@@ -131,7 +248,12 @@ async def ingest_url(
         if not content or not content.strip():
             raise DocumentProcessingError("No content extracted from URL.")
 
-        content = clean_text(content)
+        content = await asyncio.to_thread(clean_text, content)
+
+        content_hash = calculate_content_hash(content)
+        existing = await async_crud.get_document_by_hash(db, content_hash)
+        if existing and _is_indexed(existing):
+            return await _duplicate_response(db, existing)
 
         # Generate document extra_metadata
         word_count = calculate_word_count(content)
@@ -139,24 +261,27 @@ async def ingest_url(
 
         document_data = {
             "document_type": DocumentType.URL,
-            "status": DocumentStatus.COMPLETED,
+            "status": DocumentStatus.PROCESSING,
             "filename": None,
             "url": str(request.url),  # Convert to string
             "title": title,
             "content": content,
+            "content_hash": content_hash,
             "word_count": word_count,
             "extra_metadata": request.metadata or {}  # Include user-provided extra_metadata
         }
 
         # Store document in the document store (returns document_id)
-        db_document = crud.create_document(db, document_data)
+        db_document = existing
+        if db_document is None:
+            db_document, created = await _create_or_get_document(db, document_data)
+            if not created and _is_indexed(db_document):
+                return await _duplicate_response(db, db_document)
 
         # Index in RAG
-        pipeline = get_pipeline()
-        index_result = pipeline.index_document(
-            content=content,
-            document_id=str(db_document.id),
-            metadata={"url": str(request.url), "title": title}
+        index_result = await _index_and_mark(
+            db, db_document.id, content,
+            {"url": str(request.url), "title": title, "document_type": "url"}
         )
         if index_result["success"]:
             print(f"Indexed {index_result['total_chunks']} chunks")
@@ -164,12 +289,12 @@ async def ingest_url(
         return DocumentIngestResponse(
             document_id=str(db_document.id),
             document_type=DocumentType.URL,
-            status=DocumentStatus.COMPLETED,
+            status=DocumentStatus.COMPLETED if index_result["success"] else DocumentStatus.FAILED,
             filename=None,
             url=str(request.url),  # Convert to string
             content_preview=content_preview,
             word_count=word_count,
-            message="URL document ingested successfully."
+            message=_ingest_message(index_result, "URL document ingested successfully.")
         )
     
     except DocumentProcessingError as e:
@@ -182,7 +307,7 @@ async def ingest_url(
 @router.post("/text", response_model=DocumentIngestResponse)
 async def ingest_text(
     request: TextIngestRequest,
-    db: Session = Depends(get_db)  
+    db: AsyncSession = Depends(get_async_db)  
 ):
     """Endpoint to ingest text directly."""
     try:
@@ -190,30 +315,38 @@ async def ingest_text(
         if not request.content or not request.content.strip():
             raise DocumentProcessingError("Text content is empty")
         
-        request.content = clean_text(request.content)
+        request.content = await asyncio.to_thread(clean_text, request.content)
+
+        content_hash = calculate_content_hash(request.content)
+        existing = await async_crud.get_document_by_hash(db, content_hash)
+        if existing and _is_indexed(existing):
+            return await _duplicate_response(db, existing)
+
         # Generate document extra_metadata
         word_count = calculate_word_count(request.content)
         content_preview = get_content_preview(request.content)
         document_data = {
             "document_type": DocumentType.TEXT,
-            "status": DocumentStatus.COMPLETED,
+            "status": DocumentStatus.PROCESSING,
             "filename": None,
             "url": None,
             "title": request.title,
             "content": request.content,
+            "content_hash": content_hash,
             "word_count": word_count,
             "extra_metadata": request.metadata or {}
         }
         # Store document in PostgreSQL database
-        db_document = crud.create_document(db, document_data)
-
+        db_document = existing
+        if db_document is None:
+            db_document, created = await _create_or_get_document(db, document_data)
+            if not created and _is_indexed(db_document):
+                return await _duplicate_response(db, db_document)
 
         # Index in RAG
-        pipeline = get_pipeline()
-        index_result = pipeline.index_document(
-            content=request.content,
-            document_id=str(db_document.id),
-            metadata={"title": request.title}
+        index_result = await _index_and_mark(
+            db, db_document.id, request.content,
+            {"title": request.title, "document_type": "text"}
         )
         if index_result["success"]:
             print(f"Indexed {index_result['total_chunks']} chunks")
@@ -221,39 +354,345 @@ async def ingest_text(
         return DocumentIngestResponse(
             document_id=str(db_document.id),
             document_type=DocumentType.TEXT,
-            status=DocumentStatus.COMPLETED,
+            status=DocumentStatus.COMPLETED if index_result["success"] else DocumentStatus.FAILED,
             filename=None,
             url=None,
             content_preview=content_preview,
             word_count=word_count,
-            message="Text document ingested successfully."
+            message=_ingest_message(index_result, "Text document ingested successfully.")
         )
     except DocumentProcessingError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+def _text_document_data(request: TextIngestRequest) -> Optional[dict]:
+    """Clean a text ingest request into document column values; None if nothing is left."""
+    content = clean_text(request.content) if request.content.strip() else ""
+    if not content:
+        return None
+    return {
+        "document_type": DocumentType.TEXT,
+        "status": DocumentStatus.PROCESSING,
+        "filename": None,
+        "url": None,
+        "title": request.title,
+        "content": content,
+        "content_hash": calculate_content_hash(content),
+        "word_count": calculate_word_count(content),
+        "extra_metadata": request.metadata or {}
+    }
+
+
+@router.post("/batch", response_model=BatchIngestResponse)
+async def ingest_text_batch(
+    request: BatchTextIngestRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ingest many text documents with one bulk insert and one indexing pass."""
+    try:
+        documents_data = await asyncio.to_thread(
+            lambda: [_text_document_data(document) for document in request.documents]
+        )
+        valid = [data for data in documents_data if data is not None]
+
+        # One transaction; rows whose content hash already exists are skipped,
+        # unless the existing row was never indexed: it is indexed again
+        created = await async_crud.create_documents_bulk(db, valid)
+        unindexed = await async_crud.get_document_ids_by_hashes(
+            db,
+            [data["content_hash"] for data, document_id in zip(valid, created) if document_id is None],
+            incomplete_only=True
+        )
+        created_ids = iter(created)
+        duplicate_hashes = []
+        items, to_index = [], []
+        for document, data in zip(request.documents, documents_data):
+            if data is None:
+                items.append(BatchIngestItem(title=document.title, error="Text content is empty"))
+                continue
+            document_id = next(created_ids) or unindexed.pop(data["content_hash"], None)
+            if document_id is None:
+                duplicate_hashes.append(data["content_hash"])
+                items.append(BatchIngestItem(title=data["title"], duplicate=True))
+                continue
+            items.append(BatchIngestItem(document_id=str(document_id), title=data["title"]))
+            to_index.append({
+                "content": data["content"],
+                "document_id": str(document_id),
+                "metadata": {"title": data["title"], "document_type": "text"}
+            })
+
+        # Point duplicates at the documents that already hold their content
+        existing = await async_crud.get_document_ids_by_hashes(db, duplicate_hashes)
+        duplicate_ids = iter(existing.get(content_hash) for content_hash in duplicate_hashes)
+        for item in items:
+            if item.duplicate:
+                document_id = next(duplicate_ids)
+                item.document_id = str(document_id) if document_id else None
+
+        # Index in RAG
+        index_results = await asyncio.to_thread(get_pipeline().index_batch, to_index) if to_index else []
+        chunks_indexed = sum(result.get("total_chunks", 0) for result in index_results if result.get("success"))
+        indexed, failed = [], []
+        items_by_id = {item.document_id: item for item in items if item.document_id and not item.duplicate}
+        for document, result in zip(to_index, index_results):
+            if result.get("success"):
+                indexed.append(document["document_id"])
+            else:
+                failed.append(document["document_id"])
+                items_by_id[document["document_id"]].error = f"Indexing failed: {result.get('error')}"
+        await async_crud.set_document_status(db, indexed, DocumentStatus.COMPLETED)
+        await async_crud.set_document_status(db, failed, DocumentStatus.FAILED)
+        print(f"Batch ingested {len(indexed)} documents, {chunks_indexed} chunks")
+
+        return BatchIngestResponse(
+            created=len(indexed),
+            duplicates=len(duplicate_hashes),
+            failed=sum(1 for item in items if item.error),
+            chunks_indexed=chunks_indexed,
+            documents=items
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
     
 
+def _crawl_checkpoint_path(crawl_id: str) -> str:
+    return os.path.join(settings.CACHE_DIR, "crawls", f"{crawl_id}.json")
+
+
+def _ingest_crawled_pages(pages: List[dict], metadata: Optional[dict] = None) -> dict:
+    """
+    Store and index a batch of crawled pages. Runs in a worker thread.
+
+    Rows are stored as PROCESSING and only marked COMPLETED once indexed; a
+    page whose content is already stored but not indexed (an earlier attempt
+    failed) is indexed again. URLs that could not be indexed are returned in
+    ``failed`` so the crawler retries them on resume.
+    """
+    db = SessionLocal()
+    try:
+        documents_data = []
+        duplicates = 0
+        for page in pages:
+            # Unchanged since the last crawl and indexed then: nothing to re-clean or re-embed
+            if page.get("not_modified"):
+                existing = crud.get_document_by_url(db, page["url"])
+                if existing and _is_indexed(existing):
+                    duplicates += 1
+                    continue
+
+            content = clean_text(page.get("content", ""))
+            if not content:
+                continue
+
+            documents_data.append({
+                "document_type": DocumentType.URL,
+                "status": DocumentStatus.PROCESSING,
+                "filename": None,
+                "url": page["url"],
+                "title": page.get("title", "Untitled"),
+                "content": content,
+                "content_hash": calculate_content_hash(content),
+                "word_count": calculate_word_count(content),
+                "extra_metadata": metadata or {}
+            })
+
+        # One transaction for the batch; already-ingested content is skipped
+        created = crud.create_documents_bulk(db, documents_data)
+        unindexed = crud.get_document_ids_by_hashes(
+            db,
+            [data["content_hash"] for data, document_id in zip(documents_data, created) if document_id is None],
+            incomplete_only=True
+        )
+        documents = []
+        for data, document_id in zip(documents_data, created):
+            document_id = document_id or unindexed.pop(data["content_hash"], None)
+            if document_id is None:
+                duplicates += 1
+                continue
+            documents.append({
+                "content": data["content"],
+                "document_id": str(document_id),
+                "metadata": {"url": data["url"], "title": data["title"], "document_type": "url"},
+                "url": data["url"]
+            })
+
+        results = get_pipeline().index_batch(documents) if documents else []
+        indexed, failed = [], {}
+        for doc, result in zip(documents, results):
+            if result.get("success"):
+                indexed.append(doc["document_id"])
+            else:
+                failed[doc["document_id"]] = (doc["url"], result.get("error", "indexing failed"))
+        crud.set_document_status(db, indexed, DocumentStatus.COMPLETED)
+        crud.set_document_status(db, list(failed), DocumentStatus.FAILED)
+
+        return {"created": len(indexed), "duplicates": duplicates, "failed": dict(failed.values())}
+    finally:
+        db.close()
+
+
+async def _run_crawl(crawler: SiteCrawler, urls: List[str], sitemap_url: Optional[str]) -> None:
+    try:
+        await crawler.crawl(urls=urls, sitemap_url=sitemap_url)
+    except Exception as e:
+        logger.error(f"Crawl {crawler.state['crawl_id']} failed: {e}")
+    finally:
+        _crawls.pop(crawler.state["crawl_id"], None)
+
+
+def _build_crawler(crawl_id: str, request: Optional[CrawlRequest] = None) -> SiteCrawler:
+    """Create a crawler for a new request, or from its checkpoint when resuming."""
+    async def on_batch(pages: List[dict]) -> dict:
+        return await asyncio.to_thread(_ingest_crawled_pages, pages, crawler.state.get("metadata"))
+
+    crawler = SiteCrawler(
+        scraper=get_async_scraper(),
+        on_batch=on_batch,
+        checkpoint_path=_crawl_checkpoint_path(crawl_id),
+        max_depth=request.max_depth if request else 0,
+        max_pages=min(request.max_pages, settings.CRAWL_MAX_PAGES) if request else settings.CRAWL_MAX_PAGES,
+        allowed_domains=request.allowed_domains if request else None,
+        concurrency=settings.CRAWL_CONCURRENCY,
+        delay=settings.CRAWL_DELAY,
+        batch_size=settings.CRAWL_BATCH_SIZE,
+        respect_robots=settings.CRAWL_RESPECT_ROBOTS
+    )
+    if request is not None:
+        crawler.state["metadata"] = request.metadata
+    return crawler
+
+
+@router.post("/crawl", response_model=CrawlStatusResponse, status_code=202)
+async def start_crawl(request: CrawlRequest, background_tasks: BackgroundTasks):
+    """Start a background crawl of a URL list and/or sitemap."""
+    crawl_id = new_crawl_id()
+    crawler = _build_crawler(crawl_id, request)
+    _crawls[crawl_id] = crawler
+
+    background_tasks.add_task(
+        _run_crawl,
+        crawler,
+        [str(url) for url in request.urls],
+        str(request.sitemap_url) if request.sitemap_url else None
+    )
+    return CrawlStatusResponse(**crawler.get_progress())
+
+
+@router.post("/crawl/{crawl_id}/resume", response_model=CrawlStatusResponse, status_code=202)
+async def resume_crawl(crawl_id: str, background_tasks: BackgroundTasks):
+    """Resume an interrupted crawl from its last checkpoint."""
+    if crawl_id in _crawls:
+        raise HTTPException(status_code=409, detail="Crawl is already running")
+
+    checkpoint_path = _crawl_checkpoint_path(crawl_id)
+    if not os.path.exists(checkpoint_path):
+        raise HTTPException(status_code=404, detail=f"Crawl '{crawl_id}' not found")
+
+    crawler = _build_crawler(crawl_id)
+    _crawls[crawl_id] = crawler
+    background_tasks.add_task(_run_crawl, crawler, [], None)
+    return CrawlStatusResponse(**crawler.get_progress())
+
+
+@router.get("/crawl/{crawl_id}", response_model=CrawlStatusResponse)
+async def get_crawl_status(crawl_id: str):
+    """Report the progress of a crawl."""
+    if crawl_id in _crawls:
+        return CrawlStatusResponse(**_crawls[crawl_id].get_progress())
+
+    progress = load_crawl_progress(_crawl_checkpoint_path(crawl_id))
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Crawl '{crawl_id}' not found")
+    return CrawlStatusResponse(**progress)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_documents(
+    include_chunks: bool = Query(default=True, description="Include chunks from the vector store"),
+    include_embeddings: bool = Query(default=True, description="Include chunk embeddings")
+):
+    """Stream every document (and its chunks with embeddings) as NDJSON."""
+    def iter_lines():
+        # Sync generator: Starlette iterates it in a worker thread. Own session,
+        # the export outlives the request handler
+        db = SessionLocal()
+        try:
+            yield from transfer.iter_ndjson(transfer.iter_export_records(
+                db,
+                include_chunks=include_chunks,
+                include_embeddings=include_embeddings
+            ))
+        finally:
+            db.close()
+
+    filename = f"documents-{datetime.utcnow():%Y%m%d%H%M%S}.ndjson"
+    return StreamingResponse(
+        iter_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _import_ndjson(file, allow_model_mismatch: bool) -> dict:
+    """Import an uploaded NDJSON export. Runs in a worker thread."""
+    db = SessionLocal()
+    try:
+        return transfer.import_records(
+            db,
+            transfer.iter_ndjson_records(file),
+            allow_model_mismatch=allow_model_mismatch
+        )
+    finally:
+        db.close()
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_documents(
+    file: UploadFile = File(...),
+    allow_model_mismatch: bool = Query(default=False, description="Accept embeddings from a different embedding model")
+):
+    """Load an NDJSON export: documents keep their IDs, chunks keep their embeddings (nothing is re-embedded)."""
+    try:
+        counts = await asyncio.to_thread(_import_ndjson, file.file, allow_model_mismatch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    print(f"Imported {counts['documents_created']} documents, {counts['chunks_imported']} chunks")
+    return ImportResponse(**counts)
+
+
 @router.get("", response_model=DocumentListResponse)
 async def list_documents(
     limit: int = Query(default=10, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page; overrides offset"),
     document_type: Optional[DocumentType] = None,
     status: Optional[DocumentStatus] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all documents with optional filtering and pagination."""
-    # Get documents from store
-    documents = crud.list_documents(
-        db=db,
-        limit=limit,
-        offset=offset,
-        document_type=document_type.value if document_type else None,
-        status=status.value if status else None
-    )
+    document_type = document_type.value if document_type else None
+    status = status.value if status else None
+
+    # Fetch one extra row to know whether there is a next page
+    try:
+        documents = await async_crud.list_documents(
+            db=db,
+            limit=limit + 1,
+            offset=offset,
+            document_type=document_type,
+            status=status,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    has_more = len(documents) > limit
+    documents = documents[:limit]
     
-    # Get total count
-    total = crud.get_total_count(db)
+    # Get count for the same filters (cached, or estimated for huge catalogs)
+    total, total_estimated = await async_crud.count_documents(db, document_type=document_type, status=status)
     
     # Convert to DocumentMetadata objects
     document_metadata_list = [
@@ -267,21 +706,24 @@ async def list_documents(
             word_count=doc.word_count,
             created_at=doc.created_at,
             processed_at=doc.processed_at,
-            extra_metadata=doc.extra_metadata
+            extra_metadata=doc.extra_metadata,
+            content_preview=doc.content_preview
         )
         for doc in documents
     ]
     
     return DocumentListResponse(
         total=total,
-        documents=document_metadata_list
+        total_estimated=total_estimated,
+        documents=document_metadata_list,
+        next_cursor=crud.encode_cursor(documents[-1].created_at, documents[-1].id) if has_more else None
     )
 
 
 @router.get("/{document_id}", response_model=DocumentDetail)
-async def get_document(document_id: str, db: Session = Depends(get_db)):
+async def get_document(document_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific document by ID."""
-    document = crud.get_document(db, document_id)
+    document = await async_crud.get_document(db, document_id, with_content=True)
     
     if not document:
         raise DocumentNotFoundError(document_id)
@@ -293,7 +735,7 @@ async def get_document(document_id: str, db: Session = Depends(get_db)):
         filename=document.filename,
         url=document.url,
         title=document.title,
-        content=document.content,
+        content=await async_crud.read_content_async(document),
         word_count=document.word_count,
         created_at=document.created_at,
         processed_at=document.processed_at,
@@ -301,21 +743,67 @@ async def get_document(document_id: str, db: Session = Depends(get_db)):
     )
 
 
+@router.get("/{document_id}/content", response_class=StreamingResponse)
+async def stream_document_content(document_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Stream a document's full text as plain text, a slice at a time."""
+    length = await async_crud.get_content_length(db, document_id)
+    if length is None:
+        raise DocumentNotFoundError(document_id)
+
+    async def iter_content():
+        # The request session may be closed before streaming ends; use our own
+        async with AsyncSessionLocal() as stream_db:
+            for start in range(0, length, CONTENT_STREAM_CHUNK_SIZE):
+                yield await async_crud.get_content_slice(stream_db, document_id, start, CONTENT_STREAM_CHUNK_SIZE)
+
+    return StreamingResponse(
+        iter_content(),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Content-Length-Chars": str(length)}
+    )
+
+
+@router.post("/delete", response_model=BatchDeleteResponse)
+async def delete_documents(request: BatchDeleteRequest, db: AsyncSession = Depends(get_async_db)):
+    """Delete many documents at once.
+
+    Rows go in one transaction. Their chunks are tombstoned: hidden from
+    searches at once and removed in batches (VECTOR_STORE_TOMBSTONE_FLUSH,
+    or the next compaction).
+    """
+    deleted = [str(document_id) for document_id in await async_crud.delete_documents(db, request.document_ids)]
+    found = set(deleted)
+    not_found = [document_id for document_id in request.document_ids if str(crud._as_uuid(document_id)) not in found]
+    if not deleted:
+        return BatchDeleteResponse(deleted=0, not_found=not_found, pending_chunk_removal=0)
+
+    vector_result = await asyncio.to_thread(get_pipeline().delete_documents, deleted)
+    if not vector_result["success"]:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Documents deleted but their chunks were not: {vector_result['error']}"
+        )
+    return BatchDeleteResponse(
+        deleted=len(deleted),
+        not_found=not_found,
+        pending_chunk_removal=vector_result["pending"]
+    )
+
+
 @router.delete("/{document_id}", response_model=DocumentDeleteResponse)
-async def delete_document(document_id: str,db: Session = Depends(get_db)):
+async def delete_document(document_id: str,db: AsyncSession = Depends(get_async_db)):
     """Delete a document by ID."""
     # Get document first to check if it exists and get file path
-    document = crud.get_document(db, document_id)
+    document = await async_crud.get_document(db, document_id)
     
     if not document:
         raise DocumentNotFoundError(document_id)
     
     # Delete from store
-    success = crud.delete_document(db, document_id)
+    success = await async_crud.delete_document(db, document_id)
 
     # Delete from vector store
-    pipeline = get_pipeline()
-    vector_result = pipeline.delete_document(document_id)
+    vector_result = await asyncio.to_thread(get_pipeline().delete_document, document_id)
     if vector_result["success"]:
         print(f"Deleted {vector_result['chunks_deleted']} chunks from vector DB")
     
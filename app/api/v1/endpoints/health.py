@@ -1,6 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.core.config import settings
-from app.api.v1.schemas import HealthResponse
+from app.api.v1.schemas import HealthResponse, ReadinessResponse
+from app.rag.warmup import get_warm_up_status
 
 router = APIRouter(tags=["health"])
 
@@ -13,3 +15,16 @@ async def health_check():
         status="healthy",
         debug=settings.DEBUG
     )
+
+
+@router.get("/health/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """503 until startup warm-up has loaded every model and index; route traffic only on 200."""
+    status = get_warm_up_status()
+    response = ReadinessResponse(
+        ready=status["ready"],
+        seconds=status["seconds"],
+        steps=status["steps"],
+        error=status["error"]
+    )
+    return JSONResponse(status_code=200 if response.ready else 503, content=response.model_dump())
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from app.rag.pipeline import get_pipeline
+import asyncio
 
 router = APIRouter(prefix="/query", tags=["query"])
 
@@ -48,8 +49,9 @@ async def query_documents(request: QueryRequest):
         if request.filter_document_id and request.filter_document_id != "string":
             filter_metadata = {"document_id": request.filter_document_id}
         
-        # Query RAG system
-        result = pipeline.query(
+        # Query RAG system (blocking: off the event loop, so concurrent identical queries can coalesce)
+        result = await asyncio.to_thread(
+            pipeline.query,
             question=request.question,
             top_k=request.top_k,
             score_threshold=request.score_threshold,
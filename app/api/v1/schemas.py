@@ -1,6 +1,6 @@
 # app/api/v1/schemas.py
-from pydantic import BaseModel, HttpUrl, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, HttpUrl, Field, field_validator, model_validator
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -28,6 +28,13 @@ class HealthResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class ReadinessResponse(BaseModel):
+    ready: bool
+    seconds: Optional[float] = Field(None, description="Warm-up duration, once finished")
+    steps: Dict[str, float] = Field(default_factory=dict, description="Seconds per warm-up step")
+    error: Optional[str] = None
+
+
 
 class URLIngestRequest(BaseModel):
     url: HttpUrl
@@ -57,6 +64,51 @@ class TextIngestRequest(BaseModel):
         }
 
 
+class BatchTextIngestRequest(BaseModel):
+    documents: List[TextIngestRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class CrawlRequest(BaseModel):
+    urls: List[HttpUrl] = Field(default_factory=list)
+    sitemap_url: Optional[HttpUrl] = None
+    max_depth: int = Field(default=0, ge=0, le=5, description="Link depth to follow from each seed")
+    max_pages: int = Field(default=1000, ge=1)
+    allowed_domains: Optional[List[str]] = Field(
+        default=None,
+        description="Domains the crawl may visit; defaults to the seed domains"
+    )
+    metadata: Optional[dict] = None
+    
+    @model_validator(mode="after")
+    def seeds_present(self):
+        if not self.urls and not self.sitemap_url:
+            raise ValueError("Provide at least one URL or a sitemap_url")
+        return self
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sitemap_url": "https://docs.example.com/sitemap.xml",
+                "max_depth": 1,
+                "max_pages": 20000,
+                "metadata": {"source": "docs"}
+            }
+        }
+
+
+class CrawlStatusResponse(BaseModel):
+    crawl_id: str
+    status: str
+    pages_fetched: int = 0
+    pages_failed: int = 0
+    documents_created: int = 0
+    duplicates: int = 0
+    queued: int = 0
+    errors: List[str] = []
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class DocumentIngestResponse(BaseModel):
     document_id: str
     document_type: DocumentType
@@ -66,10 +118,33 @@ class DocumentIngestResponse(BaseModel):
     content_preview: str = Field(..., description="First 200 characters of content")
     word_count: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    duplicate: bool = Field(default=False, description="True if an identical document was already ingested")
     message: str = "Document ingested successfully"
 
 
 
+class BatchIngestItem(BaseModel):
+    document_id: Optional[str] = None
+    title: Optional[str] = None
+    duplicate: bool = False
+    error: Optional[str] = None
+
+
+class BatchIngestResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    chunks_indexed: int
+    documents: List[BatchIngestItem] = Field(..., description="One entry per request document, in order")
+
+
+class ImportResponse(BaseModel):
+    documents_created: int
+    documents_skipped: int = Field(..., description="Already present (same content hash); their chunks are skipped too")
+    chunks_imported: int
+    chunks_skipped: int
+
+
 class DocumentMetadata(BaseModel):
     document_id: str
     document_type: DocumentType
@@ -81,11 +156,14 @@ class DocumentMetadata(BaseModel):
     created_at: datetime
     processed_at: Optional[datetime] = None
     metadata: Optional[dict] = None
+    content_preview: Optional[str] = None
 
 
 class DocumentListResponse(BaseModel):
     total: int
+    total_estimated: bool = False  # True when total comes from planner statistics
     documents: List[DocumentMetadata]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to get the next page
 
 
 class DocumentDetail(BaseModel):
@@ -106,6 +184,16 @@ class DocumentDeleteResponse(BaseModel):
     document_id: str
     message: str = "Document deleted successfully"
 
+
+class BatchDeleteRequest(BaseModel):
+    document_ids: List[str] = Field(..., min_length=1, max_length=10000)
+
+
+class BatchDeleteResponse(BaseModel):
+    deleted: int
+    not_found: List[str] = Field(default_factory=list)
+    pending_chunk_removal: int = Field(..., description="Deleted documents whose chunks are hidden but not yet removed")
+
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=500)
     max_results: int = Field(default=5, ge=1, le=20)
@@ -0,0 +1,215 @@
+"""Maintenance commands.
+
+Usage:
+    python -m app.cli export corpus.ndjson
+    python -m app.cli export corpus-parquet/ --format parquet
+    python -m app.cli import corpus.ndjson
+    python -m app.cli offload-content
+    python -m app.cli delete-documents --file ids.txt
+    python -m app.cli gc-blobs
+    python -m app.cli reshard
+    python -m app.cli rebuild-index --search-ef 64
+    python -m app.cli build-binary-index
+    python -m app.cli vacuum-vector-store
+"""
+import argparse
+import sys
+from app.db import crud, transfer
+from app.db.database import SessionLocal
+
+
+def export_command(args) -> None:
+    db = SessionLocal()
+    try:
+        options = dict(
+            batch_size=args.batch_size,
+            include_chunks=not args.no_chunks,
+            include_embeddings=not args.no_embeddings
+        )
+        if args.format == "parquet":
+            counts = transfer.export_parquet(db, args.path, **options)
+            print(f"exported {counts} to {args.path}")
+        elif args.path == "-":
+            transfer.export_ndjson(db, sys.stdout, **options)
+        else:
+            with open(args.path, "w", encoding="utf-8") as f:
+                written = transfer.export_ndjson(db, f, **options)
+            print(f"exported {written} records to {args.path}")
+    finally:
+        db.close()
+
+
+def import_command(args) -> None:
+    db = SessionLocal()
+    try:
+        if args.format == "parquet":
+            records = transfer.iter_parquet_records(args.path, args.batch_size)
+            counts = transfer.import_records(db, records, batch_size=args.batch_size,
+                                             allow_model_mismatch=args.allow_model_mismatch)
+        else:
+            with open(args.path, "r", encoding="utf-8") as f:
+                counts = transfer.import_records(db, transfer.iter_ndjson_records(f), batch_size=args.batch_size,
+                                                 allow_model_mismatch=args.allow_model_mismatch)
+        print(f"imported: {counts}")
+    finally:
+        db.close()
+
+
+def offload_content_command(args) -> None:
+    db = SessionLocal()
+    try:
+        moved = crud.offload_inline_content(db, batch_size=args.batch_size)
+        print(f"moved {moved} document bodies to the blob store")
+    finally:
+        db.close()
+
+
+def delete_documents_command(args) -> None:
+    from app.rag.pipeline import get_pipeline
+
+    document_ids = list(args.document_ids)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            document_ids.extend(line.strip() for line in f if line.strip())
+    if not document_ids:
+        sys.exit("no document IDs given")
+
+    db = SessionLocal()
+    try:
+        deleted = [str(document_id) for document_id in crud.delete_documents(db, document_ids)]
+    finally:
+        db.close()
+    print(f"deleted {len(deleted)} of {len(document_ids)} documents")
+    if deleted:
+        result = get_pipeline().delete_documents(deleted)
+        if not result["success"]:
+            sys.exit(f"chunks not deleted: {result['error']}")
+        if args.flush:
+            get_pipeline().vector_store.flush_tombstones()
+            print("chunks removed")
+        else:
+            print(f"{result['pending']} documents' chunks hidden, removed at the next flush or compaction")
+
+
+def gc_blobs_command(args) -> None:
+    db = SessionLocal()
+    try:
+        deleted = crud.collect_blob_garbage(db, grace_seconds=args.grace_seconds)
+        print(f"deleted {deleted} unreferenced document bodies")
+    finally:
+        db.close()
+
+
+def reshard_command(args) -> None:
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore, get_vector_store, reshard
+
+    if not settings.VECTOR_STORE_SHARD_KEY:
+        sys.exit("VECTOR_STORE_SHARD_KEY is not set")
+    source = ChromaVectorStore()
+    target = get_vector_store()
+    copied = reshard(source, target, batch_size=args.batch_size)
+    print(f"copied {copied} chunks into {len(target.get_stats()['shards'])} shards")
+    if args.delete_source:
+        source.client.delete_collection(source.collection.name)
+        print(f"deleted collection {source.collection.name}")
+
+
+def rebuild_index_command(args) -> None:
+    from app.rag.vector_store import REBUILD_SUFFIXES, _collection_names, get_vector_store, hnsw_params, rebuild_collection
+
+    client = get_vector_store().client
+    names = args.collection or [
+        name for name in _collection_names(client) if not name.endswith(REBUILD_SUFFIXES)
+    ]
+    for name in names:
+        params = hnsw_params(name)
+        overrides = {"M": args.m, "construction_ef": args.construction_ef, "search_ef": args.search_ef}
+        params.update({key: value for key, value in overrides.items() if value is not None})
+        result = rebuild_collection(
+            client, name, params, batch_size=args.batch_size, keep_previous=not args.drop_previous
+        )
+        print(f"rebuilt {name}: {result['chunks']} chunks, HNSW {result['before']} -> {result['after']}")
+    print("restart the API to use the rebuilt collections")
+
+
+def build_binary_index_command(args) -> None:
+    from app.rag.vector_store import get_vector_store
+
+    indexed = get_vector_store().build_binary_index()
+    print(f"binary index built over {indexed} chunks")
+
+
+def vacuum_vector_store_command(args) -> None:
+    from app.rag.vector_store import vacuum_sqlite
+
+    result = vacuum_sqlite()
+    print(f"vector store: {result['bytes_before']} -> {result['bytes_after']} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export documents, chunks and embeddings")
+    export_parser.add_argument("path", help="NDJSON file ('-' for stdout), or a directory for Parquet")
+    export_parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    export_parser.add_argument("--batch-size", type=int, default=transfer.EXPORT_BATCH_SIZE)
+    export_parser.add_argument("--no-chunks", action="store_true", help="Documents only")
+    export_parser.add_argument("--no-embeddings", action="store_true", help="Chunks without embeddings")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = commands.add_parser("import", help="Import an export without re-embedding")
+    import_parser.add_argument("path", help="NDJSON file, or a directory for Parquet")
+    import_parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    import_parser.add_argument("--batch-size", type=int, default=transfer.EXPORT_BATCH_SIZE)
+    import_parser.add_argument("--allow-model-mismatch", action="store_true",
+                               help="Accept embeddings from a different embedding model")
+    import_parser.set_defaults(handler=import_command)
+
+    offload_parser = commands.add_parser("offload-content", help="Move inline document bodies to the blob store")
+    offload_parser.add_argument("--batch-size", type=int, default=100)
+    offload_parser.set_defaults(handler=offload_content_command)
+
+    delete_parser = commands.add_parser("delete-documents", help="Delete many documents and their chunks")
+    delete_parser.add_argument("document_ids", nargs="*", help="Document IDs")
+    delete_parser.add_argument("--file", help="File with one document ID per line")
+    delete_parser.add_argument("--flush", action="store_true", help="Remove the chunks now instead of in the background")
+    delete_parser.set_defaults(handler=delete_documents_command)
+
+    gc_parser = commands.add_parser("gc-blobs", help="Delete document bodies no document references")
+    gc_parser.add_argument("--grace-seconds", type=float, help="Keep bodies written more recently (default: BLOB_GC_GRACE_SECONDS)")
+    gc_parser.set_defaults(handler=gc_blobs_command)
+
+    reshard_parser = commands.add_parser("reshard", help="Copy the unsharded collection into VECTOR_STORE_SHARD_KEY shards")
+    reshard_parser.add_argument("--batch-size", type=int, default=transfer.EXPORT_BATCH_SIZE)
+    reshard_parser.add_argument("--delete-source", action="store_true", help="Drop the unsharded collection afterwards")
+    reshard_parser.set_defaults(handler=reshard_command)
+
+    rebuild_parser = commands.add_parser(
+        "rebuild-index",
+        help="Rebuild HNSW indexes with the configured (or given) parameters; stop ingestion first"
+    )
+    rebuild_parser.add_argument("--collection", action="append", help="Collection to rebuild (default: all)")
+    rebuild_parser.add_argument("--m", type=int)
+    rebuild_parser.add_argument("--construction-ef", type=int)
+    rebuild_parser.add_argument("--search-ef", type=int)
+    rebuild_parser.add_argument("--batch-size", type=int, default=transfer.EXPORT_BATCH_SIZE)
+    rebuild_parser.add_argument("--drop-previous", action="store_true", help="Delete the old collection afterwards")
+    rebuild_parser.set_defaults(handler=rebuild_index_command)
+
+    binary_parser = commands.add_parser("build-binary-index", help="Build the index used by SEARCH_MODE=binary")
+    binary_parser.set_defaults(handler=build_binary_index_command)
+
+    vacuum_parser = commands.add_parser(
+        "vacuum-vector-store",
+        help="Give disk space freed by deleted chunks back to the OS; stop the API first"
+    )
+    vacuum_parser.set_defaults(handler=vacuum_vector_store_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Content-addressed, compressed storage for document bodies on local disk."""
+import hashlib
+import importlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterator, List, Optional
+from app.core.config import settings
+import logging
+logger = logging.getLogger(__name__)
+try:
+    zstandard = importlib.import_module("zstandard")
+except ModuleNotFoundError:
+    zstandard = None
+
+# Trailer: little-endian length of the JSON frame index that precedes it
+_TRAILER = struct.Struct("<Q")
+
+# Parsed frame indexes kept in memory (blobs are immutable, so never stale)
+_MAX_CACHED_INDEXES = 256
+
+
+def make_blob_ref(text: str) -> str:
+    """Content address of a text: SHA-256 of its UTF-8 encoding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """Stores texts as independently compressed frames so ranges can be read.
+
+    A blob is a sequence of compressed frames of ``frame_chars`` characters
+    each, followed by a JSON index of frame offsets and an 8-byte trailer.
+    Reading a character range only decompresses the frames it overlaps.
+    Frames use zstd when ``zstandard`` is installed and zlib otherwise; the
+    codec is recorded per blob.
+    """
+
+    SUFFIX = ".blob"
+
+    def __init__(self, directory: str, frame_chars: int = 64 * 1024, level: int = 3):
+        self.directory = directory
+        self.frame_chars = frame_chars
+        self.level = level
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        self._indexes: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.directory, ref[:2], f"{ref}{self.SUFFIX}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, min(self.level, 9))
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard not installed; cannot read zstd-compressed blob")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self._path(ref))
+
+    def put(self, text: str) -> str:
+        """
+        Store a text unless an identical one is already stored.
+
+        Args:
+            text: Text to store
+
+        Returns:
+            Blob reference (content address)
+        """
+        ref = make_blob_ref(text)
+        path = self._path(ref)
+        try:
+            # Already stored: refresh its mtime so collect_garbage() spares it
+            os.utime(path)
+            return ref
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        frames: List[List[int]] = []
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                offset = 0
+                for start in range(0, len(text), self.frame_chars):
+                    frame = self._compress(text[start:start + self.frame_chars].encode("utf-8"))
+                    f.write(frame)
+                    frames.append([offset, len(frame)])
+                    offset += len(frame)
+                index = json.dumps({
+                    "codec": self.codec,
+                    "frame_chars": self.frame_chars,
+                    "chars": len(text),
+                    "frames": frames
+                }).encode("utf-8")
+                f.write(index)
+                f.write(_TRAILER.pack(len(index)))
+            # Atomic: readers never see a partially written blob
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return ref
+
+    def _index(self, ref: str, f) -> dict:
+        with self._lock:
+            index = self._indexes.get(ref)
+            if index is not None:
+                self._indexes.move_to_end(ref)
+                return index
+
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        (index_size,) = _TRAILER.unpack(f.read(_TRAILER.size))
+        f.seek(-_TRAILER.size - index_size, os.SEEK_END)
+        index = json.loads(f.read(index_size))
+
+        with self._lock:
+            self._indexes[ref] = index
+            while len(self._indexes) > _MAX_CACHED_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def length(self, ref: str) -> int:
+        """Length of a stored text in characters."""
+        with open(self._path(ref), "rb") as f:
+            return self._index(ref, f)["chars"]
+
+    def read_range(self, ref: str, start: int, length: int) -> str:
+        """
+        Read part of a stored text, decompressing only the frames it overlaps.
+
+        Args:
+            ref: Blob reference
+            start: 0-based start character
+            length: Number of characters
+
+        Returns:
+            Text slice, shorter at the end of the text
+        """
+        with open(self._path(ref), "rb") as f:
+            index = self._index(ref, f)
+            end = min(start + length, index["chars"])
+            if start >= end:
+                return ""
+
+            frame_chars = index["frame_chars"]
+            first, last = start // frame_chars, (end - 1) // frame_chars
+            parts = []
+            for offset, size in index["frames"][first:last + 1]:
+                f.seek(offset)
+                parts.append(self._decompress(index["codec"], f.read(size)).decode("utf-8"))
+
+        text = "".join(parts)
+        base = first * frame_chars
+        return text[start - base:end - base]
+
+    def read(self, ref: str) -> str:
+        """Read a whole stored text."""
+        return self.read_range(ref, 0, self.length(ref))
+
+    def refs(self, older_than: float) -> Iterator[str]:
+        """References of the blobs last written or re-put before ``older_than`` (a timestamp)."""
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith(self.SUFFIX) and entry.stat().st_mtime < older_than:
+                    yield entry.name[:-len(self.SUFFIX)]
+
+    def delete_if_idle(self, ref: str, older_than: float) -> bool:
+        """
+        Delete a blob unless it was written or re-put since ``older_than``.
+
+        The blob is renamed aside before its mtime is checked, so a concurrent
+        put() either refreshed the mtime first (and the blob is restored) or
+        finds it missing and writes it again.
+
+        Returns:
+            True if the blob was deleted
+        """
+        path = self._path(ref)
+        trash_path = f"{path}.gc"
+        try:
+            os.rename(path, trash_path)
+        except FileNotFoundError:
+            return False
+        if os.stat(trash_path).st_mtime >= older_than:
+            os.replace(trash_path, path)
+            return False
+        with self._lock:
+            self._indexes.pop(ref, None)
+        os.remove(trash_path)
+        return True
+
+    def delete(self, ref: str) -> bool:
+        """Delete a stored text. Returns False if it didn't exist."""
+        with self._lock:
+            self._indexes.pop(ref, None)
+        try:
+            os.remove(self._path(ref))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_blob_store = None
+def get_blob_store() -> BlobStore:
+    """Get or create the document body store."""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(
+            settings.BLOB_STORE_DIR,
+            frame_chars=settings.BLOB_FRAME_CHARS,
+            level=settings.BLOB_COMPRESSION_LEVEL
+        )
+    return _blob_store
@@ -0,0 +1,262 @@
+"""Compressed on-disk caches: intermediate ingestion results and LLM responses."""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+from app.core.config import settings
+import logging
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Build a cache key from its parts (source hash, stage, versions...).
+
+    Args:
+        parts: Values identifying the cached entry
+
+    Returns:
+        Hex digest usable as a file name
+    """
+    joined = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Gzip-compressed JSON cache on local disk, evicted by total size (LRU)."""
+
+    SUFFIX = ".json.gz"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = self._scan_size()
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], f"{key}{self.SUFFIX}")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(self.SUFFIX):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or None on a miss."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self.delete(key)
+            return None
+
+        # Touch for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serialisable value under ``key``."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp_path)
+            with self._lock:
+                # An overwritten entry no longer counts towards the total
+                try:
+                    size -= os.path.getsize(path)
+                except FileNotFoundError:
+                    pass
+                os.replace(tmp_path, path)
+                self._total_bytes += size
+                over_budget = self._total_bytes > self.max_bytes
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if over_budget:
+            self.evict()
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            try:
+                self.set(key, value)
+            except OSError as e:
+                logger.warning(f"Failed to write cache entry {key}: {e}")
+        return value
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry."""
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    def evict(self) -> int:
+        """Evict least recently used entries until the cache fits its budget.
+
+        Returns the number of bytes freed.
+        """
+        with self._lock:
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            # Evict down to 90% so we don't rescan on every write
+            target = int(self.max_bytes * 0.9)
+            freed = 0
+            for _, size, path in sorted(entries):
+                if total - freed <= target:
+                    break
+                try:
+                    os.remove(path)
+                    freed += size
+                except OSError:
+                    pass
+
+            self._total_bytes = total - freed
+
+        if freed:
+            logger.info(f"Evicted {freed} bytes from cache at {self.directory}")
+        return freed
+
+    def get_stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+class _NullCache:
+    """Drop-in replacement used when caching is disabled."""
+
+    def get(self, key: str) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        return compute()
+
+    def get_stats(self) -> dict:
+        return {"enabled": False}
+
+
+class ResponseCache:
+    """LLM responses on a DiskCache, expiring after ``ttl`` seconds, with hit/miss counters."""
+
+    def __init__(self, cache: DiskCache, ttl: float):
+        self.cache = cache
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "skipped": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, max_tokens: Optional[int]) -> str:
+        return make_cache_key("llm-response", model, float(temperature), max_tokens, prompt)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key`` or None on a miss."""
+        entry = self.cache.get(key)
+        if entry is not None and self.ttl and time.time() - entry["created"] > self.ttl:
+            self.cache.delete(key)
+            self._count("expired")
+            entry = None
+        self._count("hits" if entry is not None else "misses")
+        return entry["text"] if entry is not None else None
+
+    def set(self, key: str, text: str) -> None:
+        try:
+            self.cache.set(key, {"created": time.time(), "text": text})
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
+
+    def skip(self) -> None:
+        """Count a request that was not cacheable (temperature > 0, not opted in)."""
+        self._count("skipped")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+            "ttl": self.ttl,
+            **self.cache.get_stats()
+        }
+
+
+# Singleton instance
+_processed_cache = None
+def get_processed_cache() -> DiskCache:
+    """Get or create the cache for parsed, cleaned and chunked text."""
+    global _processed_cache
+    if _processed_cache is None:
+        if settings.PROCESSED_CACHE_ENABLED:
+            _processed_cache = DiskCache(
+                settings.PROCESSED_DATA_DIR,
+                settings.PROCESSED_CACHE_MAX_BYTES
+            )
+        else:
+            _processed_cache = _NullCache()
+    return _processed_cache
+
+
+
+_response_cache = None
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get or create the LLM response cache; None when LLM_CACHE_ENABLED is off."""
+    global _response_cache
+    if _response_cache is None and settings.LLM_CACHE_ENABLED:
+        _response_cache = ResponseCache(
+            DiskCache(settings.LLM_CACHE_DIR, settings.LLM_CACHE_MAX_BYTES),
+            settings.LLM_CACHE_TTL
+        )
+    return _response_cache
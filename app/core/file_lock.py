@@ -0,0 +1,28 @@
+"""Advisory file locks, for state that several API workers share on disk."""
+import importlib
+import os
+from contextlib import contextmanager
+from typing import Iterator
+try:
+    fcntl = importlib.import_module("fcntl")
+except ModuleNotFoundError:
+    fcntl = None  # Windows: no cross-process locking
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive lock on ``path`` (created if missing) for the block.
+
+    The lock is per open file, so it also excludes other threads of the same
+    process. Advisory: only code that takes the same lock is excluded.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,65 @@
+"""Request coalescing: concurrent calls with the same key share one execution."""
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Runs ``fn`` once per key at a time; callers arriving meanwhile wait for its result.
+
+    Nothing is remembered after the call returns: the next call with the same
+    key runs again (caching is a separate concern).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._counters = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Return ``fn()``, or the result of an identical call already in flight.
+
+        Args:
+            key: Identifies equivalent calls
+            fn: Computes the result; its exception is raised to every waiter
+
+        Returns:
+            The shared result (callers must not mutate it)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._counters["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls)}
@@ -1,6 +1,7 @@
 """Utility functions for the Research Assistant API."""
 import uuid
 import os
+import hashlib
 from pathlib import Path
 from fastapi import UploadFile
 from app.core.config import settings
@@ -12,6 +13,39 @@ def generate_document_id() -> str:
     return str(uuid.uuid4())
 
 
+def calculate_content_hash(data: str | bytes) -> str:
+    """
+    Calculate a SHA-256 content hash used for document deduplication.
+    
+    Args:
+        data: Text or raw bytes to hash
+        
+    Returns:
+        Hex digest of the content
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def calculate_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Calculate the SHA-256 hash of a file without loading it into memory.
+    
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes read per iteration
+        
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def calculate_word_count(text: str) -> int:
     """
     Calculate word count in text.
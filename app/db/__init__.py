@@ -1,5 +1,5 @@
 # app/db/__init__.py
-from .database import get_db, init_db
+from .database import get_db, get_async_db, init_db
 from .models import Document
 
-__all__ = ["get_db", "init_db", "Document"]
+__all__ = ["get_db", "get_async_db", "init_db", "Document"]
@@ -0,0 +1,228 @@
+# app/db/async_crud.py
+"""Async versions of the functions in app.db.crud, for AsyncSession handlers.
+
+Blob store reads and writes are file IO and run in worker threads.
+"""
+import asyncio
+import uuid
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Document, DocumentStatusEnum
+from app.core.blob_store import get_blob_store
+from app.db.crud import (
+    BULK_INSERT_ROWS,
+    ESTIMATED_COUNT_SQL,
+    _bulk_insert_statement,
+    _bulk_rows,
+    _by_url_statement,
+    _cached_count,
+    _content_statement,
+    _count_statement,
+    _created_ids,
+    _delete_statement,
+    _document_statement,
+    _existing_ids_statement,
+    _ids_by_hashes_statement,
+    _invalidate_counts,
+    _list_statement,
+    _prepare_document,
+    _search_index_params,
+    _search_index_statements,
+    _search_results,
+    _search_statement,
+    _status_statement,
+    _store_count,
+    _usable_estimate,
+    read_content,
+)
+from typing import Dict, List, Optional, Tuple
+
+
+
+async def read_content_async(document: Document) -> str:
+    """Full body of a document (``crud.read_content`` off the event loop)."""
+    return await asyncio.to_thread(read_content, document)
+
+
+async def create_document(db: AsyncSession, document_data: dict) -> Document:
+    """Create a new document. Its body goes to the blob store, the row keeps a reference."""
+    data, body = await asyncio.to_thread(_prepare_document, document_data)
+    db_document = Document(**data)
+    db.add(db_document)
+    await db.flush()
+    params = _search_index_params(db_document.id, db_document.title, body or "")
+    for statement in _search_index_statements(db.get_bind().dialect.name):
+        await db.execute(statement, params)
+    await db.commit()
+    await db.refresh(db_document)
+    _invalidate_counts()
+    return db_document
+
+
+async def create_documents_bulk(db: AsyncSession, documents_data: List[dict]) -> List[Optional[uuid.UUID]]:
+    """Create many documents in one transaction. See ``crud.create_documents_bulk``."""
+    if not documents_data:
+        return []
+    dialect = db.get_bind().dialect.name
+    rows, bodies = await asyncio.to_thread(_bulk_rows, documents_data)
+
+    created = set()
+    for start in range(0, len(rows), BULK_INSERT_ROWS):
+        statement = _bulk_insert_statement(dialect, rows[start:start + BULK_INSERT_ROWS])
+        created.update((await db.execute(statement)).scalars())
+
+    ids = _created_ids(rows, created)
+    index_params = [
+        _search_index_params(row["id"], row["title"], body)
+        for row, body, document_id in zip(rows, bodies, ids) if document_id is not None
+    ]
+    if index_params:
+        for statement in _search_index_statements(dialect):
+            await db.execute(statement, index_params)
+    await db.commit()
+    _invalidate_counts()
+    return ids
+
+
+async def get_document(db: AsyncSession, document_id: str, with_content: bool = False) -> Optional[Document]:
+    """Get document by ID. Inline ``content`` is only loaded with ``with_content`` (no lazy loads in async)."""
+    return (await db.execute(_document_statement(document_id, with_content))).scalars().first()
+
+
+async def get_content_length(db: AsyncSession, document_id: str) -> Optional[int]:
+    """Get the length of a document's content in characters, or None if it doesn't exist."""
+    row = (await db.execute(_content_statement(document_id))).first()
+    if row is None:
+        return None
+    content_ref, inline_length = row
+    if content_ref:
+        return await asyncio.to_thread(get_blob_store().length, content_ref)
+    return inline_length or 0
+
+
+async def get_content_slice(db: AsyncSession, document_id: str, start: int, length: int) -> str:
+    """Read ``length`` characters of a document's content from 0-based ``start``, without loading the rest."""
+    row = (await db.execute(_content_statement(document_id, start, length))).first()
+    if row is None:
+        return ""
+    content_ref, inline_slice = row
+    if content_ref:
+        return await asyncio.to_thread(get_blob_store().read_range, content_ref, start, length)
+    return inline_slice or ""
+
+
+async def get_document_by_hash(db: AsyncSession, content_hash: str) -> Optional[Document]:
+    """Get document by content hash."""
+    result = await db.execute(select(Document).where(Document.content_hash == content_hash))
+    return result.scalars().first()
+
+
+async def get_document_ids_by_hashes(
+    db: AsyncSession,
+    content_hashes: List[str],
+    incomplete_only: bool = False
+) -> Dict[str, uuid.UUID]:
+    """Map content hashes to the IDs of the documents that have them (only those not COMPLETED, if asked)."""
+    if not content_hashes:
+        return {}
+    return dict((await db.execute(_ids_by_hashes_statement(content_hashes, incomplete_only))).all())
+
+
+async def set_document_status(db: AsyncSession, document_ids: List, status: DocumentStatusEnum) -> None:
+    """Set the status of many documents in one UPDATE. See ``crud.set_document_status``."""
+    if not document_ids:
+        return
+    await db.execute(_status_statement(document_ids, status))
+    await db.commit()
+    _invalidate_counts()
+
+
+async def get_document_by_url(db: AsyncSession, url: str) -> Optional[Document]:
+    """Get the most recently ingested document for a URL."""
+    return (await db.execute(_by_url_statement(url))).scalars().first()
+
+
+async def list_documents(
+    db: AsyncSession,
+    limit: int = 100,
+    offset: int = 0,
+    document_type: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> List[Row]:
+    """List document metadata with filters, newest first. See ``crud.list_documents``."""
+    return (await db.execute(_list_statement(limit, offset, document_type, status, cursor))).all()
+
+
+async def get_total_count(db: AsyncSession) -> int:
+    """Get total document count."""
+    return (await db.execute(_count_statement(None, None))).scalar()
+
+
+async def count_documents(
+    db: AsyncSession,
+    document_type: Optional[str] = None,
+    status: Optional[str] = None
+) -> Tuple[int, bool]:
+    """Count documents matching the filters, cached or estimated. See ``crud.count_documents``."""
+    key = (document_type, status)
+    cached = _cached_count(key)
+    if cached:
+        return cached
+
+    if not document_type and not status and db.get_bind().dialect.name == "postgresql":
+        estimate = (await db.execute(ESTIMATED_COUNT_SQL)).scalar()
+        if _usable_estimate(estimate):
+            return _store_count(key, estimate, True)
+
+    count = (await db.execute(_count_statement(document_type, status))).scalar()
+    return _store_count(key, count, False)
+
+
+async def delete_document(db: AsyncSession, document_id: str) -> bool:
+    """Delete document by ID. Its body stays in the blob store until crud.collect_blob_garbage()."""
+    document = await get_document(db, document_id)
+    if document:
+        await db.delete(document)
+        await db.commit()
+        _invalidate_counts()
+        return True
+    return False
+
+
+async def delete_documents(db: AsyncSession, document_ids: List[str]) -> List[uuid.UUID]:
+    """Delete many documents in one transaction. Returns the IDs that existed (and are now deleted)."""
+    existing = list((await db.execute(_existing_ids_statement(document_ids))).scalars())
+    if existing:
+        await db.execute(_delete_statement(existing))
+        await db.commit()
+        _invalidate_counts()
+    return existing
+
+
+async def update_document(db: AsyncSession, document_id: str, updates: dict) -> Optional[Document]:
+    """Update document fields."""
+    document = await get_document(db, document_id, with_content=True)
+    if document:
+        updates, body = await asyncio.to_thread(_prepare_document, updates)
+        for key, value in updates.items():
+            setattr(document, key, value)
+        if body is not None or "title" in updates:
+            await db.flush()
+            body = await read_content_async(document) if body is None else body
+            params = _search_index_params(document.id, document.title, body)
+            for statement in _search_index_statements(db.get_bind().dialect.name, reindex=True):
+                await db.execute(statement, params)
+        await db.commit()
+        await db.refresh(document)
+        return document
+    return None
+
+
+async def search_documents(db: AsyncSession, query: str, max_results: int = 5) -> List[dict]:
+    """Full-text search ranked in the database. See ``crud.search_documents``."""
+    dialect = db.get_bind().dialect.name
+    statement = _search_statement(dialect, query, max_results)
+    if statement is None:
+        return []
+    return _search_results(dialect, (await db.execute(statement)).all(), query)
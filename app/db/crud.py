@@ -1,22 +1,426 @@
 # app/db/crud.py
-from sqlalchemy.orm import Session
-from app.db.models import Document, DocumentTypeEnum, DocumentStatusEnum
-from typing import List, Optional
+from sqlalchemy import Row, Select, bindparam, column, func, insert, literal, literal_column, or_, select, table, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, undefer
+from app.db.models import Document, DocumentTypeEnum, DocumentStatusEnum, SEARCH_CONTENT_LIMIT
+from app.core.blob_store import get_blob_store
+from app.core.config import settings
+from app.core.utils import get_content_preview
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import base64
+import time
+import uuid
+
+# Columns returned by list queries; everything but the document content
+METADATA_COLUMNS = (
+    Document.id,
+    Document.document_type,
+    Document.status,
+    Document.filename,
+    Document.url,
+    Document.title,
+    Document.word_count,
+    Document.created_at,
+    Document.processed_at,
+    Document.extra_metadata,
+    Document.content_preview,
+)
+
+# Cached document counts: (document_type, status) -> (count, estimated, expires_at)
+_count_cache: Dict[Tuple[Optional[str], Optional[str]], Tuple[int, bool, float]] = {}
+
+# Fill the search index for one document (see app.db.models)
+_ID_PARAM = bindparam("id", type_=Document.__table__.c.id.type)
+POSTGRES_INDEX_SQL = text(
+    "UPDATE documents SET search_vector = "
+    "setweight(to_tsvector('english', coalesce(:title, '')), 'A') || "
+    "setweight(to_tsvector('english', :content), 'B') "
+    "WHERE id = :id"
+).bindparams(_ID_PARAM)
+SQLITE_UNINDEX_SQL = text(
+    "DELETE FROM documents_fts WHERE rowid = (SELECT rowid FROM documents WHERE id = :id)"
+).bindparams(_ID_PARAM)
+SQLITE_INDEX_SQL = text(
+    "INSERT INTO documents_fts(rowid, title, content) "
+    "SELECT rowid, :title, :content FROM documents WHERE id = :id"
+).bindparams(_ID_PARAM)
+
+# Rows per multi-row INSERT (keeps statements under driver parameter limits)
+BULK_INSERT_ROWS = 500
+
+# Planner estimate of the documents row count (Postgres); -1 until vacuumed or analyzed
+ESTIMATED_COUNT_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'documents'::regclass")
+
+
+def _invalidate_counts() -> None:
+    _count_cache.clear()
+
+
+# Statement builders shared with app.db.async_crud
+
+def _as_uuid(document_id) -> Optional[uuid.UUID]:
+    """Coerce a document ID to a UUID; None if it isn't one (so lookups miss)."""
+    if isinstance(document_id, uuid.UUID):
+        return document_id
+    try:
+        return uuid.UUID(str(document_id))
+    except ValueError:
+        return None
+
+
+def _prepare_document(document_data: dict) -> Tuple[dict, Optional[str]]:
+    """Move ``content`` to the blob store; returns the row values and the body text."""
+    data = dict(document_data)
+    body = data.pop("content", None)
+    if body is not None:
+        data["content_ref"] = get_blob_store().put(body)
+        data["content_preview"] = get_content_preview(body)
+        data["content"] = None
+    return data, body
+
+
+def _search_index_params(document_id, title: Optional[str], body: str) -> dict:
+    return {"id": _as_uuid(document_id), "title": title or "", "content": body[:SEARCH_CONTENT_LIMIT]}
+
+
+def _search_index_statements(dialect: str, reindex: bool = False) -> list:
+    """Statements that index a document for full-text search, given ``_search_index_params``."""
+    if dialect == "postgresql":
+        return [POSTGRES_INDEX_SQL]
+    if dialect == "sqlite":
+        return [SQLITE_UNINDEX_SQL, SQLITE_INDEX_SQL] if reindex else [SQLITE_INDEX_SQL]
+    return []
+
+
+def _bulk_rows(documents_data: List[dict]) -> Tuple[List[dict], List[str]]:
+    """Row values for a multi-row insert (all with the same keys) and the bodies to index."""
+    rows, bodies = [], []
+    for document_data in documents_data:
+        data, body = _prepare_document(document_data)
+        row = {column.name: data.get(column.name) for column in Document.__table__.columns}
+        # Column defaults, applied here so every row carries its ID for RETURNING
+        row["id"] = row["id"] or uuid.uuid4()
+        row["status"] = row["status"] or DocumentStatusEnum.COMPLETED
+        row["created_at"] = row["created_at"] or datetime.utcnow()
+        row["extra_metadata"] = row["extra_metadata"] if row["extra_metadata"] is not None else {}
+        rows.append(row)
+        bodies.append(body or "")
+    return rows, bodies
+
+
+def _bulk_insert_statement(dialect: str, rows: List[dict]):
+    """Multi-row INSERT ... RETURNING id that skips rows whose ID or content_hash already exists."""
+    # No conflict target: covers the primary key (imports keep their IDs, and
+    # rows from before content hashing have a NULL hash) as well as content_hash
+    if dialect == "postgresql":
+        statement = postgresql_insert(Document.__table__).values(rows)
+        statement = statement.on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        statement = sqlite_insert(Document.__table__).values(rows)
+        statement = statement.on_conflict_do_nothing()
+    else:
+        statement = insert(Document.__table__).values(rows)
+    return statement.returning(Document.__table__.c.id)
+
+
+def _created_ids(rows: List[dict], created: set) -> List[Optional[uuid.UUID]]:
+    """Per row, its ID if the insert created it, else None (a row repeating an ID earlier in the batch too)."""
+    ids, seen = [], set()
+    for row in rows:
+        ids.append(row["id"] if row["id"] in created and row["id"] not in seen else None)
+        seen.add(row["id"])
+    return ids
+
+
+def _content_statement(document_id, start: Optional[int] = None, length: Optional[int] = None) -> Select:
+    """Select ``(content_ref, inline value)``: the length, or a substring when ``start`` is given."""
+    if start is None:
+        inline = func.length(Document.content)
+    else:
+        inline = func.substr(Document.content, start + 1, length)
+    return select(Document.content_ref, inline).where(Document.id == _as_uuid(document_id))
+
+
+def _referenced_blobs_statement(content_refs: List[str]) -> Select:
+    return select(Document.content_ref).where(Document.content_ref.in_(content_refs)).distinct()
+
+
+def _document_statement(document_id, with_content: bool = False) -> Select:
+    statement = select(Document).where(Document.id == _as_uuid(document_id))
+    if with_content:
+        statement = statement.options(undefer(Document.content))
+    return statement
+
+
+def _ids_by_hashes_statement(content_hashes: List[str], incomplete_only: bool = False) -> Select:
+    statement = select(Document.content_hash, Document.id).where(Document.content_hash.in_(set(content_hashes)))
+    if incomplete_only:
+        statement = statement.where(Document.status != DocumentStatusEnum.COMPLETED)
+    return statement
+
+
+def _status_statement(document_ids: List, status: DocumentStatusEnum):
+    values = {"status": status}
+    if status == DocumentStatusEnum.COMPLETED:
+        values["processed_at"] = datetime.utcnow()
+    return (
+        Document.__table__.update()
+        .where(Document.id.in_([_as_uuid(document_id) for document_id in document_ids]))
+        .values(**values)
+    )
+
+
+def _existing_ids_statement(document_ids: List) -> Select:
+    uuids = [document_id for document_id in map(_as_uuid, document_ids) if document_id is not None]
+    return select(Document.id).where(Document.id.in_(uuids))
+
+
+def _delete_statement(document_ids: List):
+    return Document.__table__.delete().where(Document.id.in_(document_ids))
+
+
+def _by_url_statement(url: str) -> Select:
+    return select(Document).where(Document.url == url).order_by(Document.created_at.desc()).limit(1)
+
+
+def _filtered(statement: Select, document_type: Optional[str], status: Optional[str]) -> Select:
+    if document_type:
+        statement = statement.where(Document.document_type == document_type)
+    if status:
+        statement = statement.where(Document.status == status)
+    return statement
+
+
+def _list_statement(
+    limit: int,
+    offset: int,
+    document_type: Optional[str],
+    status: Optional[str],
+    cursor: Optional[str]
+) -> Select:
+    statement = _filtered(select(*METADATA_COLUMNS), document_type, status)
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        # The first condition alone can be answered from idx_documents_created_at
+        statement = statement.where(
+            Document.created_at <= created_at,
+            or_(Document.created_at < created_at, Document.id < document_id)
+        )
+        offset = 0
+    return (
+        statement.order_by(Document.created_at.desc(), Document.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def _count_statement(document_type: Optional[str], status: Optional[str]) -> Select:
+    return _filtered(select(func.count(Document.id)), document_type, status)
+
+
+def _cached_count(key: tuple) -> Optional[Tuple[int, bool]]:
+    cached = _count_cache.get(key)
+    if cached and cached[2] > time.monotonic():
+        return cached[0], cached[1]
+    return None
+
+
+def _store_count(key: tuple, count: int, estimated: bool) -> Tuple[int, bool]:
+    _count_cache[key] = (count, estimated, time.monotonic() + settings.DOCUMENT_COUNT_CACHE_TTL)
+    return count, estimated
+
+
+def _usable_estimate(estimate: Optional[int]) -> bool:
+    return estimate is not None and estimate >= settings.DOCUMENT_COUNT_ESTIMATE_THRESHOLD
+
+
+def _fts5_query(query: str) -> str:
+    """Quote every term so user input can't use FTS5 query syntax (all terms must match)."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return " ".join(terms)
+
+
+def _search_statement(dialect: str, query: str, max_results: int) -> Optional[Select]:
+    """Select ``(Document, raw_score)`` rows, best first; None if nothing can match."""
+    if dialect == "postgresql":
+        ts_query = func.plainto_tsquery("english", query)
+        search_vector = literal_column("documents.search_vector")
+        # Normalisation 32 maps the rank to rank / (rank + 1)
+        rank = func.ts_rank(search_vector, ts_query, 32).label("rank")
+        return (
+            select(Document, rank)
+            .where(search_vector.op("@@")(ts_query))
+            .order_by(rank.desc())
+            .limit(max_results)
+        )
+
+    if dialect == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return None
+        fts = table("documents_fts", column("rowid"))
+        # bm25() is lower-is-better; title matches weigh more than content matches
+        bm25 = func.bm25(literal_column("documents_fts"), 10.0, 1.0).label("bm25")
+        return (
+            select(Document, bm25)
+            .join(fts, fts.c.rowid == literal_column("documents.rowid"))
+            .where(literal_column("documents_fts").op("MATCH")(match))
+            .order_by(bm25)
+            .limit(max_results)
+        )
+
+    # Bodies live in the blob store; only the title and preview are in the row
+    pattern = f"%{query}%"
+    return (
+        select(Document, literal(0.0))
+        .where(or_(Document.title.ilike(pattern), Document.content_preview.ilike(pattern)))
+        .limit(max_results)
+    )
+
+
+def _search_results(dialect: str, rows, query: str) -> List[dict]:
+    """Normalise raw scores of ``_search_statement`` rows to [0, 1)."""
+    results = []
+    for doc, score in rows:
+        if dialect == "postgresql":
+            relevance = float(score)
+        elif dialect == "sqlite":
+            relevance = -score / (1 - score)
+        else:
+            matched = f"{doc.title or ''} {doc.content_preview or ''}".lower()
+            relevance = min(matched.count(query.lower()) * 0.1, 1.0)
+        results.append({'document': doc, 'relevance_score': relevance})
+    return sorted(results, key=lambda x: x['relevance_score'], reverse=True)
+
+
+def encode_cursor(created_at: datetime, document_id) -> str:
+    """Encode the sort key of the last listed document as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{document_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a cursor from ``encode_cursor``; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, document_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(document_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def read_content(document: Document) -> str:
+    """Full body of a document, from the blob store or the inline column of older rows."""
+    if document.content_ref:
+        return get_blob_store().read(document.content_ref)
+    return document.content or ""
 
 
 def create_document(db: Session, document_data: dict) -> Document:
-    """Create a new document."""
-    db_document = Document(**document_data)
+    """Create a new document. Its body goes to the blob store, the row keeps a reference."""
+    data, body = _prepare_document(document_data)
+    db_document = Document(**data)
     db.add(db_document)
+    db.flush()
+    params = _search_index_params(db_document.id, db_document.title, body or "")
+    for statement in _search_index_statements(db.get_bind().dialect.name):
+        db.execute(statement, params)
     db.commit()
     db.refresh(db_document)
+    _invalidate_counts()
     return db_document
 
 
-def get_document(db: Session, document_id: str) -> Optional[Document]:
-    """Get document by ID."""
-    return db.query(Document).filter(Document.id == document_id).first()
+def create_documents_bulk(db: Session, documents_data: List[dict]) -> List[Optional[uuid.UUID]]:
+    """
+    Create many documents in one transaction with multi-row inserts.
+
+    Documents whose ID or ``content_hash`` already exists (in the database or
+    earlier in the batch) are skipped instead of failing the batch.
+
+    Args:
+        db: Database session
+        documents_data: Column values per document, as for ``create_document``
+
+    Returns:
+        ID of each created document, or None where it was a duplicate
+    """
+    if not documents_data:
+        return []
+    dialect = db.get_bind().dialect.name
+    rows, bodies = _bulk_rows(documents_data)
+
+    created = set()
+    for start in range(0, len(rows), BULK_INSERT_ROWS):
+        statement = _bulk_insert_statement(dialect, rows[start:start + BULK_INSERT_ROWS])
+        created.update(db.execute(statement).scalars())
+
+    ids = _created_ids(rows, created)
+    index_params = [
+        _search_index_params(row["id"], row["title"], body)
+        for row, body, document_id in zip(rows, bodies, ids) if document_id is not None
+    ]
+    if index_params:
+        for statement in _search_index_statements(dialect):
+            db.execute(statement, index_params)
+    db.commit()
+    _invalidate_counts()
+    return ids
+
+
+def get_document(db: Session, document_id: str, with_content: bool = False) -> Optional[Document]:
+    """Get document by ID. ``content`` (inline bodies only) is loaded lazily unless ``with_content`` is set."""
+    return db.execute(_document_statement(document_id, with_content)).scalars().first()
+
+
+def get_content_length(db: Session, document_id: str) -> Optional[int]:
+    """Get the length of a document's content in characters, or None if it doesn't exist."""
+    row = db.execute(_content_statement(document_id)).first()
+    if row is None:
+        return None
+    content_ref, inline_length = row
+    return get_blob_store().length(content_ref) if content_ref else inline_length or 0
+
+
+def get_content_slice(db: Session, document_id: str, start: int, length: int) -> str:
+    """Read ``length`` characters of a document's content from 0-based ``start``, without loading the rest."""
+    row = db.execute(_content_statement(document_id, start, length)).first()
+    if row is None:
+        return ""
+    content_ref, inline_slice = row
+    return get_blob_store().read_range(content_ref, start, length) if content_ref else inline_slice or ""
+
+
+def get_document_by_hash(db: Session, content_hash: str) -> Optional[Document]:
+    """Get document by content hash."""
+    return db.execute(select(Document).where(Document.content_hash == content_hash)).scalars().first()
+
+
+def get_document_ids_by_hashes(
+    db: Session,
+    content_hashes: List[str],
+    incomplete_only: bool = False
+) -> Dict[str, uuid.UUID]:
+    """Map content hashes to the IDs of the documents that have them (only those not COMPLETED, if asked)."""
+    if not content_hashes:
+        return {}
+    return dict(db.execute(_ids_by_hashes_statement(content_hashes, incomplete_only)).all())
+
+
+def set_document_status(db: Session, document_ids: List, status: DocumentStatusEnum) -> None:
+    """Set the status of many documents in one UPDATE (COMPLETED also stamps processed_at)."""
+    if not document_ids:
+        return
+    db.execute(_status_statement(document_ids, status))
+    db.commit()
+    _invalidate_counts()
+
+
+def get_document_by_url(db: Session, url: str) -> Optional[Document]:
+    """Get the most recently ingested document for a URL."""
+    return db.execute(_by_url_statement(url)).scalars().first()
 
 
 def list_documents(
@@ -24,61 +428,170 @@ def list_documents(
     limit: int = 100,
     offset: int = 0,
     document_type: Optional[str] = None,
-    status: Optional[str] = None
-) -> List[Document]:
-    """List documents with filters."""
-    query = db.query(Document)
-    
-    if document_type:
-        query = query.filter(Document.document_type == document_type)
-    if status:
-        query = query.filter(Document.status == status)
-    
-    return query.order_by(Document.created_at.desc()).offset(offset).limit(limit).all()
+    status: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> List[Row]:
+    """
+    List document metadata (``METADATA_COLUMNS``, no content) with filters, newest first.
+
+    With a ``cursor`` from ``encode_cursor`` the page starts right after that
+    document (keyset pagination on ``(created_at, id)``) and ``offset`` is
+    ignored, so deep pages cost the same as the first one.
+    """
+    return db.execute(_list_statement(limit, offset, document_type, status, cursor)).all()
 
 
 def get_total_count(db: Session) -> int:
     """Get total document count."""
-    return db.query(Document).count()
+    return db.execute(_count_statement(None, None)).scalar()
+
+
+def count_documents(
+    db: Session,
+    document_type: Optional[str] = None,
+    status: Optional[str] = None
+) -> Tuple[int, bool]:
+    """
+    Count documents matching the filters without a ``count(*)`` per request.
+
+    Counts are cached for ``DOCUMENT_COUNT_CACHE_TTL`` seconds and dropped
+    whenever this process creates or deletes documents. On Postgres, an
+    unfiltered count of a catalog larger than
+    ``DOCUMENT_COUNT_ESTIMATE_THRESHOLD`` comes from the planner statistics.
+
+    Returns:
+        ``(count, estimated)`` tuple
+    """
+    key = (document_type, status)
+    cached = _cached_count(key)
+    if cached:
+        return cached
+
+    if not document_type and not status and db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(ESTIMATED_COUNT_SQL).scalar()
+        if _usable_estimate(estimate):
+            return _store_count(key, estimate, True)
+
+    return _store_count(key, db.execute(_count_statement(document_type, status)).scalar(), False)
 
 
 def delete_document(db: Session, document_id: str) -> bool:
-    """Delete document by ID."""
+    """Delete document by ID. Its body stays in the blob store until collect_blob_garbage()."""
     document = get_document(db, document_id)
     if document:
         db.delete(document)
         db.commit()
+        _invalidate_counts()
         return True
     return False
 
 
+def collect_blob_garbage(db: Session, grace_seconds: Optional[float] = None, batch_size: int = 500) -> int:
+    """
+    Delete blobs that no document references.
+
+    Bodies are not deleted with their document: a concurrent create of the
+    same content may already have found the blob and be about to commit a row
+    pointing at it. Blobs written or re-put within ``grace_seconds`` are kept.
+
+    Args:
+        db: Database session
+        grace_seconds: Minimum idle time (default BLOB_GC_GRACE_SECONDS)
+        batch_size: References checked per query
+
+    Returns:
+        Number of blobs deleted
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.BLOB_GC_GRACE_SECONDS
+    store = get_blob_store()
+    older_than = time.time() - grace_seconds
+    deleted = 0
+
+    def sweep(refs: List[str]) -> int:
+        referenced = set(db.execute(_referenced_blobs_statement(refs)).scalars())
+        return sum(store.delete_if_idle(ref, older_than) for ref in refs if ref not in referenced)
+
+    batch: List[str] = []
+    for ref in store.refs(older_than):
+        batch.append(ref)
+        if len(batch) >= batch_size:
+            deleted += sweep(batch)
+            batch = []
+    if batch:
+        deleted += sweep(batch)
+    return deleted
+
+
+def delete_documents(db: Session, document_ids: List[str]) -> List[uuid.UUID]:
+    """Delete many documents in one transaction. Returns the IDs that existed (and are now deleted)."""
+    existing = list(db.execute(_existing_ids_statement(document_ids)).scalars())
+    if existing:
+        db.execute(_delete_statement(existing))
+        db.commit()
+        _invalidate_counts()
+    return existing
+
+
 def update_document(db: Session, document_id: str, updates: dict) -> Optional[Document]:
     """Update document fields."""
     document = get_document(db, document_id)
     if document:
+        updates, body = _prepare_document(updates)
         for key, value in updates.items():
             setattr(document, key, value)
+        if body is not None or "title" in updates:
+            db.flush()
+            body = read_content(document) if body is None else body
+            params = _search_index_params(document.id, document.title, body)
+            for statement in _search_index_statements(db.get_bind().dialect.name, reindex=True):
+                db.execute(statement, params)
         db.commit()
         db.refresh(document)
         return document
     return None
 
 
+def offload_inline_content(db: Session, batch_size: int = 100) -> int:
+    """
+    Move bodies of documents stored before the blob store into it.
+
+    Args:
+        db: Database session
+        batch_size: Documents loaded and committed at a time
+
+    Returns:
+        Number of documents moved
+    """
+    moved = 0
+    while True:
+        documents = db.execute(
+            select(Document)
+            .options(undefer(Document.content))
+            .where(Document.content_ref.is_(None), Document.content.is_not(None))
+            .limit(batch_size)
+        ).scalars().all()
+        if not documents:
+            return moved
+        for document in documents:
+            values, _ = _prepare_document({"content": document.content})
+            for key, value in values.items():
+                setattr(document, key, value)
+        db.commit()
+        db.expunge_all()
+        moved += len(documents)
+
+
 def search_documents(db: Session, query: str, max_results: int = 5) -> List[dict]:
-    """Search documents by content (simple text search)."""
-    documents = db.query(Document).filter(
-        Document.content.ilike(f"%{query}%")
-    ).limit(max_results).all()
-    
-    results = []
-    for doc in documents:
-        content_lower = doc.content.lower()
-        query_lower = query.lower()
-        score = content_lower.count(query_lower) * 0.1
-        
-        results.append({
-            'document': doc,
-            'relevance_score': min(score, 1.0)
-        })
-    
-    return sorted(results, key=lambda x: x['relevance_score'], reverse=True)
+    """
+    Full-text search over document titles and content, ranked in the database.
+
+    Uses the tsvector GIN index on Postgres and the FTS5 index on SQLite;
+    other databases fall back to a substring scan. Relevance scores are
+    normalised to [0, 1).
+    """
+    dialect = db.get_bind().dialect.name
+    statement = _search_statement(dialect, query, max_results)
+    if statement is None:
+        return []
+    return _search_results(dialect, db.execute(statement).all(), query)
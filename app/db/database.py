@@ -1,22 +1,58 @@
 # app/db/database.py
+from typing import AsyncIterator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
 from app.db.models import Base
 
+# Async drivers for the sync URLs used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DB_ECHO
-)
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL (``postgresql://``, ``sqlite://``) to its async driver."""
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for database URL '{parsed.drivername}'")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_options(url: str) -> dict:
+    """Connection pool options from settings (SQLite uses its own pooling)."""
+    options = {"pool_pre_ping": True, "echo": settings.DB_ECHO}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+# Create database engine (startup, migrations and worker threads)
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **_engine_options(settings.DATABASE_URL)
+)
+
+# expire_on_commit=False: attributes stay readable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Session:
     """
@@ -30,6 +66,21 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency for getting an async database session.
+    Use with FastAPI Depends() in async handlers.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database - create all tables."""
     Base.metadata.create_all(bind=engine)
+
+
+async def close_db():
+    """Dispose of both connection pools."""
+    await async_engine.dispose()
+    engine.dispose()
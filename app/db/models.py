@@ -1,7 +1,8 @@
 # app/db/models.py
-from sqlalchemy import Column, String, Integer, Text, DateTime, Enum, JSON, Index
+from sqlalchemy import Column, String, Integer, Text, DateTime, Enum, JSON, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from datetime import datetime
 import uuid
 import enum
@@ -31,7 +32,10 @@ class Document(Base):
     filename = Column(String(255), nullable=True)
     url = Column(Text, nullable=True)
     title = Column(String(500), nullable=True)
-    content = Column(Text, nullable=False)
+    content = deferred(Column(Text, nullable=True))  # Inline body of rows ingested before the blob store
+    content_ref = Column(String(64), nullable=True)  # Blob store reference of the body
+    content_preview = Column(Text, nullable=True)  # Precomputed at ingest
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the source, used for deduplication
     word_count = Column(Integer, nullable=False)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
@@ -43,7 +47,36 @@ class Document(Base):
         Index('idx_documents_status', 'status'),
         Index('idx_documents_created_at', 'created_at'),
         Index('idx_documents_type_status', 'document_type', 'status'),
+        Index('idx_documents_content_hash', 'content_hash', unique=True),
+        Index('idx_documents_content_ref', 'content_ref'),
     )
     
     def __repr__(self):
         return f"<Document(id={self.id}, type={self.document_type}, title={self.title})>"
+
+
+# Full-text search index, filled by crud when a document is created (the body
+# lives in the blob store, so it can't be derived from the row). Postgres gets a
+# tsvector column with a GIN index, SQLite a standalone FTS5 table keyed by rowid.
+# Keep in sync with the alembic migrations that add them to existing databases.
+SEARCH_CONTENT_LIMIT = 1000000  # Characters of content indexed (tsvector values are capped at 1MB)
+
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE documents ADD COLUMN search_vector tsvector",
+    "CREATE INDEX idx_documents_search_vector ON documents USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE documents_fts USING fts5(title, content, tokenize='porter unicode61')",
+    """
+    CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.rowid;
+    END
+    """,
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Document.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Document.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Document.__table__, "before_drop", DDL("DROP TABLE IF EXISTS documents_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,341 @@
+"""Bulk export and import of the corpus: documents, chunks and their embeddings.
+
+The export is NDJSON: a header line, one line per document (body included),
+then one line per chunk with its embedding, so another node can be loaded
+without re-embedding. Parquet output (``documents.parquet`` and
+``chunks.parquet`` in a directory) needs ``pyarrow``.
+"""
+import importlib
+import json
+import os
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session, undefer
+from app.core.config import settings
+from app.db import crud
+from app.db.models import Document
+import logging
+logger = logging.getLogger(__name__)
+try:
+    pyarrow = importlib.import_module("pyarrow")
+    parquet = importlib.import_module("pyarrow.parquet")
+except ModuleNotFoundError:
+    pyarrow = parquet = None
+
+EXPORT_FORMAT = "research-assistant-export"
+EXPORT_VERSION = 1
+EXPORT_BATCH_SIZE = 500
+
+DOCUMENT_FIELDS = (
+    "id", "document_type", "status", "filename", "url", "title",
+    "content_hash", "word_count", "created_at", "processed_at", "extra_metadata",
+)
+DATETIME_FIELDS = ("created_at", "processed_at")
+
+
+def _default_vector_store():
+    from app.rag.vector_store import get_vector_store
+    return get_vector_store()
+
+
+def export_header(include_embeddings: bool = True) -> dict:
+    """First record of an export: what produced the embeddings, so an import can check them."""
+    return {
+        "type": "header",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.utcnow().isoformat(),
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_dim": settings.EMBEDDING_DIM,
+        "include_embeddings": include_embeddings
+    }
+
+
+def document_record(document: Document) -> dict:
+    """Export record of a document row, with its full body."""
+    record = {"type": "document"}
+    for field in DOCUMENT_FIELDS:
+        value = getattr(document, field)
+        if field == "id":
+            value = str(value)
+        elif field in DATETIME_FIELDS and value is not None:
+            value = value.isoformat()
+        elif hasattr(value, "value"):
+            value = value.value
+        record[field] = value
+    record["content"] = crud.read_content(document)
+    return record
+
+
+def iter_document_records(db: Session, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Stream every document through a server-side cursor, ``batch_size`` rows per fetch."""
+    statement = (
+        select(Document)
+        .options(undefer(Document.content))
+        .order_by(Document.created_at, Document.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for document in db.execute(statement).scalars():
+        yield document_record(document)
+        # Rows are not needed once written; keep the identity map from growing
+        db.expunge(document)
+
+
+def iter_chunk_records(vector_store, batch_size: int = EXPORT_BATCH_SIZE, include_embeddings: bool = True) -> Iterator[dict]:
+    """Stream every chunk in the vector store, fetched ``batch_size`` at a time."""
+    for batch in vector_store.iter_chunks(batch_size=batch_size, include_embeddings=include_embeddings):
+        for chunk in batch:
+            yield dict(chunk, type="chunk")
+
+
+def iter_export_records(
+    db: Session,
+    vector_store=None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    include_chunks: bool = True,
+    include_embeddings: bool = True
+) -> Iterator[dict]:
+    """Header, then every document, then every chunk."""
+    yield export_header(include_chunks and include_embeddings)
+    yield from iter_document_records(db, batch_size)
+    if include_chunks:
+        vector_store = vector_store or _default_vector_store()
+        yield from iter_chunk_records(vector_store, batch_size, include_embeddings)
+
+
+def iter_ndjson(records: Iterable[dict]) -> Iterator[str]:
+    """Serialize records as NDJSON lines."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def export_ndjson(db: Session, output: IO[str], vector_store=None, **options) -> int:
+    """
+    Write an NDJSON export to a text stream.
+
+    Args:
+        db: Database session
+        output: Writable text stream
+        vector_store: Vector store to read chunks from (defaults to the shared one)
+        **options: Passed to ``iter_export_records``
+
+    Returns:
+        Number of records written, header included
+    """
+    written = 0
+    for line in iter_ndjson(iter_export_records(db, vector_store, **options)):
+        output.write(line)
+        written += 1
+    return written
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise RuntimeError("pyarrow not installed; install it to export or import Parquet")
+
+
+def _parquet_schemas() -> Dict[str, "pyarrow.Schema"]:
+    string = pyarrow.string()
+    documents = [(field, string) for field in DOCUMENT_FIELDS] + [("content", string)]
+    documents[DOCUMENT_FIELDS.index("word_count")] = ("word_count", pyarrow.int64())
+    return {
+        "documents": pyarrow.schema(documents),
+        "chunks": pyarrow.schema([
+            ("id", string),
+            ("content", string),
+            ("metadata", string),
+            ("embedding", pyarrow.list_(pyarrow.float32()))
+        ])
+    }
+
+
+def _write_parquet(path: str, records: Iterable[dict], schema, batch_size: int, header: dict) -> int:
+    """Write records as Parquet row groups of ``batch_size``; dict values are stored as JSON strings."""
+    schema = schema.with_metadata({"export": json.dumps(header)})
+    written, batch = 0, []
+    with parquet.ParquetWriter(path, schema) as writer:
+        def flush():
+            writer.write_table(pyarrow.Table.from_pylist([
+                {key: json.dumps(value) if isinstance(value, dict) else value for key, value in record.items()}
+                for record in batch
+            ], schema=schema))
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+        if batch:
+            flush()
+            written += len(batch)
+    return written
+
+
+def export_parquet(
+    db: Session,
+    directory: str,
+    vector_store=None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    include_chunks: bool = True,
+    include_embeddings: bool = True
+) -> Dict[str, int]:
+    """Write ``documents.parquet`` (and ``chunks.parquet``) to a directory. Returns row counts."""
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    header = export_header(include_chunks and include_embeddings)
+    schemas = _parquet_schemas()
+    counts = {"documents": _write_parquet(
+        os.path.join(directory, "documents.parquet"),
+        iter_document_records(db, batch_size),
+        schemas["documents"],
+        batch_size,
+        header
+    )}
+    if include_chunks:
+        vector_store = vector_store or _default_vector_store()
+        counts["chunks"] = _write_parquet(
+            os.path.join(directory, "chunks.parquet"),
+            iter_chunk_records(vector_store, batch_size, include_embeddings),
+            schemas["chunks"],
+            batch_size,
+            header
+        )
+    return counts
+
+
+def check_header(header: dict, allow_model_mismatch: bool = False) -> None:
+    """Refuse exports whose embeddings don't match this node's embedding model."""
+    if header.get("format") != EXPORT_FORMAT:
+        raise ValueError("Not a document export: missing or unknown header")
+    if header.get("version", 0) > EXPORT_VERSION:
+        raise ValueError(f"Export version {header['version']} is newer than supported ({EXPORT_VERSION})")
+    if not header.get("include_embeddings") or allow_model_mismatch:
+        return
+    if header.get("embedding_model") != settings.EMBEDDING_MODEL or header.get("embedding_dim") != settings.EMBEDDING_DIM:
+        raise ValueError(
+            f"Export embeddings come from {header.get('embedding_model')} ({header.get('embedding_dim')} dims), "
+            f"this node uses {settings.EMBEDDING_MODEL} ({settings.EMBEDDING_DIM} dims)"
+        )
+
+
+def _document_data(record: dict) -> dict:
+    data = {field: record.get(field) for field in DOCUMENT_FIELDS}
+    data["id"] = crud._as_uuid(data["id"])
+    for field in DATETIME_FIELDS:
+        if data[field]:
+            data[field] = datetime.fromisoformat(data[field])
+    if isinstance(data["extra_metadata"], str):
+        data["extra_metadata"] = json.loads(data["extra_metadata"])
+    data["content"] = record.get("content") or ""
+    return data
+
+
+def _chunk_data(record: dict) -> dict:
+    metadata = record.get("metadata")
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    return {"id": record["id"], "content": record["content"], "metadata": metadata, "embedding": record.get("embedding")}
+
+
+def import_records(
+    db: Session,
+    records: Iterable[dict],
+    vector_store=None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    allow_model_mismatch: bool = False
+) -> Dict[str, int]:
+    """
+    Load exported records: documents through the bulk insert path (keeping
+    their IDs), chunks straight into the vector store with their stored
+    embeddings. The embedder is never called.
+
+    Documents whose content_hash already exists are skipped, and so are their
+    chunks (the existing document is already indexed).
+
+    Args:
+        db: Database session
+        records: Export records, header first
+        vector_store: Vector store to write chunks to (defaults to the shared one)
+        batch_size: Documents per insert and chunks per upsert
+        allow_model_mismatch: Import embeddings from a different embedding model
+
+    Returns:
+        Counts of created and duplicate documents, and imported and skipped chunks
+    """
+    counts = {"documents_created": 0, "documents_skipped": 0, "chunks_imported": 0, "chunks_skipped": 0}
+    skipped_ids = set()
+    documents: List[dict] = []
+    chunks: List[dict] = []
+    header: Optional[dict] = None
+
+    def flush_documents():
+        created = crud.create_documents_bulk(db, [_document_data(record) for record in documents])
+        for record, document_id in zip(documents, created):
+            if document_id is None:
+                skipped_ids.add(record["id"])
+                counts["documents_skipped"] += 1
+            else:
+                counts["documents_created"] += 1
+        documents.clear()
+
+    def flush_chunks():
+        nonlocal vector_store
+        vector_store = vector_store or _default_vector_store()
+        vector_store.upsert_chunks(chunks)
+        counts["chunks_imported"] += len(chunks)
+        chunks.clear()
+
+    for record in records:
+        kind = record.get("type")
+        if header is None:
+            if kind != "header":
+                raise ValueError("Not a document export: missing or unknown header")
+            check_header(record, allow_model_mismatch)
+            header = record
+        elif kind == "document":
+            documents.append(record)
+            if len(documents) >= batch_size:
+                flush_documents()
+        elif kind == "chunk":
+            if documents:
+                flush_documents()
+            chunk = _chunk_data(record)
+            if chunk["embedding"] is None:
+                raise ValueError("Export has no embeddings; chunks can't be imported without re-embedding")
+            if str(chunk["metadata"].get("document_id")) in skipped_ids:
+                counts["chunks_skipped"] += 1
+                continue
+            chunks.append(chunk)
+            if len(chunks) >= batch_size:
+                flush_chunks()
+
+    if documents:
+        flush_documents()
+    if chunks:
+        flush_chunks()
+    logger.info(f"import finished: {counts}")
+    return counts
+
+
+def iter_ndjson_records(lines: Iterable) -> Iterator[dict]:
+    """Parse NDJSON lines (str or bytes), skipping blank ones."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_parquet_records(directory: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Read a Parquet export back as records, header first."""
+    _require_pyarrow()
+    documents = parquet.ParquetFile(os.path.join(directory, "documents.parquet"))
+    yield json.loads(documents.schema_arrow.metadata[b"export"])
+    for batch in documents.iter_batches(batch_size=batch_size):
+        for record in batch.to_pylist():
+            yield dict(record, type="document")
+    chunks_path = os.path.join(directory, "chunks.parquet")
+    if os.path.exists(chunks_path):
+        for batch in parquet.ParquetFile(chunks_path).iter_batches(batch_size=batch_size):
+            for record in batch.to_pylist():
+                yield dict(record, type="chunk")
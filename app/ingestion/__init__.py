@@ -1,13 +1,15 @@
 # app/ingestion/__init__.py
-from .pdf_parser import parse_pdf, extract_metadata, validate_pdf
+from .pdf_parser import parse_pdf, iter_pdf_pages, extract_metadata, validate_pdf
 from .web_scraper import scrape_url
-from .cleaner import clean_text
+from .cleaner import clean_text, clean_text_stream
 
 __all__ = [
     "parse_pdf",
+    "iter_pdf_pages",
     "extract_metadata", 
     "validate_pdf",
     "scrape_url",
-    "clean_text"
+    "clean_text",
+    "clean_text_stream"
 ]
 
@@ -1,5 +1,21 @@
 # app/ingestion/cleaner.py
 import re
+from typing import Iterable, Iterator
+
+# Bump when cleaning output changes so cached results are invalidated
+CLEANER_VERSION = "1"
+
+# Precompiled tables for the streaming cleaner
+_URL_PATTERN = re.compile(r'http\S+|www\.\S+')
+_URL_START = re.compile(r'http\S|www\.\S')
+_LAST_WHITESPACE = re.compile(r'.*\s', re.DOTALL)
+_FIRST_WHITESPACE = re.compile(r'\s')
+_ALLOWED_BYTES = set(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .,;:'\"!?()-\n")
+_DELETE_BYTES = bytes(b for b in range(128) if b not in _ALLOWED_BYTES)
+_SEPARATORS = (ord(" "), ord("\n"))
+
+# Size of the slices clean_text feeds through the streaming cleaner
+_WINDOW_SIZE = 1024 * 1024
 
 
 def remove_extra_whitespace(text: str) -> str:
@@ -17,22 +33,120 @@ def remove_special_chars(text: str) -> str:
     return re.sub(r'[^A-Za-z0-9 .,;:\'"!?()\-\n]', '', text)
 
 
+class StreamingCleaner:
+    """Single-pass equivalent of ``clean_text`` over a stream of text pieces.
+
+    Produces exactly what ``clean_text("".join(pieces))`` would, while only
+    holding one piece plus a bounded carry-over in memory:
+
+    - URLs are removed per piece, cut at the last whitespace so a URL never
+      straddles two pieces.
+    - Every allowed character is ASCII, so non-ASCII text is dropped by the
+      encoder and disallowed ASCII by a precompiled ``bytes.translate`` table.
+    - Only spaces and newlines survive filtering, so they are the only word
+      separators; runs of them collapse to one space across piece borders.
+    """
+
+    def __init__(self, max_carry: int = 64 * 1024):
+        self.max_carry = max_carry
+        self._carry = ""
+        self._skipping_url = False  # Inside a URL that continues into the next piece
+        self._emitted = False
+        self._pending_space = False
+
+    def _clean_segment(self, segment: str) -> str:
+        if not segment:
+            return ""
+        if "http" in segment or "www." in segment:
+            segment = _URL_PATTERN.sub("", segment)
+
+        data = segment.encode("ascii", "ignore").translate(None, _DELETE_BYTES)
+        if not data:
+            return ""
+
+        words = data.split()
+        if not words:
+            self._pending_space = True
+            return ""
+
+        out = b" ".join(words)
+        if self._emitted and (self._pending_space or data[0] in _SEPARATORS):
+            out = b" " + out
+        self._emitted = True
+        self._pending_space = data[-1] in _SEPARATORS
+        return out.decode("ascii")
+
+    def feed(self, piece: str) -> str:
+        """Clean the next piece of text and return the output that is final."""
+        if self._skipping_url:
+            match = _FIRST_WHITESPACE.search(piece)
+            if match is None:
+                return ""
+            piece = piece[match.start():]
+            self._skipping_url = False
+
+        buffer = self._carry + piece if self._carry else piece
+
+        # Hold back the trailing non-whitespace run: it may be an unfinished URL
+        match = _LAST_WHITESPACE.match(buffer)
+        cut = match.end() if match else 0
+        segment, self._carry = buffer[:cut], buffer[cut:]
+        out = self._clean_segment(segment)
+
+        if len(self._carry) > self.max_carry:
+            # A single huge token: flush what can no longer change
+            url = _URL_START.search(self._carry)
+            if url:
+                segment, self._carry = self._carry[:url.start()], ""
+                self._skipping_url = True
+            else:
+                # Keep enough to recognise an "http"/"www." prefix completed later
+                segment, self._carry = self._carry[:-4], self._carry[-4:]
+            out += self._clean_segment(segment)
+
+        return out
+
+    def finish(self) -> str:
+        """Flush the remaining carry-over."""
+        carry, self._carry = self._carry, ""
+        if self._skipping_url:
+            return ""
+        return self._clean_segment(carry)
+
+
+def clean_text_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Clean text arriving in pieces (PDF pages, file chunks...).
+
+    Args:
+        pieces: Iterable of text pieces
+
+    Yields:
+        Cleaned output; joined, it equals ``clean_text("".join(pieces))``
+    """
+    cleaner = StreamingCleaner()
+    for piece in pieces:
+        out = cleaner.feed(piece)
+        if out:
+            yield out
+    out = cleaner.finish()
+    if out:
+        yield out
+
+
 def clean_text(text: str) -> str:
     """
     Clean and normalize text.
-    
+
     Args:
         text: Input text to clean
-        
+
     Returns:
         Cleaned text
     """
     if not text:
         return ""
-    
-    # Apply cleaning steps
-    text = remove_urls(text)
-    text = remove_special_chars(text)
-    text = remove_extra_whitespace(text)
-    
-    return text.strip()
+
+    # Remove URLs and unwanted symbols, then collapse whitespace, in one pass
+    windows = (text[i:i + _WINDOW_SIZE] for i in range(0, len(text), _WINDOW_SIZE))
+    return "".join(clean_text_stream(windows))
@@ -0,0 +1,336 @@
+# app/ingestion/crawler.py
+import asyncio
+import json
+import os
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from app.ingestion.web_scraper import AsyncWebScraper
+import logging
+logger = logging.getLogger(__name__)
+
+# Links to files we can't extract text from are never queued
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".tar", ".png", ".jpg", ".jpeg", ".gif", ".svg",
+    ".webp", ".ico", ".mp3", ".mp4", ".avi", ".mov", ".css", ".js", ".woff", ".woff2"
+)
+
+# Keep only the most recent errors in progress reports and checkpoints
+MAX_REPORTED_ERRORS = 50
+
+
+def _progress_report(state: dict, done_count: int) -> dict:
+    """Build the public progress report from crawl state."""
+    return {
+        "crawl_id": state["crawl_id"],
+        "status": state["status"],
+        "pages_fetched": state["pages_fetched"],
+        "pages_failed": state["pages_failed"],
+        "documents_created": state["documents_created"],
+        "duplicates": state["duplicates"],
+        "queued": max(len(state["depths"]) - done_count, 0),
+        "errors": state["errors"][-10:],
+        "started_at": state["started_at"],
+        "updated_at": state["updated_at"]
+    }
+
+
+def parse_sitemap(xml_text: str) -> Dict[str, List[str]]:
+    """
+    Parse a sitemap or sitemap index.
+
+    Args:
+        xml_text: Sitemap XML
+
+    Returns:
+        Dictionary with page ``urls`` and nested ``sitemaps``
+    """
+    root = ET.fromstring(xml_text)
+    urls, sitemaps = [], []
+    for element in root.iter():
+        if not element.tag.endswith("loc") or not element.text:
+            continue
+        # Ignore XML namespaces: {ns}sitemap/{ns}loc vs {ns}url/{ns}loc
+        target = sitemaps if root.tag.endswith("sitemapindex") else urls
+        target.append(element.text.strip())
+    return {"urls": urls, "sitemaps": sitemaps}
+
+
+class SiteCrawler:
+    """Concurrent, polite crawler that feeds pages to a batch ingester.
+
+    Progress is checkpointed to a JSON file after every ingested batch. A
+    crawl started again with the same checkpoint resumes from the pages that
+    were fetched but not yet ingested, plus everything still queued.
+
+    ``on_batch`` returns ``created`` and ``duplicates`` counts and, optionally,
+    ``failed`` (URL -> error). Pages it reports as failed, and every page of a
+    batch it raised on, are not marked done, so a resume retries them.
+    """
+
+    def __init__(
+        self,
+        scraper: AsyncWebScraper,
+        on_batch: Callable[[List[dict]], Awaitable[dict]],
+        checkpoint_path: str,
+        max_depth: int = 0,
+        max_pages: int = 1000,
+        allowed_domains: Optional[List[str]] = None,
+        concurrency: int = 8,
+        delay: float = 0.5,
+        batch_size: int = 50,
+        respect_robots: bool = True
+    ):
+        self.scraper = scraper
+        self.on_batch = on_batch
+        self.checkpoint_path = checkpoint_path
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allowed_domains = {d.lower() for d in allowed_domains or []}
+        self.concurrency = concurrency
+        self.delay = delay
+        self.batch_size = batch_size
+        self.respect_robots = respect_robots
+
+        self.state = self._load_checkpoint() or {
+            "crawl_id": os.path.splitext(os.path.basename(checkpoint_path))[0],
+            "status": "pending",
+            "allowed_domains": sorted(self.allowed_domains),
+            "max_depth": max_depth,
+            "max_pages": max_pages,
+            "depths": {},       # Every URL ever queued -> crawl depth
+            "done": [],         # URLs whose batch has been ingested
+            "pages_fetched": 0,
+            "pages_failed": 0,
+            "documents_created": 0,
+            "duplicates": 0,
+            "errors": [],
+            "started_at": datetime.utcnow().isoformat(),
+            "updated_at": None
+        }
+        # A resumed crawl keeps the limits it was started with
+        self.allowed_domains = self.allowed_domains or set(self.state.get("allowed_domains", []))
+        self.max_depth = self.state.get("max_depth", max_depth)
+        self.max_pages = self.state.get("max_pages", max_pages)
+        self._done = set(self.state["done"])
+        self._batch: List[dict] = []
+        self._batch_lock = asyncio.Lock()
+        self._ingest_lock = asyncio.Lock()
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_last_request: Dict[str, float] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self) -> None:
+        self.state["done"] = list(self._done)
+        self.state["updated_at"] = datetime.utcnow().isoformat()
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _record_error(self, url: str, error: str) -> None:
+        self.state["pages_failed"] += 1
+        self.state["errors"] = (self.state["errors"] + [f"{url}: {error}"])[-MAX_REPORTED_ERRORS:]
+
+    def get_progress(self) -> dict:
+        """Return a JSON-serialisable progress report."""
+        return _progress_report(self.state, len(self._done))
+
+
+    def _is_allowed_domain(self, url: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        if not self.allowed_domains:
+            return True
+        return any(host == d or host.endswith(f".{d}") for d in self.allowed_domains)
+
+    async def _robots_for(self, url: str) -> Optional[RobotFileParser]:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._robots:
+            parser = None
+            try:
+                response = await self.scraper.client.get(f"{origin}/robots.txt")
+                if response.status_code == 200:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+            except Exception as e:
+                logger.info(f"Could not read robots.txt for {origin}: {e}")
+            self._robots[origin] = parser
+        return self._robots[origin]
+
+    async def _can_fetch(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        robots = await self._robots_for(url)
+        return robots is None or robots.can_fetch("*", url)
+
+    async def _wait_for_host(self, url: str) -> None:
+        """Space out requests to the same host by at least ``delay`` seconds."""
+        host = urlsplit(url).netloc.lower()
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self.delay
+            robots = self._robots.get(f"{urlsplit(url).scheme}://{urlsplit(url).netloc}")
+            if robots is not None and robots.crawl_delay("*"):
+                delay = max(delay, float(robots.crawl_delay("*")))
+            wait = self._host_last_request.get(host, 0.0) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_last_request[host] = time.monotonic()
+
+
+    def _enqueue(self, queue: asyncio.Queue, url: str, depth: int) -> None:
+        if url in self.state["depths"] or len(self.state["depths"]) >= self.max_pages:
+            return
+        if not self._is_allowed_domain(url):
+            return
+        if urlsplit(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+            return
+        self.state["depths"][url] = depth
+        queue.put_nowait((url, depth))
+
+    async def expand_sitemap(self, sitemap_url: str, max_sitemaps: int = 100) -> List[str]:
+        """Collect page URLs from a sitemap, following nested sitemap indexes."""
+        pending, urls, visited = [sitemap_url], [], set()
+        while pending and len(visited) < max_sitemaps:
+            current = pending.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            try:
+                response = await self.scraper.client.get(current)
+                response.raise_for_status()
+                parsed = parse_sitemap(response.text)
+            except Exception as e:
+                self._record_error(current, f"sitemap: {e}")
+                continue
+            urls.extend(parsed["urls"])
+            pending.extend(parsed["sitemaps"])
+        return urls
+
+
+    async def _flush(self, force: bool = False) -> None:
+        # Take the batch under the lock, ingest outside it: fetch workers keep
+        # filling the next batch meanwhile. Ingests themselves run one at a time.
+        async with self._batch_lock:
+            if not self._batch or (len(self._batch) < self.batch_size and not force):
+                return
+            batch, self._batch = self._batch, []
+
+        async with self._ingest_lock:
+            try:
+                result = await self.on_batch(batch)
+            except Exception as e:
+                # Not marked done: a resume fetches and ingests these pages again
+                logger.error(f"Batch ingest failed: {e}")
+                for page in batch:
+                    self._record_error(page["url"], f"ingest: {e}")
+                self._save_checkpoint()
+                return
+
+            self.state["documents_created"] += result.get("created", 0)
+            self.state["duplicates"] += result.get("duplicates", 0)
+            failed = result.get("failed", {})
+            for url, error in failed.items():
+                self._record_error(url, f"ingest: {error}")
+            self._done.update(page["url"] for page in batch if page["url"] not in failed)
+            self._save_checkpoint()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            url, depth = await queue.get()
+            try:
+                if not await self._can_fetch(url):
+                    self._done.add(url)
+                    continue
+                await self._wait_for_host(url)
+                page = await self.scraper.scrape(url, include_links=depth < self.max_depth)
+                self.state["pages_fetched"] += 1
+
+                for link in page.pop("links", []):
+                    self._enqueue(queue, link, depth + 1)
+
+                self._batch.append(page)
+                await self._flush()
+            except Exception as e:
+                self._record_error(url, str(e))
+                self._done.add(url)
+            finally:
+                queue.task_done()
+
+    async def crawl(self, urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None) -> dict:
+        """
+        Crawl seed URLs and/or a sitemap, ingesting pages in batches.
+
+        Args:
+            urls: Seed URLs (crawl depth 0)
+            sitemap_url: Sitemap or sitemap index to expand into seeds
+
+        Returns:
+            Final progress report
+        """
+        self.state["status"] = "running"
+        queue: asyncio.Queue = asyncio.Queue()
+
+        # Resume: everything queued earlier but not ingested yet
+        for url, depth in self.state["depths"].items():
+            if url not in self._done:
+                queue.put_nowait((url, depth))
+
+        seeds = list(urls or [])
+        if sitemap_url:
+            seeds.extend(await self.expand_sitemap(sitemap_url))
+        if not self.allowed_domains:
+            # Default to staying on the seed sites
+            self.allowed_domains = {urlsplit(url).hostname.lower() for url in seeds if urlsplit(url).hostname}
+        self.state["allowed_domains"] = sorted(self.allowed_domains)
+        for url in seeds:
+            self._enqueue(queue, url, 0)
+        self._save_checkpoint()
+
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+            await self._flush(force=True)
+            self.state["status"] = "completed"
+        except asyncio.CancelledError:
+            self.state["status"] = "cancelled"
+            raise
+        except Exception as e:
+            self.state["status"] = "failed"
+            self._record_error("crawl", str(e))
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._save_checkpoint()
+
+        logger.info(
+            f"Crawl {self.state['crawl_id']} {self.state['status']}: "
+            f"{self.state['pages_fetched']} fetched, {self.state['documents_created']} ingested"
+        )
+        return self.get_progress()
+
+
+def new_crawl_id() -> str:
+    """Generate a crawl ID."""
+    return str(uuid.uuid4())
+
+
+def load_crawl_progress(checkpoint_path: str) -> Optional[dict]:
+    """Read the progress report of a crawl from its checkpoint, if any."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return _progress_report(state, len(state["done"]))
@@ -0,0 +1,159 @@
+# app/ingestion/html_extract.py
+"""Pluggable HTML text extraction backends for the web scraper."""
+import importlib
+import re
+from typing import List, Optional
+from urllib.parse import urldefrag, urljoin, urlsplit
+from bs4 import BeautifulSoup
+from app.core.config import settings
+import logging
+logger = logging.getLogger(__name__)
+try:
+    lxml_html = importlib.import_module("lxml.html")
+    lxml_etree = importlib.import_module("lxml.etree")
+except ModuleNotFoundError:
+    lxml_html = None
+    lxml_etree = None
+
+# Elements that never contain readable text
+NON_CONTENT_TAGS = ["script", "style", "noscript"]
+
+# Elements that usually hold navigation or page chrome rather than content
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside", "form", "template", "iframe", "svg", "button"]
+BOILERPLATE_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|footer|header|sidebar|cookie|banner|advert|ads|share|social|related|comments?)([\s_-]|$)",
+    re.IGNORECASE
+)
+
+# Blocks considered when looking for the main content container
+CONTENT_BLOCK_TAGS = ("div", "section", "td", "article", "main")
+
+
+def _absolute_links(hrefs, base_url: str) -> List[str]:
+    links = []
+    seen = set()
+    for href in hrefs:
+        link, _ = urldefrag(urljoin(base_url, href.strip()))
+        if urlsplit(link).scheme in ("http", "https") and link not in seen:
+            seen.add(link)
+            links.append(link)
+    return links
+
+
+class BS4Extractor:
+    """Pure-Python extraction with BeautifulSoup's ``html.parser``."""
+
+    name = "bs4"
+    version = "bs4-1"
+
+    def extract(self, html: str) -> dict:
+        soup = BeautifulSoup(html, "html.parser")
+        title = soup.title.string if soup.title and soup.title.string else "Untitled"
+
+        # Remove unwanted elements
+        for tag in soup(NON_CONTENT_TAGS):
+            tag.decompose()
+
+        text = " ".join(soup.stripped_strings)
+        return {"title": title.strip(), "content": text}
+
+    def extract_links(self, html: str, base_url: str) -> List[str]:
+        soup = BeautifulSoup(html, "html.parser")
+        return _absolute_links((a["href"] for a in soup.find_all("a", href=True)), base_url)
+
+
+class LxmlExtractor:
+    """C-accelerated extraction with lxml.
+
+    With ``main_content=True`` boilerplate (navigation, headers, footers,
+    sidebars...) is dropped and only the main content container is kept:
+    ``<main>``/``<article>`` when present, otherwise the block holding the
+    most paragraph text.
+    """
+
+    name = "lxml"
+
+    def __init__(self, main_content: bool = False):
+        if lxml_html is None:
+            raise RuntimeError("lxml not installed")
+        self.main_content = main_content
+        self.version = "lxml-main-1" if main_content else "lxml-1"
+
+    def _parse(self, html: str):
+        # lxml rejects str input that carries an XML encoding declaration
+        return lxml_html.document_fromstring(html.encode("utf-8"), parser=lxml_html.HTMLParser(encoding="utf-8"))
+
+    def extract(self, html: str) -> dict:
+        if not html or not html.strip():
+            return {"title": "Untitled", "content": ""}
+
+        root = self._parse(html)
+        title = (root.findtext(".//title") or "").strip() or "Untitled"
+
+        lxml_etree.strip_elements(root, *NON_CONTENT_TAGS, with_tail=False)
+
+        # Like the bs4 backend, full-page mode keeps the <head> text (the title)
+        node = root
+        if self.main_content:
+            body = root.find("body")
+            node = body if body is not None else root
+            self._strip_boilerplate(node)
+            node = self._main_block(node)
+
+        text = " ".join(s for s in (t.strip() for t in node.itertext()) if s)
+        return {"title": title, "content": text}
+
+    def _strip_boilerplate(self, node) -> None:
+        lxml_etree.strip_elements(node, *BOILERPLATE_TAGS, with_tail=False)
+        for element in list(node.iter(lxml_etree.Element)):
+            marker = f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}"
+            if element.getparent() is not None and BOILERPLATE_PATTERN.search(marker):
+                element.drop_tree()
+
+    def _main_block(self, node):
+        for xpath in (".//main", ".//article", ".//*[@role='main']"):
+            candidates = node.xpath(xpath)
+            if candidates:
+                return max(candidates, key=lambda el: len(el.text_content()))
+
+        # Score blocks by the paragraph text they directly contain
+        best, best_score = node, 0
+        for element in node.iter(*CONTENT_BLOCK_TAGS):
+            score = sum(len(p.text_content()) for p in element.findall("p"))
+            if score > best_score:
+                best, best_score = element, score
+
+        # Only narrow down when the block holds a meaningful share of the text
+        total = len(node.text_content()) or 1
+        return best if best_score / total >= 0.25 else node
+
+    def extract_links(self, html: str, base_url: str) -> List[str]:
+        if not html or not html.strip():
+            return []
+        root = self._parse(html)
+        return _absolute_links(root.xpath("//a/@href"), base_url)
+
+
+def get_extractor(name: Optional[str] = None, main_content: Optional[bool] = None):
+    """
+    Get an HTML extraction backend.
+
+    Args:
+        name: Backend name ("bs4" or "lxml"); defaults to settings.HTML_EXTRACTOR
+        main_content: Drop boilerplate and keep the main content only (lxml);
+            defaults to settings.HTML_MAIN_CONTENT_ONLY
+
+    Returns:
+        Extractor instance with ``extract`` and ``extract_links`` methods
+    """
+    name = (name or settings.HTML_EXTRACTOR).lower()
+    main_content = settings.HTML_MAIN_CONTENT_ONLY if main_content is None else main_content
+
+    if name == "lxml":
+        if lxml_html is not None:
+            return LxmlExtractor(main_content=main_content)
+        logger.warning("lxml not installed, falling back to the bs4 HTML extractor")
+    elif name != "bs4":
+        raise ValueError(f"Unknown HTML extractor: '{name}'")
+
+    return BS4Extractor()
@@ -1,27 +1,42 @@
 # app/ingestion/pdf_parser.py
 import fitz  # PyMuPDF
+from typing import Iterator
 
+# Bump when extraction output changes so cached parses are invalidated
+PARSER_VERSION = "pymupdf-text-1"
 
-def parse_pdf(file_path: str) -> str:
+
+def iter_pdf_pages(file_path: str) -> Iterator[str]:
     """
-    Extract text from PDF using PyMuPDF.
+    Yield the text of a PDF one page at a time.
     
     Args:
         file_path: Path to the PDF file
         
-    Returns:
-        Extracted text content
+    Yields:
+        Text of each page
     """
-    text = ""
     try:
         with fitz.open(file_path) as pdf:
             for page in pdf:
-                text += page.get_text("text")
-        return text.strip()
+                yield page.get_text("text")
     except Exception as e:
         raise Exception(f"Failed to parse PDF: {str(e)}")
 
 
+def parse_pdf(file_path: str) -> str:
+    """
+    Extract text from PDF using PyMuPDF.
+    
+    Args:
+        file_path: Path to the PDF file
+        
+    Returns:
+        Extracted text content
+    """
+    return "".join(iter_pdf_pages(file_path)).strip()
+
+
 def extract_metadata(file_path: str) -> dict:
     """
     Extract metadata from PDF.
@@ -1,48 +1,287 @@
 # app/ingestion/web_scraper.py
+import asyncio
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
 import requests
 from bs4 import BeautifulSoup
+from app.core.cache import DiskCache, get_processed_cache, make_cache_key
+from app.ingestion.html_extract import get_extractor
+from app.core.config import settings
+from app.core.utils import calculate_content_hash
+import os
+import logging
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes so cached results are invalidated
+# (the extraction backend's own version is part of the cache key too)
+SCRAPER_VERSION = "2"
+
+# Shared session so repeated synchronous scrapes reuse connections
+_session = requests.Session()
+
+
+def extract_content(html: str) -> dict:
+    """
+    Extract title and visible text from an HTML page.
+
+    Args:
+        html: Raw HTML
+
+    Returns:
+        Dictionary with title and content
+    """
+    extractor = get_extractor()
+
+    # Reuse a previous extraction of the exact same page body
+    cache = get_processed_cache()
+    cache_key = make_cache_key("scrape", calculate_content_hash(html), SCRAPER_VERSION, extractor.version)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = extractor.extract(html)
+    cache.set(cache_key, result)
+    return result
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """
+    Extract absolute http(s) links from an HTML page.
+
+    Args:
+        html: Raw HTML
+        base_url: URL the page was fetched from
+
+    Returns:
+        De-duplicated list of absolute URLs without fragments
+    """
+    return get_extractor().extract_links(html, base_url)
 
 
 def scrape_url(url: str) -> dict:
     """
     Scrape a webpage and return title + clean text.
-    
+
     Args:
         url: URL to scrape
-        
+
     Returns:
         Dictionary with title, url, and content
     """
     try:
-        response = requests.get(url, timeout=10)
+        response = _session.get(url, timeout=10)
+        response.raise_for_status()
+
+        return {**extract_content(response.text), "url": url}
+    except Exception as e:
+        raise Exception(f"Failed to scrape URL: {str(e)}")
+
+
+class AsyncWebScraper:
+    """Concurrent scraper with a pooled HTTP client and conditional GETs.
+
+    Validators (ETag / Last-Modified) and the extracted text of every fetched
+    page are kept in a local cache. A ``304 Not Modified`` response is served
+    from that cache and flagged with ``not_modified=True`` so callers can skip
+    re-cleaning and re-embedding unchanged pages.
+
+    The HTTP client and per-host semaphores belong to the event loop that
+    created them; used from another loop, the scraper starts new ones.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        per_host_limit: int = 4,
+        timeout: float = 10.0,
+        cache: Optional[DiskCache] = None
+    ):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The previous loop's client can't be closed from here; its loop is gone or busy
+            self._client = None
+            self._host_limits = {}
+            self._loop = loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        self._bind_loop()
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": settings.SCRAPER_USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._host_limits = {}
+        self._loop = None
+
+    async def __aenter__(self) -> "AsyncWebScraper":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        self._bind_loop()
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str, require_fields: tuple = ()) -> dict:
+        """Fetch a page, revalidating against the cache when possible.
+
+        Validators are only sent when the cached entry holds every field in
+        ``require_fields``; otherwise the full page is downloaded again.
+
+        Returns a dictionary with ``html`` (None when not modified), the
+        cached entry (if any), the final URL and the ``not_modified`` flag.
+        """
+        cache_key = make_cache_key("http", url)
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached and not all(field in cached for field in require_fields):
+            cached = None
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._host_limit(url):
+            response = await self.client.get(url, headers=headers)
+
+        if response.status_code == 304 and cached:
+            return {"url": url, "html": None, "cached": cached, "not_modified": True}
+
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        title = soup.title.string if soup.title else "Untitled"
-        
-        # Remove unwanted elements
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        
-        text = " ".join(soup.stripped_strings)
-        
         return {
-            "title": title.strip(),
             "url": url,
-            "content": text
+            "final_url": str(response.url),
+            "html": response.text,
+            "cached": cached,
+            "not_modified": False,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
         }
-    except Exception as e:
-        raise Exception(f"Failed to scrape URL: {str(e)}")
+
+    async def scrape(self, url: str, include_links: bool = False) -> dict:
+        """
+        Scrape a webpage and return title + text.
+
+        Args:
+            url: URL to scrape
+            include_links: Also return the page's outgoing links
+
+        Returns:
+            Dictionary with title, url, content and not_modified
+            (plus links when requested)
+        """
+        try:
+            fetched = await self.fetch(url, require_fields=("links",) if include_links else ())
+
+            if fetched["not_modified"]:
+                cached = fetched["cached"]
+                result = {
+                    "title": cached["title"],
+                    "url": url,
+                    "content": cached["content"],
+                    "not_modified": True
+                }
+                if include_links:
+                    result["links"] = cached["links"]
+                return result
+
+            # Parsing is CPU bound; keep it off the event loop
+            extracted = await asyncio.to_thread(extract_content, fetched["html"])
+            if include_links:
+                extracted = {
+                    **extracted,
+                    "links": await asyncio.to_thread(extract_links, fetched["html"], fetched["final_url"])
+                }
+
+            if self.cache is not None and (fetched["etag"] or fetched["last_modified"]):
+                self.cache.set(make_cache_key("http", url), {
+                    "etag": fetched["etag"],
+                    "last_modified": fetched["last_modified"],
+                    **extracted
+                })
+
+            return {**extracted, "url": url, "not_modified": False}
+        except Exception as e:
+            raise Exception(f"Failed to scrape URL: {str(e)}")
+
+    async def scrape_many(self, urls: List[str]) -> List[dict]:
+        """Scrape several URLs concurrently.
+
+        Failed URLs are returned as ``{"url": ..., "error": ...}`` entries so
+        one bad page does not abort the whole batch.
+        """
+        async def _scrape(url: str) -> dict:
+            try:
+                return await self.scrape(url)
+            except Exception as e:
+                logger.warning(str(e))
+                return {"url": url, "error": str(e)}
+
+        return await asyncio.gather(*(_scrape(url) for url in urls))
+
+
+# Singleton instance
+_async_scraper = None
+def get_async_scraper() -> AsyncWebScraper:
+    """Get or create the shared async scraper (singleton pattern)."""
+    global _async_scraper
+    if _async_scraper is None:
+        _async_scraper = AsyncWebScraper(
+            max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            per_host_limit=settings.SCRAPER_PER_HOST_LIMIT,
+            timeout=settings.SCRAPER_TIMEOUT,
+            cache=DiskCache(
+                os.path.join(settings.CACHE_DIR, "http"),
+                settings.SCRAPER_HTTP_CACHE_MAX_BYTES
+            )
+        )
+    return _async_scraper
+
+
+async def close_async_scraper() -> None:
+    """Close the shared scraper's connection pool."""
+    global _async_scraper
+    if _async_scraper is not None:
+        await _async_scraper.aclose()
+        _async_scraper = None
 
 
 def extract_metadata(url: str, soup: BeautifulSoup) -> dict:
     """
     Extract metadata from the webpage.
-    
+
     Args:
         url: URL of the webpage
         soup: BeautifulSoup object
-        
+
     Returns:
         Dictionary containing metadata
     """
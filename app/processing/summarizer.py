@@ -27,7 +27,7 @@ class DocumentSummarizer:
         
         # Generate summary
         try:
-            summary = generate_response(prompt)
+            summary = generate_response(prompt, cache=True)
             return summary.strip()
         except Exception as e:
             # Fallback to naive summary
@@ -88,7 +88,13 @@ Bullet Point Summary:"""
         combined_text = "\n\n".join(chunk_summaries)
         return self.summarize(combined_text, summary_type="detailed")
 # Convenience function (backward compatible)
-_summarizer = DocumentSummarizer()
+_summarizer = None
+def get_summarizer() -> DocumentSummarizer:
+    """Get or create summarizer instance."""
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = DocumentSummarizer()
+    return _summarizer
 def summarize(text: str) -> str:
     """Generate brief summary of text."""
-    return _summarizer.summarize(text, summary_type="brief")
\ No newline at end of file
+    return get_summarizer().summarize(text, summary_type="brief")
\ No newline at end of file
@@ -1,15 +1,23 @@
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import Document
 from typing import List, Dict, Optional
+from app.core.cache import make_cache_key
+from app.core.utils import calculate_content_hash
+import json
+import uuid
+
+# Bump when chunk boundaries change so cached chunk lists are invalidated
+CHUNKER_VERSION = "sentence-1"
 class DocumentChunker:
     """Chunk documents using LlamaIndex."""
     
-    def __init__(self, chunk_size=500, chunk_overlap=50, document_type="text"):
-        """Initialize chunker."""
+    def __init__(self, chunk_size=500, chunk_overlap=50, document_type="text", cache=None):
+        """Initialize chunker. ``cache`` optionally stores chunk texts across runs."""
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.document_type = document_type
+        self.cache = cache
         
+        # Imported here: llama_index takes seconds to import
+        from llama_index.core.node_parser import SentenceSplitter
         self.splitter = SentenceSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -22,6 +30,7 @@ class DocumentChunker:
         if not document_id:
             raise ValueError("document_id required")
         
+        from llama_index.core.schema import Document
         doc = Document(
             text=content,
             metadata={
@@ -31,6 +40,29 @@ class DocumentChunker:
             }
         )
         
+        # Chunk boundaries depend on the metadata length, so it is part of the key
+        cache_key = make_cache_key(
+            "chunks",
+            calculate_content_hash(content),
+            json.dumps(doc.metadata, sort_keys=True, default=str),
+            CHUNKER_VERSION,
+            self.chunk_size,
+            self.chunk_overlap
+        )
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            return [
+                {
+                    "content": text,
+                    "document_id": document_id,
+                    "chunk_index": i,
+                    "total_chunks": len(cached),
+                    "node_id": str(uuid.uuid4()),
+                    "metadata": dict(doc.metadata)
+                }
+                for i, text in enumerate(cached)
+            ]
+        
         nodes = self.splitter.get_nodes_from_documents([doc])
         
         chunks = []
@@ -44,6 +76,9 @@ class DocumentChunker:
                 "metadata": node.metadata
             })
         
+        if self.cache is not None:
+            self.cache.set(cache_key, [chunk["content"] for chunk in chunks])
+        
         return chunks
     
     def get_stats(self, chunks):
@@ -1,8 +1,8 @@
-import tiktoken
 from typing import Optional
 class TokenCounter:
     
     def __init__(self, encoding_name: str = "cl100k_base"):
+        import tiktoken  # Imported and loaded on first use, not at module import
         self.encoding = tiktoken.get_encoding(encoding_name)
         self.encoding_name = encoding_name
     
@@ -45,13 +45,19 @@ class TokenCounter:
         
         return input_cost + output_cost
 
-_counter = TokenCounter()
+_counter = None
+def get_token_counter() -> TokenCounter:
+    """Get or create token counter instance."""
+    global _counter
+    if _counter is None:
+        _counter = TokenCounter()
+    return _counter
 def count_tokens(text: str) -> int:
     """Count tokens in text."""
-    return _counter.count_tokens(text)
+    return get_token_counter().count_tokens(text)
 def count_tokens_batch(texts: list[str]) -> list[int]:
     """Count tokens for multiple texts."""
-    return _counter.count_tokens_batch(texts)
+    return get_token_counter().count_tokens_batch(texts)
 def truncate_to_tokens(text: str, max_tokens: int) -> str:
     """Truncate text to max tokens."""
-    return _counter.truncate_to_tokens(text, max_tokens)
\ No newline at end of file
+    return get_token_counter().truncate_to_tokens(text, max_tokens)
\ No newline at end of file
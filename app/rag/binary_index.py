@@ -0,0 +1,280 @@
+"""Sign-bit quantized index for two-stage search: Hamming shortlist, float32 rescoring."""
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.file_lock import file_lock
+import logging
+logger = logging.getLogger(__name__)
+
+if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+    _popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(codes: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[codes]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """One bit per dimension (1 where positive), packed 8 to a byte: 96 bytes for 768 dims."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+class BinaryIndex:
+    """Packed sign bits of every chunk embedding, searched by Hamming distance.
+
+    The codes are held in memory. The L2-normalized float32 vectors they came
+    from stay on disk, memory-mapped, and only the rows of a shortlist are
+    read to rescore it. Chunks added after ``build`` are kept in memory until
+    the next build, and so are the IDs of chunks deleted since.
+
+    Every build goes to a new version directory under ``directory``; the
+    ``CURRENT`` file names the live one and is replaced atomically. Builds are
+    serialized by a file lock, so API workers compacting at the same time
+    take turns, and a worker that waited behind a build started after it
+    asked reuses that build. Workers pick up each other's builds on their next
+    search (``refresh``). Chunks added or deleted by another worker are only
+    in its memory: they reach this worker with the next build (deleted ones
+    are also dropped at search time, see ``ChromaVectorStore.search_binary``).
+    """
+
+    CURRENT = "CURRENT"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.codes: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.document_ids: List[str] = []
+        self._row_documents: Optional[np.ndarray] = None  # Index into document_ids per row
+        self._document_index: Dict[str, int] = {}
+        self._added: List[Tuple[str, str, np.ndarray]] = []
+        self._removed: set = set()  # Chunk IDs deleted since the build
+        self._version: Optional[str] = None  # Loaded version directory
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._added)
+
+    @property
+    def loaded(self) -> bool:
+        return self.codes is not None
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, self.CURRENT), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _swap_in(self, version: str, previous: Optional[str]) -> None:
+        """Point CURRENT at ``version``, then delete older versions. Call with the build lock held."""
+        pointer = os.path.join(self.directory, self.CURRENT)
+        with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp", pointer)
+        # The previous version stays: other workers may be loading it right now
+        for name in os.listdir(self.directory):
+            if name in (self.CURRENT, version, previous):
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)  # Files of the layout before versions
+
+    def build(self, batches: Iterable[List[Dict]], total: int) -> int:
+        """
+        Build the index from chunk batches and swap it in.
+
+        Args:
+            batches: Lists of chunks with ``id``, ``metadata`` and ``embedding``
+                (consumed only if this worker ends up building)
+            total: Upper bound on the number of chunks (sizes the vector file)
+
+        Returns:
+            Number of chunks indexed
+        """
+        requested = time.time_ns()
+        with self._lock:
+            # Chunks written or deleted from here on may be missed by this build
+            removed_before = set(self._removed)
+            added_before = {id(entry) for entry in self._added}
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(f"{self.directory}.lock"):
+            previous = self._current_version()
+            if previous is not None and int(previous.split("-")[0]) > requested:
+                # Another worker started a build after we asked: it read everything we would
+                logger.info(f"binary index built by another worker meanwhile: {previous}")
+                self.load()
+            else:
+                version = f"{time.time_ns():020d}-{os.getpid()}"
+                if not self._write_version(version, batches, total):
+                    return 0
+                self._swap_in(version, previous)
+                self.load()
+
+        with self._lock:
+            included = set(self.ids)
+            # Keep what the build may have missed: writes after it started, and rows paging skipped
+            self._added = [
+                entry for entry in self._added if id(entry) not in added_before or entry[0] not in included
+            ]
+            self._removed -= removed_before
+            row = len(self.ids)
+        logger.info(f"binary index built: {row} chunks")
+        return row
+
+    def _write_version(self, version: str, batches: Iterable[List[Dict]], total: int) -> bool:
+        """Write a version directory from chunk batches. False if there were no chunks."""
+        build_directory = os.path.join(self.directory, f"{version}.tmp")
+        os.makedirs(build_directory)
+        try:
+            vectors, codes = None, []
+            ids, document_ids = [], []
+            row = 0
+            for batch in batches:
+                if not batch:
+                    continue
+                embeddings = _normalize(np.asarray([chunk["embedding"] for chunk in batch], dtype=np.float32))
+                if vectors is None:
+                    vectors = np.lib.format.open_memmap(
+                        os.path.join(build_directory, "vectors.npy"),
+                        mode="w+", dtype=np.float32, shape=(max(total, len(batch)), embeddings.shape[1])
+                    )
+                if row + len(batch) > len(vectors):
+                    raise RuntimeError("more chunks than expected; the store was written to during the build")
+                vectors[row:row + len(batch)] = embeddings
+                codes.append(pack_signs(embeddings))
+                ids.extend(chunk["id"] for chunk in batch)
+                document_ids.extend(str(chunk["metadata"].get("document_id")) for chunk in batch)
+                row += len(batch)
+            if vectors is None:
+                return False
+            vectors.flush()
+            del vectors
+
+            np.save(os.path.join(build_directory, "codes.npy"), np.concatenate(codes))
+            with open(os.path.join(build_directory, "ids.json"), "w", encoding="utf-8") as f:
+                json.dump({"ids": ids, "document_ids": document_ids}, f)
+            os.rename(build_directory, os.path.join(self.directory, version))
+            return True
+        finally:
+            if os.path.exists(build_directory):
+                shutil.rmtree(build_directory)
+
+    def load(self) -> bool:
+        """Open the current build. Returns False if there is none."""
+        version = self._current_version()
+        # No CURRENT: an index built before versioning, directly in the directory
+        directory = os.path.join(self.directory, version) if version else self.directory
+        try:
+            with open(os.path.join(directory, "ids.json"), "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            codes = np.load(os.path.join(directory, "codes.npy"))
+            vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return False
+
+        document_index: Dict[str, int] = {}
+        row_documents = np.fromiter(
+            (document_index.setdefault(document_id, len(document_index)) for document_id in rows["document_ids"]),
+            dtype=np.int32,
+            count=len(rows["document_ids"])
+        )
+        with self._lock:
+            self.ids = rows["ids"]
+            self.document_ids = list(document_index)
+            self._document_index = document_index
+            self._row_documents = row_documents
+            self.codes = codes
+            self.vectors = vectors[:len(self.ids)]  # The file may be sized for more
+            self._version = version
+        return True
+
+    def refresh(self) -> bool:
+        """Load a build another worker swapped in since ours. Returns True if an index is loaded."""
+        version = self._current_version()
+        if not self.loaded or (version is not None and version != self._version):
+            self.load()
+        return self.loaded
+
+    def add(self, chunks: List[Dict]) -> None:
+        """Make chunks written since the build searchable until the next build."""
+        with self._lock:
+            for chunk in chunks:
+                vector = _normalize(np.asarray(chunk["embedding"], dtype=np.float32))
+                self._added.append((chunk["id"], str(chunk["metadata"].get("document_id")), vector))
+                self._removed.discard(chunk["id"])
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        """Leave out chunks deleted from the store since the build."""
+        chunk_ids = set(chunk_ids)
+        if not chunk_ids:
+            return
+        with self._lock:
+            self._removed.update(chunk_ids)
+            self._added = [entry for entry in self._added if entry[0] not in chunk_ids]
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        candidates: int,
+        exclude_document_ids: Iterable[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """
+        Shortlist ``candidates`` chunks by Hamming distance of the sign bits,
+        then rescore them with their float32 vectors.
+
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results
+            candidates: Shortlist size (recall vs time)
+            exclude_document_ids: Documents to leave out (e.g. deleted ones)
+
+        Returns:
+            (chunk ID, cosine distance) pairs, nearest first; a chunk rewritten
+            since the build appears once, with its newest vector, and chunks
+            deleted since do not appear
+        """
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        with self._lock:
+            codes, vectors, ids = self.codes, self.vectors, self.ids
+            row_documents, document_index = self._row_documents, self._document_index
+            added = list(self._added)
+            removed = set(self._removed)
+
+        excluded = set(map(str, exclude_document_ids))
+        hits: Dict[str, float] = {}
+        if codes is not None and len(ids):
+            distances = _popcount(np.bitwise_xor(codes, pack_signs(query))).sum(axis=1, dtype=np.int32)
+            excluded_rows = [document_index[d] for d in excluded if d in document_index]
+            if excluded_rows:
+                distances[np.isin(row_documents, excluded_rows)] = np.iinfo(np.int32).max
+            # Over-fetch by the deleted chunks, which are dropped after the shortlist
+            candidates += len(removed)
+            shortlist = np.argpartition(distances, min(candidates, len(ids)) - 1)[:candidates]
+            shortlist = shortlist[distances[shortlist] != np.iinfo(np.int32).max]
+            shortlist.sort()  # Sequential reads from the memory-mapped vectors
+            scores = vectors[shortlist] @ query
+            skipped = removed | {chunk_id for chunk_id, _, _ in added}
+            for row, score in zip(shortlist, scores):
+                if ids[row] not in skipped:
+                    hits[ids[row]] = 1 - float(score)
+
+        # Chunks added since the build are few: score them exactly
+        for chunk_id, document_id, vector in added:
+            if document_id not in excluded:
+                hits[chunk_id] = 1 - float(vector @ query)
+
+        return sorted(hits.items(), key=lambda hit: hit[1])[:top_k]
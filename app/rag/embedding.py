@@ -1,14 +1,66 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
+import numpy as np
+from app.core.config import settings
+from app.rag.embedding_scheduler import EmbeddingScheduler
 import logging
 logger = logging.getLogger(__name__)
 class E5Embedder:
-    def __init__(self, model_name: str = "intfloat/e5-base-v2"):
+    def __init__(self, model_name: str = "intfloat/e5-base-v2", socket_path: Optional[str] = None):
+        """
+        Args:
+            model_name: Sentence-transformers model to load
+            socket_path: Embedding server socket; when set, texts are sent to it
+                and no model is loaded in this process
+        """
+        self.embedding_dim = 768
+        if socket_path:
+            from app.rag.embedding_server import EmbeddingClient
+
+            logger.info(f"Using embedding server at {socket_path}")
+            self.model = None
+            self._client = EmbeddingClient(socket_path)
+            self._scheduler = None
+            return
+
+        # Imported here: sentence_transformers pulls in torch, seconds of import time
+        from sentence_transformers import SentenceTransformer
+        import torch
 
         logger.info(f"Loading embedding model: {model_name}...")
         self.model = SentenceTransformer(model_name)
-        self.embedding_dim = 768
+        self._client = None
+        self._scheduler = EmbeddingScheduler(
+            self._encode_local,
+            ingest_slice=settings.EMBEDDING_INGEST_SLICE,
+            ingest_threads=settings.EMBEDDING_INGEST_THREADS,
+            set_threads=torch.set_num_threads,
+            query_threads=torch.get_num_threads()
+        )
         logger.info(f"Model loaded! Embedding dimension: {self.embedding_dim}")
+
+    def _encode_local(self, prefixed_texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            prefixed_texts,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            batch_size=32
+        )
+
+    def encode(self, prefixed_texts: List[str], priority: str = "query") -> np.ndarray:
+        """Embeddings of texts that already carry their E5 prefix.
+
+        ``priority`` is "query" (interactive, runs first) or "ingest".
+        """
+        if self._client is not None:
+            return self._client.encode(prefixed_texts, priority)
+        return self._scheduler.embed(prefixed_texts, priority)
+
+    def get_stats(self) -> Dict:
+        """Queue wait and encode time per priority class, from the server if there is one."""
+        if self._client is not None:
+            return self._client.stats()
+        return self._scheduler.get_stats()
     
     def embed_chunks(self, chunks: List[Dict]) -> List[List[float]]:
         if not chunks:
@@ -22,12 +74,7 @@ class E5Embedder:
         
         # Generate embeddings
         logger.info(f"Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.model.encode(
-            prefixed_texts,
-            convert_to_numpy=True,
-            show_progress_bar=len(texts) > 10,
-            batch_size=32
-        )
+        embeddings = self.encode(prefixed_texts, priority="ingest")
         
         logger.info(f"generated {len(embeddings)} embeddings")
         return embeddings.tolist()
@@ -36,10 +83,7 @@ class E5Embedder:
         # Add E5 prefix for queries
         prefixed_query = f"query: {query}"
         
-        embedding = self.model.encode(
-            prefixed_query,
-            convert_to_numpy=True
-        )
+        embedding = self.encode([prefixed_query])[0]
         
         return embedding.tolist()
     
@@ -51,19 +95,17 @@ class E5Embedder:
         prefix = "query: " if is_query else "passage: "
         prefixed_texts = [f"{prefix}{text}" for text in texts]
         
-        embeddings = self.model.encode(
-            prefixed_texts,
-            convert_to_numpy=True,
-            show_progress_bar=len(texts) > 10,
-            batch_size=32
-        )
+        embeddings = self.encode(prefixed_texts, priority="query" if is_query else "ingest")
         
         return embeddings.tolist()
 # Singleton instance for reuse
 _embedder = None
+_embedder_lock = threading.Lock()
 def get_embedder() -> E5Embedder:
     """Get or create embedder instance (singleton pattern)."""
     global _embedder
     if _embedder is None:
-        _embedder = E5Embedder()
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = E5Embedder(socket_path=settings.EMBEDDING_SERVER_SOCKET or None)
     return _embedder
\ No newline at end of file
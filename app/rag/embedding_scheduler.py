@@ -0,0 +1,129 @@
+"""Runs embedding jobs one at a time, interactive queries ahead of ingest."""
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"query": 0, "ingest": 1}  # Lower runs first
+
+
+class EmbeddingScheduler:
+    """Serializes ``encode`` calls on one worker thread, by priority class.
+
+    Ingest texts are split into slices of ``ingest_slice`` and each slice is
+    queued on its own. A query that arrives during a bulk ingest therefore
+    waits for at most one slice, not for the whole batch. While an ingest
+    slice runs, the model gets ``ingest_threads`` CPU threads (through
+    ``set_threads``), which leaves cores free for the API.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        ingest_slice: int = 16,
+        ingest_threads: int = 0,
+        set_threads: Optional[Callable[[int], None]] = None,
+        query_threads: int = 0,
+        window: int = 1000
+    ):
+        self.encode = encode
+        self.ingest_slice = max(ingest_slice, 1)
+        self.set_threads = set_threads
+        self._threads = {"query": query_threads, "ingest": ingest_threads or query_threads}
+        self._current_threads = query_threads
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            name: {"jobs": 0, "texts": 0, "wait_seconds": 0.0, "encode_seconds": 0.0, "waits": deque(maxlen=window)}
+            for name in PRIORITIES
+        }
+
+    def _ensure_worker(self) -> None:
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            _, _, priority, texts, future, queued_at = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                threads = self._threads[priority]
+                if self.set_threads is not None and threads and threads != self._current_threads:
+                    self.set_threads(threads)
+                    self._current_threads = threads
+                result = self.encode(texts)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finished = time.perf_counter()
+            with self._stats_lock:
+                stats = self._stats[priority]
+                stats["jobs"] += 1
+                stats["texts"] += len(texts)
+                stats["wait_seconds"] += started - queued_at
+                stats["encode_seconds"] += finished - started
+                stats["waits"].append(started - queued_at)
+
+    def _submit(self, priority: str, texts: List[str]) -> Future:
+        future: Future = Future()
+        self._queue.put((PRIORITIES[priority], next(self._sequence), priority, texts, future, time.perf_counter()))
+        return future
+
+    def embed(self, texts: List[str], priority: str = "query") -> np.ndarray:
+        """
+        Encode texts at a priority, blocking until done.
+
+        Args:
+            texts: Texts to encode (with their E5 prefix)
+            priority: "query" or "ingest"
+
+        Returns:
+            Embeddings, one row per text
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown embedding priority: {priority}")
+        self._ensure_worker()
+        if priority == "query":
+            return np.asarray(self._submit(priority, texts).result())
+
+        # One slice at a time: queries queued meanwhile run before the next one
+        parts = [
+            np.asarray(self._submit(priority, texts[start:start + self.ingest_slice]).result())
+            for start in range(0, len(texts), self.ingest_slice)
+        ]
+        return np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+
+    def get_stats(self) -> Dict:
+        """Per priority class: jobs, texts, queue wait (mean, p50, p95, max ms) and encode time."""
+        with self._stats_lock:
+            snapshot = {name: {**stats, "waits": sorted(stats["waits"])} for name, stats in self._stats.items()}
+        report = {"queued": self._queue.qsize()}
+        for name, stats in snapshot.items():
+            waits = stats["waits"]
+            report[name] = {
+                "jobs": stats["jobs"],
+                "texts": stats["texts"],
+                "threads": self._threads[name] or None,
+                "queue_wait_ms": {
+                    "mean": round(stats["wait_seconds"] / stats["jobs"] * 1000, 3) if stats["jobs"] else None,
+                    "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else None,
+                    "p95": round(waits[min(int(len(waits) * 0.95), len(waits) - 1)] * 1000, 3) if waits else None,
+                    "max": round(waits[-1] * 1000, 3) if waits else None
+                },
+                "encode_seconds": round(stats["encode_seconds"], 3)
+            }
+        return report
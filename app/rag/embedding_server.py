@@ -0,0 +1,233 @@
+"""Embedding sidecar: one model per node, shared by every API worker over a Unix socket.
+
+Run it next to the API and point the workers at it:
+
+    python -m app.rag.embedding_server --socket /tmp/research-assistant-embed.sock
+    EMBEDDING_SERVER_SOCKET=/tmp/research-assistant-embed.sock uvicorn main:app --workers 8
+
+Requests from all connections are queued by priority class and encoded
+together, up to ``max_batch`` texts or after waiting ``max_wait_ms`` for more.
+Query batches go ahead of ingest ones (see EmbeddingScheduler).
+
+Wire format, both directions: a 4-byte big-endian length and a JSON header.
+A request header is ``{"texts": [...], "priority": "query"|"ingest"}`` (texts
+already prefixed with "query: "/"passage: "). A response header is
+``{"shape": [n, dim]}`` followed by n * dim little-endian float32 values, or
+``{"error": "..."}``. ``{"stats": true}`` is answered with ``{"stats": {...}}``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.rag.embedding_scheduler import PRIORITIES
+import logging
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+
+
+def _frame(header: dict) -> bytes:
+    body = json.dumps(header).encode("utf-8")
+    return _LENGTH.pack(len(body)) + body
+
+
+class EmbeddingServer:
+    """Batches texts from many connections into ``encode(texts, priority)`` calls."""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str], str], np.ndarray],
+        socket_path: str,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        stats: Optional[Callable[[], Dict]] = None
+    ):
+        self.encode = encode
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = stats
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self.batches = 0
+        self.texts = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    request = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    return  # Client closed the connection
+                if request.get("stats"):
+                    writer.write(_frame({"stats": self.stats() if self.stats else {}}))
+                    await writer.drain()
+                    continue
+                priority = request.get("priority", "query")
+                if priority not in self._queues:
+                    writer.write(_frame({"error": f"unknown embedding priority: {priority}"}))
+                    await writer.drain()
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self._queues[priority].put((request["texts"], future))
+                try:
+                    embeddings = await future
+                except Exception as e:
+                    writer.write(_frame({"error": str(e)}))
+                else:
+                    writer.write(_frame({"shape": list(embeddings.shape)}) + embeddings.astype("<f4").tobytes())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[Tuple[List[str], asyncio.Future]]:
+        batch = [await queue.get()]
+        size = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _batcher(self, priority: str) -> None:
+        # One per priority class: encode() orders the classes' batches
+        while True:
+            batch = await self._next_batch(self._queues[priority])
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                embeddings = np.asarray(await asyncio.to_thread(self.encode, texts, priority), dtype=np.float32)
+            except Exception as e:
+                logger.error(f"embedding batch of {len(texts)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[start:start + len(item_texts)])
+                start += len(item_texts)
+
+    async def serve(self, ready: Optional[threading.Event] = None) -> None:
+        """Serve until cancelled."""
+        self._queues = {priority: asyncio.Queue() for priority in PRIORITIES}
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # Left behind by a previous run
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        batchers = [asyncio.create_task(self._batcher(priority)) for priority in self._queues]
+        logger.info(f"embedding server listening on {self.socket_path}")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for batcher in batchers:
+                batcher.cancel()
+
+
+class EmbeddingClient:
+    """Blocking client for the embedding server; one connection per thread."""
+
+    def __init__(self, socket_path: str, timeout: float = 120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+            self._local.connection = connection
+        return connection
+
+    def _close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    @staticmethod
+    def _read_exactly(connection: socket.socket, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            data = connection.recv(size - len(buffer))
+            if not data:
+                raise ConnectionError("embedding server closed the connection")
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def _exchange(self, request: dict) -> dict:
+        connection = self._connection()
+        connection.sendall(_frame(request))
+        (length,) = _LENGTH.unpack(self._read_exactly(connection, _LENGTH.size))
+        return json.loads(self._read_exactly(connection, length))
+
+    def _request(self, texts: List[str], priority: str) -> np.ndarray:
+        header = self._exchange({"texts": texts, "priority": priority})
+        connection = self._connection()
+        if "error" in header:
+            raise RuntimeError(f"embedding server: {header['error']}")
+        rows, dim = header["shape"]
+        data = self._read_exactly(connection, rows * dim * 4)
+        return np.frombuffer(data, dtype="<f4").reshape(rows, dim)
+
+    def encode(self, texts: List[str], priority: str = "query") -> np.ndarray:
+        """Embeddings of already-prefixed texts, shape (len(texts), dim)."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        try:
+            return self._request(texts, priority)
+        except (ConnectionError, OSError):
+            # Server restarted since this thread connected: reconnect once
+            self._close()
+            return self._request(texts, priority)
+
+    def stats(self) -> Dict:
+        """The server's scheduler statistics."""
+        try:
+            return self._exchange({"stats": True})["stats"]
+        except (ConnectionError, OSError):
+            self._close()
+            return self._exchange({"stats": True})["stats"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "/tmp/research-assistant-embed.sock")
+    parser.add_argument("--model", help="Model to load (default: the one get_embedder() loads)")
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from app.rag.embedding import E5Embedder
+
+    # No socket_path: this process owns the model
+    embedder = E5Embedder(args.model) if args.model else E5Embedder()
+    server = EmbeddingServer(embedder.encode, args.socket, args.max_batch, args.max_wait_ms, stats=embedder.get_stats)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
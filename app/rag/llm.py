@@ -1,23 +1,34 @@
 import importlib
+import threading
 from app.core.config import settings
+from app.core.cache import ResponseCache, get_response_cache
+from app.core.single_flight import SingleFlight
 from typing import List, Optional, Literal
 import logging
 logger = logging.getLogger(__name__)
-try:
-    genai = importlib.import_module("google.generativeai")
-except ModuleNotFoundError:
-    genai = None
-if genai is not None:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+_genai = None
+def _load_genai():
+    """Import and configure google.generativeai on first use (it is slow to import). None if not installed."""
+    global _genai
+    if _genai is None:
+        try:
+            _genai = importlib.import_module("google.generativeai")
+        except ModuleNotFoundError:
+            return None
+        _genai.configure(api_key=settings.GEMINI_API_KEY)
+    return _genai
 class GeminiLLM:
     """Tiered Gemini LLM with RAG support."""
     
     def __init__(self):
+        genai = _load_genai()
         if genai is None:
             raise RuntimeError("google.generativeai not installed")
         
         self.flash_model = genai.GenerativeModel("gemini-2.5-flash")
         self.pro_model = genai.GenerativeModel("gemini-2.5-pro")
+        self.cache = get_response_cache()
+        self.in_flight = SingleFlight()
         logger.info("Gemini models initialized (Flash + Pro)")
     
     def generate(
@@ -25,9 +36,20 @@ class GeminiLLM:
         prompt: str,
         tier: Literal["flash", "pro", "auto"] = "auto",
         max_tokens: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache: Optional[bool] = None
     ) -> str:
-        """Generate response with tier selection."""
+        """
+        Generate response with tier selection.
+
+        Responses are cached when ``temperature`` is 0 (or
+        LLM_CACHE_NONZERO_TEMPERATURE is set). ``cache=True`` opts a sampled
+        call in (for prompts where any good answer can be reused, such as
+        routing and summaries); ``cache=False`` opts out.
+
+        Concurrent calls with the same prompt and parameters share one API
+        call, unless ``cache=False``.
+        """
         
         # Auto-select tier
         if tier == "auto":
@@ -42,9 +64,26 @@ class GeminiLLM:
         if max_tokens:
             config["max_output_tokens"] = max_tokens
         
-        logger.info(f"Generating with {tier.upper()}")
-        response = model.generate_content(prompt, generation_config=config)
-        return response.text
+        cacheable = cache if cache is not None else temperature == 0 or settings.LLM_CACHE_NONZERO_TEMPERATURE
+        key = ResponseCache.make_key(prompt, model.model_name, temperature, max_tokens)
+        if self.cache is not None:
+            if cacheable:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+            else:
+                self.cache.skip()
+        
+        def call() -> str:
+            logger.info(f"Generating with {tier.upper()}")
+            response = model.generate_content(prompt, generation_config=config)
+            if self.cache is not None and cacheable:
+                self.cache.set(key, response.text)
+            return response.text
+        
+        if cache is False:
+            return call()
+        return self.in_flight.do(key, call)
     
     def generate_with_context(
         self,
@@ -98,13 +137,16 @@ Answer:"""
         return "flash"
 # Singleton
 _llm = None
+_llm_lock = threading.Lock()
 def get_llm() -> GeminiLLM:
     """Get or create LLM instance."""
     global _llm
     if _llm is None:
-        _llm = GeminiLLM()
+        with _llm_lock:
+            if _llm is None:
+                _llm = GeminiLLM()
     return _llm
 # Backward compatible function
-def generate_response(prompt: str) -> str:
+def generate_response(prompt: str, cache: Optional[bool] = None) -> str:
     """Generate response using Flash (backward compatible)."""
-    return get_llm().generate(prompt, tier="flash")
\ No newline at end of file
+    return get_llm().generate(prompt, tier="flash", cache=cache)
\ No newline at end of file
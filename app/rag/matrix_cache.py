@@ -0,0 +1,174 @@
+"""Per-document embedding matrices on disk, for exact (brute-force) search."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+# Loaded matrix with the chunk IDs of its rows
+Entry = Tuple[np.ndarray, List[str]]
+
+
+class DocumentMatrixCache:
+    """Contiguous float32 matrix of each document's L2-normalized chunk embeddings.
+
+    Matrices are written once as ``.npy`` files and opened memory-mapped, so
+    the page cache holds the hot ones and the process only keeps the
+    ``max_open`` most recently used maps. Rows follow the chunk IDs stored
+    next to them. A document's files must be invalidated whenever its chunks
+    change.
+
+    Several workers share the directory. Every lookup stats the matrix file
+    and an open map is reused only while the file is the one it maps (same
+    inode): a rewrite or an invalidation by another worker reloads it.
+    Documents too large for exact search get a marker file, invalidated with
+    the rest.
+    """
+
+    def __init__(self, directory: str, max_open: int = 64):
+        self.directory = directory
+        self.max_open = max_open
+        self._open: "OrderedDict[str, Tuple[Entry, int]]" = OrderedDict()  # Entry and file inode
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, document_id: str) -> Tuple[str, str, str]:
+        # Hashed: document IDs in filters come from requests
+        base = os.path.join(self.directory, hashlib.sha256(document_id.encode("utf-8")).hexdigest())
+        return f"{base}.npy", f"{base}.ids.json", f"{base}.large"
+
+    def _write(self, document_id: str, ids: List[str], embeddings) -> None:
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        matrix_path, ids_path, _ = self._paths(document_id)
+        # IDs first: a matrix file on disk always has its IDs next to it
+        for path, write in (
+            (ids_path, lambda f: f.write(json.dumps(ids).encode("utf-8"))),
+            (matrix_path, lambda f: np.save(f, matrix)),
+        ):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _load(self, document_id: str) -> Tuple[Optional[Entry], Optional[int]]:
+        """The document's matrix and IDs from disk, with the inode of the matrix file."""
+        matrix_path, ids_path, _ = self._paths(document_id)
+        try:
+            # Stat before mapping: if the file is replaced in between, the
+            # older inode is recorded and the next lookup reloads
+            inode = os.stat(matrix_path).st_ino
+            with open(ids_path, "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None, None
+        if len(ids) != matrix.shape[0]:
+            return None, None
+        return (matrix, ids), inode
+
+    def _inode(self, document_id: str) -> Optional[int]:
+        try:
+            return os.stat(self._paths(document_id)[0]).st_ino
+        except FileNotFoundError:
+            return None
+
+    def get(self, document_id: str, load: Callable[[], Optional[Tuple[List[str], list]]]) -> Optional[Entry]:
+        """
+        Matrix and row IDs of a document, building them with ``load`` on a miss.
+
+        Args:
+            document_id: Document whose chunks to load
+            load: Returns the chunk IDs and embeddings of the document, or
+                None if it is too large for exact search
+
+        Returns:
+            (matrix, ids) with a read-only matrix, or None for a large document
+        """
+        inode = self._inode(document_id)
+        with self._lock:
+            cached = self._open.get(document_id)
+            if cached is not None:
+                if inode is not None and cached[1] == inode:
+                    self._open.move_to_end(document_id)
+                    return cached[0]
+                # Rewritten or invalidated by another worker since it was mapped
+                del self._open[document_id]
+
+        large_path = self._paths(document_id)[2]
+        if inode is None and os.path.exists(large_path):
+            return None
+        entry, inode = self._load(document_id)
+        if entry is None:
+            loaded = load()
+            if loaded is None:
+                with open(large_path, "wb"):
+                    pass
+                return None
+            ids, embeddings = loaded
+            if ids:
+                self._write(document_id, ids, embeddings)
+                entry, inode = self._load(document_id)
+            if entry is None:
+                return np.zeros((0, 0), dtype=np.float32), []
+
+        with self._lock:
+            self._open[document_id] = (entry, inode)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return entry
+
+    def invalidate(self, document_id: str) -> None:
+        """Forget a document's matrix (in every worker: its files go); the next search rebuilds it."""
+        with self._lock:
+            self._open.pop(document_id, None)
+        for path in self._paths(document_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def exact_search(entries: List[Entry], query_embedding: List[float], top_k: int) -> List[Tuple[str, float]]:
+    """
+    Exact cosine search over document matrices: one matrix-vector product each.
+
+    Args:
+        entries: (matrix, ids) pairs from ``DocumentMatrixCache.get``
+        query_embedding: Query vector
+        top_k: Number of results
+
+    Returns:
+        (chunk ID, cosine distance) pairs, nearest first
+    """
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if norm:
+        query = query / norm
+
+    ids: List[str] = []
+    scores = []
+    for matrix, matrix_ids in entries:
+        if len(matrix_ids):
+            ids.extend(matrix_ids)
+            scores.append(matrix @ query)
+    if not ids:
+        return []
+
+    scores = np.concatenate(scores)
+    k = min(top_k, len(ids))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(ids[i], float(1 - scores[i])) for i in top]
@@ -1,9 +1,15 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from app.rag.embedding import get_embedder
 from app.rag.vector_store import get_vector_store
 from app.rag.retriever import get_retriever
 from app.rag.llm import get_llm
 from app.processing.text_splitter import DocumentChunker
+from app.core.cache import get_processed_cache, make_cache_key
+from app.core.single_flight import SingleFlight
+from app.core.config import settings
 import logging
 logger = logging.getLogger(__name__)
 class RAGPipeline:
@@ -15,7 +21,10 @@ class RAGPipeline:
         self.vector_store = get_vector_store()
         self.retriever = get_retriever()
         self.llm = get_llm()
-        self.chunker = DocumentChunker()
+        self.chunker = DocumentChunker(cache=get_processed_cache())
+        # Writes one batch to the vector store while the next is being embedded
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-writer")
+        self.in_flight = SingleFlight()
         
         logger.info("pipeline initialized")
     
@@ -41,11 +50,9 @@ class RAGPipeline:
                 logger.warning(f"No chunks created for {document_id}")
                 return {"success": False, "error": "No chunks created"}
             
-            #Generate embeddings
-            embeddings = self.embedder.embed_chunks(chunks)
-            
-            #Store in vector database
-            self.vector_store.add_chunks(chunks, embeddings)
+            #Generate embeddings and store them in the vector database
+            embedding_dim = self._embed_and_store(chunks)
+            self.vector_store.delete_chunks_from(document_id, len(chunks))
             
             # Return stats
             stats = {
@@ -53,7 +60,7 @@ class RAGPipeline:
                 "document_id": document_id,
                 "total_chunks": len(chunks),
                 "avg_chunk_length": sum(len(c["content"]) for c in chunks) / len(chunks),
-                "embedding_dim": len(embeddings[0]) if embeddings else 0
+                "embedding_dim": embedding_dim
             }
             
             logger.info(f" Indexed {document_id}: {len(chunks)} chunks")
@@ -63,6 +70,24 @@ class RAGPipeline:
             logger.error(f"Error indexing {document_id}: {e}")
             return {"success": False, "error": str(e)}
     
+    def _embed_and_store(self, chunks: List[Dict]) -> int:
+        """Embed chunks a batch at a time, writing each batch while the next is encoded. Returns the embedding dim."""
+        batch_size = settings.VECTOR_STORE_BATCH_SIZE
+        pending = None
+        embedding_dim = 0
+        try:
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start:start + batch_size]
+                embeddings = self.embedder.embed_chunks(batch)
+                embedding_dim = len(embeddings[0]) if embeddings else embedding_dim
+                if pending is not None:
+                    pending.result()  # At most one write in flight; surfaces write errors
+                pending = self._writer.submit(self.vector_store.add_chunks, batch, embeddings)
+        finally:
+            if pending is not None:
+                pending.result()
+        return embedding_dim
+    
     def index_batch(
         self,
         documents: List[Dict]
@@ -182,7 +207,7 @@ Task: Identify which ONE document the user is asking about.
 Return ONLY the document title or "ALL". Nothing else."""
 
             # Use LLM to route
-            response = self.llm.generate(routing_prompt, tier="flash")
+            response = self.llm.generate(routing_prompt, tier="flash", cache=True)
             selected = response.strip()
             
             logger.info(f"🧠 LLM Router: '{selected}' for query: '{question[:50]}...'")
@@ -211,6 +236,27 @@ Return ONLY the document title or "ALL". Nothing else."""
         tier: str = "auto",
         include_citations: bool = True,
         filter_metadata: Optional[Dict] = None
+    ) -> Dict:
+        """Answer a question; identical queries already in flight share that answer."""
+        key = make_cache_key(
+            "query", question, top_k, score_threshold, use_mmr, mmr_diversity, tier, include_citations,
+            json.dumps(filter_metadata, sort_keys=True, default=str)
+        )
+        result = self.in_flight.do(key, lambda: self._query(
+            question, top_k, score_threshold, use_mmr, mmr_diversity, tier, include_citations, filter_metadata
+        ))
+        return dict(result)
+
+    def _query(
+        self,
+        question: str,
+        top_k: int,
+        score_threshold: float,
+        use_mmr: bool,
+        mmr_diversity: float,
+        tier: str,
+        include_citations: bool,
+        filter_metadata: Optional[Dict]
     ) -> Dict:
         try:
             logger.info(f"Query: '{question[:50]}...'")
@@ -341,21 +387,39 @@ Return ONLY the document title or "ALL". Nothing else."""
             logger.error(f"Error deleting {document_id}: {e}")
             return {"success": False, "error": str(e)}
     
+    def delete_documents(self, document_ids: List[str]) -> Dict:
+        """Delete many documents' chunks: hidden from search now, removed in batches later."""
+        try:
+            pending = self.vector_store.tombstone_documents(document_ids)
+            return {"success": True, "documents": len(document_ids), "pending": pending}
+        except Exception as e:
+            logger.error(f"Error deleting {len(document_ids)} documents: {e}")
+            return {"success": False, "error": str(e)}
+    
     def get_stats(self) -> Dict:
         vector_stats = self.vector_store.get_stats()
         
         return {
             "total_chunks": vector_stats["total_chunks"],
             "collection_name": vector_stats["collection_name"],
+            "tombstoned_documents": vector_stats["tombstoned_documents"],
+            "last_compaction": vector_stats["last_compaction"],
+            "shards": vector_stats.get("shards"),
             "embedding_model": "E5-Base-v2",
             "embedding_dim": 768,
+            "embedding_scheduler": self.embedder.get_stats(),
+            "llm_cache": self.llm.cache.get_stats() if self.llm.cache else None,
+            "single_flight": {"query": self.in_flight.get_stats(), "llm": self.llm.in_flight.get_stats()},
             "llm_models": ["gemini-1.5-flash", "gemini-1.5-pro"]
         }
 # Singleton
 _pipeline = None
+_pipeline_lock = threading.Lock()
 def get_pipeline() -> RAGPipeline:
-    """Get or create pipeline instance."""
+    """Get or create pipeline instance (warm-up and the first request may race to build it)."""
     global _pipeline
     if _pipeline is None:
-        _pipeline = RAGPipeline()
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RAGPipeline()
     return _pipeline
@@ -1,5 +1,7 @@
+import threading
 from typing import List, Dict, Optional
 from app.rag.vector_store import get_vector_store
+from app.core.config import settings
 from app.rag.embedding import get_embedder
 import logging
 logger = logging.getLogger(__name__)
@@ -23,7 +25,8 @@ class AdvancedRetriever:
         
     
         initial_k = top_k * 2 if use_mmr else top_k
-        results = self.vector_store.search(
+        search = self.vector_store.search_binary if settings.SEARCH_MODE == "binary" else self.vector_store.search
+        results = search(
             query_embedding=query_embedding,
             top_k=initial_k,
             filter_metadata=filter_metadata
@@ -176,9 +179,12 @@ class AdvancedRetriever:
         return unique_chunks
 # Singleton
 _retriever = None
+_retriever_lock = threading.Lock()
 def get_retriever() -> AdvancedRetriever:
     """Get or create retriever instance."""
     global _retriever
     if _retriever is None:
-        _retriever = AdvancedRetriever()
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = AdvancedRetriever()
     return _retriever
\ No newline at end of file
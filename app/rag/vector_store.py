@@ -1,7 +1,18 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Set
+from app.core.config import settings
+from app.core.file_lock import file_lock
+from app.rag.binary_index import BinaryIndex
+from app.rag.matrix_cache import DocumentMatrixCache, exact_search
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import heapq
 import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
 import logging
 logger = logging.getLogger(__name__)
 class ChromaVectorStore:
@@ -9,20 +20,59 @@ class ChromaVectorStore:
     def __init__(
         self,
         collection_name: str = "research_documents",
-        persist_directory: str = "./data/chromadb"
+        persist_directory: str = "./data/chromadb",
+        batch_size: int = settings.VECTOR_STORE_BATCH_SIZE,
+        client=None
     ):
         # Create directory if needed
         os.makedirs(persist_directory, exist_ok=True)
+        self.persist_directory = persist_directory
         
-        # Create persistent client
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        # Create persistent client (shards share one)
+        if client is None:
+            import chromadb  # Heavy; only imported once a store is opened
+            client = chromadb.PersistentClient(path=persist_directory)
+        self.client = client
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}  # Use cosine similarity
+        # Get or create collection. HNSW parameters only apply on creation,
+        # so an existing collection is opened as built
+        if collection_name in _collection_names(self.client):
+            self.collection = self.client.get_collection(collection_name)
+            _warn_on_hnsw_drift(self.collection)
+        else:
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata=hnsw_metadata(collection_name)
+            )
+        
+        # Chroma rejects writes larger than its maximum batch size
+        # (get_max_batch_size() since 0.5, a max_batch_size property before)
+        if hasattr(self.client, "get_max_batch_size"):
+            max_batch_size = self.client.get_max_batch_size()
+        else:
+            max_batch_size = getattr(self.client, "max_batch_size", None)
+        self.batch_size = min(batch_size, max_batch_size) if max_batch_size else batch_size
+        
+        # Documents deleted but whose chunks are not removed yet. Searches skip
+        # them. The log on disk is the source of truth, shared by every worker;
+        # the set mirrors it up to ``_tombstone_offset``
+        self._tombstone_path = os.path.join(persist_directory, f"{collection_name}.tombstones")
+        self._tombstones: Set[str] = set()
+        self._tombstone_inode: Optional[int] = None
+        self._tombstone_offset = 0
+        self._tombstone_lock = threading.Lock()
+        self.last_compaction: Optional[Dict] = None
+        
+        # Exact search tier for queries filtered to a few documents
+        self.matrix_cache = DocumentMatrixCache(
+            os.path.join(persist_directory, "matrices", collection_name),
+            max_open=settings.EXACT_SEARCH_CACHE_SIZE
         )
         
+        # First stage of SEARCH_MODE=binary, loaded on first use
+        self.binary_index = BinaryIndex(os.path.join(persist_directory, "binary", collection_name))
+        self._binary_index_checked = False
+        
         logger.info(f"chromaDB initialized at {persist_directory}")
         logger.info(f"   Collection: {collection_name}")
         logger.info(f"   Total documents: {self.collection.count()}")
@@ -42,37 +92,22 @@ class ChromaVectorStore:
                 "must have same length"
             )
         
-        # Prepare data for ChromaDB
-        ids = []
-        documents = []
-        metadatas = []
-        
-        for chunk in chunks:
-            # Create unique ID
-            chunk_id = f"{chunk['document_id']}_chunk_{chunk['chunk_index']}"
-            ids.append(chunk_id)
-            
-            # Store text content
-            documents.append(chunk["content"])
-            
-            # Store metadata
-            metadata = {
-                "document_id": chunk["document_id"],
-                "chunk_index": chunk["chunk_index"],
-                "total_chunks": chunk["total_chunks"],
-                **chunk.get("metadata", {})
-            }
-            metadatas.append(metadata)
-        
-        # Add to collection
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas
-        )
+        records = []
+        for chunk, embedding in zip(chunks, embeddings):
+            records.append({
+                # IDs are deterministic, so re-indexing a document overwrites its chunks
+                "id": f"{chunk['document_id']}_chunk_{chunk['chunk_index']}",
+                "content": chunk["content"],
+                "embedding": embedding,
+                "metadata": {
+                    "document_id": chunk["document_id"],
+                    "chunk_index": chunk["chunk_index"],
+                    "total_chunks": chunk["total_chunks"],
+                    **chunk.get("metadata", {})
+                }
+            })
         
-        logger.info(f"added {len(chunks)} chunks to vector store")
+        self.upsert_chunks(records)
     
     def search(
         self,
@@ -80,10 +115,17 @@ class ChromaVectorStore:
         top_k: int = 5,
         filter_metadata: Optional[Dict] = None
     ) -> Dict:
+        # Filtered to a few documents: brute force beats a filtered HNSW query
+        document_ids = _filtered_document_ids(filter_metadata)
+        if document_ids is not None and settings.EXACT_SEARCH_MAX_CHUNKS > 0:
+            results = self._exact_search(document_ids, query_embedding, top_k)
+            if results is not None:
+                return results
+        
         results = self.collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
-            where=filter_metadata
+            where=self._exclude_tombstoned(filter_metadata)
         )
         
         # ChromaDB returns lists of lists, extract first element
@@ -94,24 +136,280 @@ class ChromaVectorStore:
             "ids": results["ids"][0] if results["ids"] else []
         }
     
+    def _document_matrix(self, document_id: str):
+        """Cached embedding matrix of a document, or None if it has too many chunks."""
+        max_chunks = settings.EXACT_SEARCH_MAX_CHUNKS
+        
+        def load():
+            results = self.collection.get(
+                where={"document_id": document_id},
+                include=["embeddings"],
+                limit=max_chunks + 1
+            )
+            if len(results["ids"]) > max_chunks:
+                return None
+            return results["ids"], results["embeddings"]
+        
+        return self.matrix_cache.get(document_id, load)
+    
+    def _exact_search(self, document_ids: List[str], query_embedding: List[float], top_k: int) -> Optional[Dict]:
+        tombstoned = self._sync_tombstones()
+        document_ids = [document_id for document_id in document_ids if document_id not in tombstoned]
+        
+        entries = []
+        for document_id in document_ids:
+            entry = self._document_matrix(document_id)
+            if entry is None:
+                return None
+            entries.append(entry)
+        
+        return self._results_for_hits(exact_search(entries, query_embedding, top_k))
+    
+    def _results_for_hits(self, hits: List[tuple]) -> Dict:
+        """Search results for (chunk ID, distance) pairs, with payloads fetched by ID."""
+        if not hits:
+            return {"documents": [], "metadatas": [], "distances": [], "ids": []}
+        
+        ids = [chunk_id for chunk_id, _ in hits]
+        payloads = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: (payloads["documents"][i], payloads["metadatas"][i])
+            for i, chunk_id in enumerate(payloads["ids"])
+        }
+        hits = [(chunk_id, distance) for chunk_id, distance in hits if chunk_id in by_id]
+        return {
+            "documents": [by_id[chunk_id][0] for chunk_id, _ in hits],
+            "metadatas": [by_id[chunk_id][1] for chunk_id, _ in hits],
+            "distances": [distance for _, distance in hits],
+            "ids": [chunk_id for chunk_id, _ in hits]
+        }
+    
+    def search_binary(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> Dict:
+        """Two-stage search on the binary index; ``search`` for filtered queries or until the index is built."""
+        if filter_metadata or not self._binary_index_ready():
+            return self.search(query_embedding, top_k, filter_metadata)
+        excluded = self._sync_tombstones()
+
+        def search():
+            hits = self.binary_index.search(
+                query_embedding,
+                top_k,
+                candidates=max(settings.BINARY_SEARCH_CANDIDATES, top_k),
+                exclude_document_ids=excluded
+            )
+            return hits, self._results_for_hits(hits)
+
+        hits, results = search()
+        missing = {chunk_id for chunk_id, _ in hits} - set(results["ids"])
+        if missing:
+            # Deleted by another worker since the build: leave them out from now on
+            self.binary_index.remove(missing)
+            hits, results = search()
+        return results
+    
+    def _binary_index_ready(self) -> bool:
+        # Also picks up builds swapped in by other workers
+        if not self.binary_index.refresh() and not self._binary_index_checked:
+            self._binary_index_checked = True
+            logger.warning(
+                f"no binary index for {self.collection.name}; using HNSW search until "
+                "`python -m app.cli build-binary-index` (or the next compaction) builds it"
+            )
+        return self.binary_index.loaded
+    
+    def build_binary_index(self) -> int:
+        """(Re)build the binary index from every stored chunk. Returns chunks indexed."""
+        return self.binary_index.build(self.iter_chunks(batch_size=self.batch_size), self.collection.count())
+    
+    def _invalidate_matrices(self, document_ids: Iterable[str]) -> None:
+        for document_id in set(document_ids):
+            self.matrix_cache.invalidate(document_id)
+    
     def delete_document(self, document_id: str) -> int:
-        # Get all chunks for this document
-        results = self.collection.get(
-            where={"document_id": document_id}
-        )
+        # IDs only: the filter runs in Chroma and no chunk payloads are fetched
+        ids = self.collection.get(where={"document_id": document_id}, include=[])["ids"]
         
-        if results["ids"]:
-            self.collection.delete(ids=results["ids"])
-            logger.info(f"deleted {len(results['ids'])} chunks for document {document_id}")
-            return len(results["ids"])
+        if ids:
+            self.collection.delete(ids=ids)
+            self._invalidate_matrices([document_id])
+            self.binary_index.remove(ids)
+            logger.info(f"deleted {len(ids)} chunks for document {document_id}")
+            return len(ids)
         
         logger.warning(f"No chunks found for document {document_id}")
         return 0
     
+    def _sync_tombstones(self) -> Set[str]:
+        """
+        Catch up with the tombstone log and return the tombstoned documents.
+        
+        The log is append-only between compactions: an ``id`` line tombstones
+        a document, a ``-id`` line records that its chunks were removed. Other
+        workers append to it too, so every search reads what they added since
+        its last look (a stat when nothing changed).
+        """
+        with self._tombstone_lock:
+            try:
+                stat = os.stat(self._tombstone_path)
+            except FileNotFoundError:
+                self._tombstones, self._tombstone_inode, self._tombstone_offset = set(), None, 0
+                return set()
+            if stat.st_ino != self._tombstone_inode or stat.st_size < self._tombstone_offset:
+                # First read, or the log was compacted (replaced) by a flush
+                self._tombstones, self._tombstone_inode, self._tombstone_offset = set(), stat.st_ino, 0
+            if stat.st_size > self._tombstone_offset:
+                with open(self._tombstone_path, "rb") as f:
+                    f.seek(self._tombstone_offset)
+                    data = f.read(stat.st_size - self._tombstone_offset)
+                # Complete lines only: another worker may be mid-append
+                data = data[:data.rfind(b"\n") + 1]
+                self._tombstone_offset += len(data)
+                _apply_tombstone_lines(self._tombstones, data.decode("utf-8"))
+            return set(self._tombstones)
+    
+    def _exclude_tombstoned(self, where: Optional[Dict]) -> Optional[Dict]:
+        tombstoned = self._sync_tombstones()
+        if not tombstoned:
+            return where
+        excluded = {"document_id": {"$nin": sorted(tombstoned)}}
+        return {"$and": [where, excluded]} if where else excluded
+    
+    def tombstone_documents(self, document_ids: Iterable[str]) -> int:
+        """
+        Mark documents deleted. Their chunks stop appearing in searches at once
+        and are removed in batches by ``flush_tombstones``.
+        
+        Args:
+            document_ids: Documents to delete
+        
+        Returns:
+            Number of documents waiting to be removed
+        """
+        with file_lock(f"{self._tombstone_path}.lock"):
+            tombstoned = self._sync_tombstones()
+            new_ids = list(dict.fromkeys(
+                document_id for document_id in map(str, document_ids) if document_id not in tombstoned
+            ))
+            if new_ids:
+                with open(self._tombstone_path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{document_id}\n" for document_id in new_ids))
+        pending = len(self._sync_tombstones())
+        if pending >= settings.VECTOR_STORE_TOMBSTONE_FLUSH:
+            self.flush_tombstones()
+        return pending
+    
+    def flush_tombstones(self) -> int:
+        """Delete the chunks of all tombstoned documents, a batch of documents per call. Returns chunks deleted."""
+        document_ids = sorted(self._sync_tombstones())
+        if not document_ids:
+            return 0
+        
+        deleted = 0
+        for start in range(0, len(document_ids), self.batch_size):
+            where = {"document_id": {"$in": document_ids[start:start + self.batch_size]}}
+            ids = self.collection.get(where=where, include=[])["ids"]
+            for id_start in range(0, len(ids), self.batch_size):
+                self.collection.delete(ids=ids[id_start:id_start + self.batch_size])
+            self.binary_index.remove(ids)
+            deleted += len(ids)
+        
+        self._invalidate_matrices(document_ids)
+        with file_lock(f"{self._tombstone_path}.lock"):
+            # Only the documents removed here: others may have been tombstoned meanwhile
+            with open(self._tombstone_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"-{document_id}\n" for document_id in document_ids))
+            self._compact_tombstone_log()
+        self._sync_tombstones()
+        logger.info(f"deleted {deleted} chunks of {len(document_ids)} tombstoned documents")
+        return deleted
+    
+    def _compact_tombstone_log(self) -> None:
+        """Rewrite the log with only the documents still pending. Call with the log's file lock held."""
+        with open(self._tombstone_path, "r", encoding="utf-8") as f:
+            pending: Set[str] = set()
+            _apply_tombstone_lines(pending, f.read())
+        fd, tmp_path = tempfile.mkstemp(dir=self.persist_directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("".join(f"{document_id}\n" for document_id in sorted(pending)))
+            os.replace(tmp_path, self._tombstone_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def compact(self) -> Dict:
+        """
+        Remove tombstoned chunks. This does not shrink any file: SQLite reuses
+        the pages they free, and only ``vacuum_sqlite`` (API stopped) gives
+        them back to disk.
+        
+        Returns:
+            Chunks deleted, and bytes of free SQLite pages a vacuum would reclaim
+        """
+        self.last_compaction = _compact(self.persist_directory, [self])
+        return self.last_compaction
+    
+    def delete_chunks_from(self, document_id: str, chunk_index: int) -> None:
+        """Delete a document's chunks from ``chunk_index`` on (left over when a re-index yields fewer chunks)."""
+        where = {"$and": [{"document_id": document_id}, {"chunk_index": {"$gte": chunk_index}}]}
+        ids = self.collection.get(where=where, include=[])["ids"]
+        if ids:
+            self.collection.delete(ids=ids)
+            self.binary_index.remove(ids)
+        self._invalidate_matrices([document_id])
+    
+    def iter_chunks(self, batch_size: int = 500, include_embeddings: bool = True) -> Iterator[List[Dict]]:
+        """Yield every stored chunk, ``batch_size`` at a time (with its embedding)."""
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        offset = 0
+        while True:
+            results = self.collection.get(limit=batch_size, offset=offset, include=include)
+            if not results["ids"]:
+                return
+            batch = []
+            for i, chunk_id in enumerate(results["ids"]):
+                chunk = {
+                    "id": chunk_id,
+                    "content": results["documents"][i],
+                    "metadata": results["metadatas"][i]
+                }
+                if include_embeddings:
+                    embedding = results["embeddings"][i]
+                    chunk["embedding"] = embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
+                batch.append(chunk)
+            yield batch
+            offset += len(results["ids"])
+
+    def upsert_chunks(self, chunks: List[Dict]) -> None:
+        """Insert or replace chunks carrying ``id``, ``content``, ``metadata`` and ``embedding``, in bounded batches."""
+        if not chunks:
+            return
+        for start in range(0, len(chunks), self.batch_size):
+            batch = chunks[start:start + self.batch_size]
+            self.collection.upsert(
+                ids=[chunk["id"] for chunk in batch],
+                documents=[chunk["content"] for chunk in batch],
+                embeddings=[chunk["embedding"] for chunk in batch],
+                metadatas=[chunk["metadata"] for chunk in batch]
+            )
+        self._invalidate_matrices(str(chunk["metadata"].get("document_id")) for chunk in chunks)
+        if self.binary_index.loaded:
+            self.binary_index.add(chunks)
+        logger.info(f"upserted {len(chunks)} chunks to vector store")
+    
     def get_stats(self) -> Dict:
+        tombstoned = len(self._sync_tombstones())
         return {
             "total_chunks": self.collection.count(),
-            "collection_name": self.collection.name
+            "collection_name": self.collection.name,
+            "tombstoned_documents": tombstoned,
+            "last_compaction": self.last_compaction
         }
     
     def get_document_chunks(self, document_id: str) -> List[Dict]:
@@ -128,11 +426,460 @@ class ChromaVectorStore:
             })
         
         return chunks
+class ShardedVectorStore:
+    """ChromaVectorStore split into one collection per shard.
+    
+    Chunks are routed by ``shard_key``: a metadata field (e.g.
+    ``document_type`` or ``tenant``; missing values go to a ``default``
+    shard), or ``hash`` for ``shard_count`` shards by document ID. Queries
+    that pin the key go to one shard; the rest fan out to every shard on a
+    thread pool and the per-shard top-k are merged by distance.
+    """
+    
+    DEFAULT_SHARD = "default"
+    
+    def __init__(
+        self,
+        shard_key: str,
+        shard_count: int = 8,
+        collection_name: str = "research_documents",
+        persist_directory: str = "./data/chromadb",
+        search_workers: int = 8,
+        client=None
+    ):
+        os.makedirs(persist_directory, exist_ok=True)
+        self.shard_key = shard_key
+        self.shard_count = shard_count
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        if client is None:
+            import chromadb  # Heavy; only imported once a store is opened
+            client = chromadb.PersistentClient(path=persist_directory)
+        self.client = client
+        self.last_compaction: Optional[Dict] = None
+        self._shards: Dict[str, ChromaVectorStore] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="vector-shard")
+        
+        # Open existing shards so searches see them before anything is written
+        prefix = f"{collection_name}__"
+        for name in _collection_names(self.client):
+            if name.startswith(prefix) and not name.endswith(REBUILD_SUFFIXES):
+                self._shard(name[len(prefix):])
+        logger.info(f"sharded vector store by {shard_key}: {len(self._shards)} shards")
+    
+    def _shard_name(self, value) -> str:
+        if self.shard_key == "hash":
+            return f"h{zlib.crc32(str(value).encode('utf-8')) % self.shard_count:02d}"
+        if value is None or value == "":
+            return self.DEFAULT_SHARD
+        # Chroma collection names: [a-zA-Z0-9._-], at most 63 characters
+        return re.sub(r"[^a-zA-Z0-9._-]", "_", str(value))[:63 - len(self.collection_name) - 2]
+    
+    def _shard(self, name: str) -> ChromaVectorStore:
+        with self._lock:
+            shard = self._shards.get(name)
+            if shard is None:
+                shard = ChromaVectorStore(
+                    collection_name=f"{self.collection_name}__{name}",
+                    persist_directory=self.persist_directory,
+                    client=self.client
+                )
+                self._shards[name] = shard
+            return shard
+    
+    def _shard_for_metadata(self, metadata: Dict) -> ChromaVectorStore:
+        if self.shard_key == "hash":
+            return self._shard(self._shard_name(metadata.get("document_id")))
+        return self._shard(self._shard_name(metadata.get(self.shard_key)))
+    
+    def _shards_for_document(self, document_id: str) -> List[ChromaVectorStore]:
+        """The shard holding a document, or every shard when the key isn't derived from its ID."""
+        if self.shard_key == "hash":
+            return [self._shard(self._shard_name(document_id))]
+        with self._lock:
+            return list(self._shards.values())
+    
+    def _shards_for_filter(self, where: Optional[Dict]) -> List[ChromaVectorStore]:
+        if where:
+            if self.shard_key == "hash":
+                document_ids = _filtered_document_ids(where)
+                if document_ids is not None:
+                    names = {self._shard_name(document_id) for document_id in document_ids}
+                    with self._lock:
+                        return [self._shards[name] for name in names if name in self._shards]
+            elif self.shard_key in where and not isinstance(where[self.shard_key], dict):
+                with self._lock:
+                    shard = self._shards.get(self._shard_name(where[self.shard_key]))
+                return [shard] if shard else []
+        with self._lock:
+            return list(self._shards.values())
+    
+    def add_chunks(self, chunks: List[Dict], embeddings: List[List[float]]) -> None:
+        if len(chunks) != len(embeddings):
+            raise ValueError(
+                f"Chunks ({len(chunks)}) and embeddings ({len(embeddings)}) "
+                "must have same length"
+            )
+        groups: Dict[ChromaVectorStore, tuple] = {}
+        for chunk, embedding in zip(chunks, embeddings):
+            shard = self._shard_for_metadata({"document_id": chunk["document_id"], **chunk.get("metadata", {})})
+            group = groups.setdefault(shard, ([], []))
+            group[0].append(chunk)
+            group[1].append(embedding)
+        for shard, (shard_chunks, shard_embeddings) in groups.items():
+            shard.add_chunks(shard_chunks, shard_embeddings)
+    
+    def upsert_chunks(self, chunks: List[Dict]) -> None:
+        groups: Dict[ChromaVectorStore, List[Dict]] = {}
+        for chunk in chunks:
+            groups.setdefault(self._shard_for_metadata(chunk["metadata"]), []).append(chunk)
+        for shard, shard_chunks in groups.items():
+            shard.upsert_chunks(shard_chunks)
+    
+    def _fan_out(self, method: str, query_embedding: List[float], top_k: int, filter_metadata: Optional[Dict]) -> Dict:
+        shards = self._shards_for_filter(filter_metadata)
+        if len(shards) == 1:
+            return getattr(shards[0], method)(query_embedding, top_k, filter_metadata)
+        
+        futures = [
+            self._executor.submit(getattr(shard, method), query_embedding, top_k, filter_metadata)
+            for shard in shards
+        ]
+        hits = []
+        for future in futures:
+            results = future.result()
+            hits.extend(zip(results["distances"], results["ids"], results["documents"], results["metadatas"]))
+        hits = heapq.nsmallest(top_k, hits, key=lambda hit: hit[0])
+        return {
+            "documents": [hit[2] for hit in hits],
+            "metadatas": [hit[3] for hit in hits],
+            "distances": [hit[0] for hit in hits],
+            "ids": [hit[1] for hit in hits]
+        }
+    
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> Dict:
+        return self._fan_out("search", query_embedding, top_k, filter_metadata)
+    
+    def search_binary(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> Dict:
+        return self._fan_out("search_binary", query_embedding, top_k, filter_metadata)
+    
+    def build_binary_index(self) -> int:
+        with self._lock:
+            shards = list(self._shards.values())
+        return sum(shard.build_binary_index() for shard in shards)
+    
+    def delete_document(self, document_id: str) -> int:
+        deleted = sum(shard.delete_document(document_id) for shard in self._shards_for_document(document_id))
+        if not deleted:
+            logger.warning(f"No chunks found for document {document_id}")
+        return deleted
+    
+    def delete_chunks_from(self, document_id: str, chunk_index: int) -> None:
+        for shard in self._shards_for_document(document_id):
+            shard.delete_chunks_from(document_id, chunk_index)
+    
+    def tombstone_documents(self, document_ids: Iterable[str]) -> int:
+        document_ids = [str(document_id) for document_id in document_ids]
+        if self.shard_key == "hash":
+            groups: Dict[ChromaVectorStore, List[str]] = {}
+            for document_id in document_ids:
+                groups.setdefault(self._shard(self._shard_name(document_id)), []).append(document_id)
+        else:
+            with self._lock:
+                groups = {shard: document_ids for shard in self._shards.values()}
+        for shard, shard_document_ids in groups.items():
+            shard.tombstone_documents(shard_document_ids)
+        return self.get_stats()["tombstoned_documents"]
+    
+    def flush_tombstones(self) -> int:
+        with self._lock:
+            shards = list(self._shards.values())
+        return sum(shard.flush_tombstones() for shard in shards)
+    
+    def compact(self) -> Dict:
+        """Flush every shard's tombstones (reclaims no disk space; see ``ChromaVectorStore.compact``)."""
+        with self._lock:
+            shards = list(self._shards.values())
+        self.last_compaction = _compact(self.persist_directory, shards)
+        return self.last_compaction
+    
+    def iter_chunks(self, batch_size: int = 500, include_embeddings: bool = True) -> Iterator[List[Dict]]:
+        with self._lock:
+            shards = list(self._shards.values())
+        for shard in shards:
+            yield from shard.iter_chunks(batch_size, include_embeddings)
+    
+    def get_document_chunks(self, document_id: str) -> List[Dict]:
+        chunks = []
+        for shard in self._shards_for_document(document_id):
+            chunks.extend(shard.get_document_chunks(document_id))
+        return chunks
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            shards = dict(self._shards)
+        shard_stats = {name: shard.get_stats() for name, shard in sorted(shards.items())}
+        return {
+            "total_chunks": sum(stats["total_chunks"] for stats in shard_stats.values()),
+            "collection_name": self.collection_name,
+            "tombstoned_documents": sum(stats["tombstoned_documents"] for stats in shard_stats.values()),
+            "last_compaction": self.last_compaction,
+            "shard_key": self.shard_key,
+            "shards": {
+                name: {"total_chunks": stats["total_chunks"], "tombstoned_documents": stats["tombstoned_documents"]}
+                for name, stats in shard_stats.items()
+            }
+        }
+
+
+def reshard(source: ChromaVectorStore, target: ShardedVectorStore, batch_size: int = 500) -> int:
+    """Copy every chunk of ``source`` into the shards of ``target`` (embeddings included). Returns chunks copied."""
+    copied = 0
+    for batch in source.iter_chunks(batch_size=batch_size):
+        target.upsert_chunks(batch)
+        copied += len(batch)
+    return copied
+
+
+def _apply_tombstone_lines(tombstones: Set[str], text: str) -> None:
+    """Replay tombstone log lines onto a set: ``id`` adds, ``-id`` removes."""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("-"):
+            tombstones.discard(line[1:])
+        elif line:
+            tombstones.add(line)
+
+
+def _sqlite_size(persist_directory: str) -> int:
+    """Size of Chroma's SQLite file (chunk texts, metadata and embeddings); 0 before it exists."""
+    try:
+        return os.path.getsize(os.path.join(persist_directory, "chroma.sqlite3"))
+    except FileNotFoundError:
+        return 0
+
+
+def vacuum_sqlite(persist_directory: str = "./data/chromadb") -> Dict:
+    """
+    VACUUM Chroma's SQLite file to give pages freed by deletes back to disk.
+
+    Opens its own connection: run it with no Chroma client open on the
+    directory (API stopped), e.g. through ``python -m app.cli vacuum-vector-store``.
+
+    Returns:
+        File size before and after, and bytes reclaimed
+    """
+    bytes_before = _sqlite_size(persist_directory)
+    if bytes_before:
+        connection = sqlite3.connect(os.path.join(persist_directory, "chroma.sqlite3"), timeout=30)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+    bytes_after = _sqlite_size(persist_directory)
+    return {"bytes_before": bytes_before, "bytes_after": bytes_after, "bytes_reclaimed": max(bytes_before - bytes_after, 0)}
+
+
+def _free_sqlite_bytes(persist_directory: str) -> int:
+    """Bytes in free pages of Chroma's SQLite file: what ``vacuum_sqlite`` would give back."""
+    database_path = os.path.join(persist_directory, "chroma.sqlite3")
+    if not os.path.exists(database_path):
+        return 0
+    # Read-only: safe next to the open client, unlike a VACUUM
+    connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True, timeout=30)
+    try:
+        (free_pages,) = connection.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = connection.execute("PRAGMA page_size").fetchone()
+        return free_pages * page_size
+    except sqlite3.OperationalError as e:
+        logger.warning(f"could not read free pages of {database_path}: {e}")
+        return 0
+    finally:
+        connection.close()
+
+
+def _compact(persist_directory: str, stores: List[ChromaVectorStore]) -> Dict:
+    """Flush the stores' tombstones and refresh their binary indexes.
+
+    Reclaims no disk space: these stores' client holds the SQLite file open,
+    and a VACUUM from a second connection underneath it is not safe. Only
+    ``vacuum_sqlite`` (``python -m app.cli vacuum-vector-store``) does, so the
+    report gives the bytes it would reclaim instead.
+    """
+    started = time.time()
+    chunks_deleted = sum(store.flush_tombstones() for store in stores)
+    if settings.SEARCH_MODE == "binary":
+        # Fold chunks added since the last build into the packed codes
+        for store in stores:
+            store.build_binary_index()
+    result = {
+        "finished_at": time.time(),
+        "seconds": time.time() - started,
+        "chunks_deleted": chunks_deleted,
+        "reclaimable_bytes": _free_sqlite_bytes(persist_directory)
+    }
+    logger.info(f"vector store compacted: {result}")
+    return result
+
+
+def _filtered_document_ids(where: Optional[Dict]) -> Optional[List[str]]:
+    """Document IDs a filter is restricted to, if it only filters on document_id."""
+    if not where or list(where) != ["document_id"]:
+        return None
+    condition = where["document_id"]
+    if isinstance(condition, dict):
+        if list(condition) == ["$eq"]:
+            return [str(condition["$eq"])]
+        if list(condition) == ["$in"]:
+            return [str(document_id) for document_id in condition["$in"]]
+        return None
+    return [str(condition)]
+
+
+HNSW_PARAMS = ("M", "construction_ef", "search_ef")
+HNSW_DEFAULTS = {"M": 16, "construction_ef": 100, "search_ef": 10}  # Chroma's own
+REBUILD_SUFFIXES = ("__rebuild", "__previous")
+
+
+def _collection_names(client) -> List[str]:
+    # list_collections() returns names only since Chroma 0.6
+    return [getattr(collection, "name", collection) for collection in client.list_collections()]
+
+
+def hnsw_params(collection_name: str) -> Dict[str, int]:
+    """HNSW parameters for a collection: settings, then its HNSW_COLLECTION_OVERRIDES entry."""
+    params = {
+        "M": settings.HNSW_M,
+        "construction_ef": settings.HNSW_CONSTRUCTION_EF,
+        "search_ef": settings.HNSW_SEARCH_EF
+    }
+    params.update(settings.HNSW_COLLECTION_OVERRIDES.get(collection_name, {}))
+    return params
+
+
+def hnsw_metadata(collection_name: str, params: Optional[Dict[str, int]] = None) -> Dict:
+    """Collection metadata that configures its HNSW index (cosine space)."""
+    params = params or hnsw_params(collection_name)
+    return {"hnsw:space": "cosine", **{f"hnsw:{name}": params[name] for name in HNSW_PARAMS}}
+
+
+def collection_hnsw_params(collection) -> Dict[str, int]:
+    """HNSW parameters a collection was built with."""
+    metadata = collection.metadata or {}
+    return {name: metadata.get(f"hnsw:{name}", HNSW_DEFAULTS[name]) for name in HNSW_PARAMS}
+
+
+def _warn_on_hnsw_drift(collection) -> None:
+    built, wanted = collection_hnsw_params(collection), hnsw_params(collection.name)
+    if built != wanted:
+        logger.warning(
+            f"collection {collection.name} was built with HNSW {built}, settings ask for {wanted}; "
+            "run `python -m app.cli rebuild-index` to apply them"
+        )
+
+
+def rebuild_collection(
+    client,
+    collection_name: str,
+    params: Optional[Dict[str, int]] = None,
+    batch_size: int = 500,
+    keep_previous: bool = True
+) -> Dict:
+    """
+    Rebuild a collection's HNSW index with new parameters.
+
+    Chunks are copied with their embeddings (nothing is re-embedded) into
+    ``<name>__rebuild``, counts are checked, then the collections are swapped
+    by renaming; the old one stays as ``<name>__previous`` unless
+    ``keep_previous`` is False. Writes to the collection during the copy are
+    not carried over, so stop ingestion first and restart the API afterwards.
+
+    Args:
+        client: Chroma client
+        collection_name: Collection to rebuild
+        params: HNSW parameters (defaults to the settings for the collection)
+        batch_size: Chunks copied per batch
+        keep_previous: Keep the old collection as a backup
+
+    Returns:
+        Chunks copied and the parameters before and after
+    """
+    params = params or hnsw_params(collection_name)
+    source = client.get_collection(collection_name)
+    rebuild_name, previous_name = (f"{collection_name}{suffix}" for suffix in REBUILD_SUFFIXES)
+    names = _collection_names(client)
+    if previous_name in names:
+        raise ValueError(f"{previous_name} exists from an earlier rebuild; delete it first")
+    if rebuild_name in names:
+        client.delete_collection(rebuild_name)  # Left over from an interrupted rebuild
+    target = client.create_collection(rebuild_name, metadata=hnsw_metadata(collection_name, params))
+
+    copied, offset = 0, 0
+    while True:
+        batch = source.get(limit=batch_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        if not batch["ids"]:
+            break
+        target.upsert(
+            ids=batch["ids"],
+            documents=batch["documents"],
+            embeddings=batch["embeddings"],
+            metadatas=batch["metadatas"]
+        )
+        copied += len(batch["ids"])
+        offset += len(batch["ids"])
+        logger.info(f"rebuild {collection_name}: copied {copied} chunks")
+
+    if target.count() != source.count():
+        client.delete_collection(rebuild_name)
+        raise RuntimeError(
+            f"rebuild of {collection_name} aborted: {source.count()} chunks in source, {target.count()} copied "
+            "(was it written to during the rebuild?)"
+        )
+
+    before = collection_hnsw_params(source)
+    source.modify(name=previous_name)
+    target.modify(name=collection_name)
+    if not keep_previous:
+        client.delete_collection(previous_name)
+    return {"collection": collection_name, "chunks": copied, "before": before, "after": params}
+
+
 # Singleton instance
 _vector_store = None
+_vector_store_lock = threading.Lock()
 def get_vector_store() -> ChromaVectorStore:
-    """Get or create vector store instance (singleton pattern)."""
+    """Get or create vector store instance (singleton pattern), sharded if VECTOR_STORE_SHARD_KEY is set."""
     global _vector_store
     if _vector_store is None:
-        _vector_store = ChromaVectorStore()
+        with _vector_store_lock:
+            if _vector_store is None:
+                if settings.VECTOR_STORE_SHARD_KEY:
+                    _vector_store = ShardedVectorStore(
+                        settings.VECTOR_STORE_SHARD_KEY,
+                        shard_count=settings.VECTOR_STORE_SHARD_COUNT,
+                        search_workers=settings.VECTOR_STORE_SEARCH_WORKERS
+                    )
+                else:
+                    _vector_store = ChromaVectorStore()
     return _vector_store
+
+
+async def run_compaction(interval: float) -> None:
+    """Compact the shared vector store every ``interval`` seconds (a lifespan background task)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(get_vector_store().compact)
+        except Exception as e:
+            logger.error(f"vector store compaction failed: {e}")
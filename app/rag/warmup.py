@@ -0,0 +1,62 @@
+"""Startup warm-up of the RAG components, and the readiness state it reports."""
+import time
+from typing import Dict
+from app.core.config import settings
+import logging
+logger = logging.getLogger(__name__)
+
+_status = {
+    "ready": False,
+    "started_at": None,
+    "seconds": None,
+    "steps": {},
+    "error": None
+}
+
+
+def get_warm_up_status() -> Dict:
+    """Copy of the warm-up state: ready, per-step seconds, error."""
+    return {**_status, "steps": dict(_status["steps"])}
+
+
+def mark_ready() -> None:
+    """Report ready without warming up (WARM_UP_ON_STARTUP disabled)."""
+    _status["ready"] = True
+
+
+def _step(name: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    _status["steps"][name] = round(time.perf_counter() - start, 3)
+    logger.info(f"warm-up {name}: {_status['steps'][name]}s")
+    return result
+
+
+def warm_up() -> Dict:
+    """
+    Build every component and run each once, so the first request is not slow.
+
+    Loads the pipeline (embedding model, Chroma, retriever, Gemini client,
+    chunker and its llama_index import), encodes a passage and a query, and
+    runs a vector search. Blocking: call it from a worker thread.
+
+    Returns:
+        The warm-up state, ready unless a step raised
+    """
+    _status.update(ready=False, started_at=time.time(), seconds=None, error=None)
+    started = time.perf_counter()
+    try:
+        from app.rag.pipeline import get_pipeline
+
+        pipeline = _step("pipeline", get_pipeline)
+        _step("embed_passage", lambda: pipeline.embedder.embed_chunks([{"content": "warm-up"}]))
+        query_embedding = _step("embed_query", lambda: pipeline.embedder.embed_query("warm-up"))
+        _step("vector_search", lambda: pipeline.vector_store.search(query_embedding, top_k=1))
+        if settings.SEARCH_MODE == "binary":
+            _step("binary_search", lambda: pipeline.vector_store.search_binary(query_embedding, top_k=1))
+        _status["ready"] = True
+    except Exception as e:
+        logger.error(f"warm-up failed: {e}")
+        _status["error"] = str(e)
+    _status["seconds"] = round(time.perf_counter() - started, 3)
+    return get_warm_up_status()
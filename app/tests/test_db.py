@@ -0,0 +1,358 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def blob_store(tmp_path, monkeypatch):
+    from app.core import blob_store
+    store = blob_store.BlobStore(str(tmp_path / "blobs"), frame_chars=1024)
+    monkeypatch.setattr(blob_store, "_blob_store", store)
+    return store
+
+
+@pytest.fixture
+def sqlite_session(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db import crud
+    from app.db.models import Base
+
+    crud._invalidate_counts()
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _add(db, title, content):
+    from app.db import crud
+    return crud.create_document(db, {
+        "document_type": "text", "title": title, "content": content, "word_count": len(content.split())
+    })
+
+
+def test_search_documents_ranks_with_fts5(sqlite_session):
+    from app.db import crud
+
+    cooking = _add(sqlite_session, "Cooking", "Recipes for bread and soup.")
+    once = _add(sqlite_session, "Notes", "Transformers changed language modelling. Also some soup.")
+    title = _add(sqlite_session, "Transformer networks", "Attention is all you need for transformers.")
+
+    results = crud.search_documents(sqlite_session, "transformer")
+    assert [r["document"].id for r in results] == [title.id, once.id]
+    assert all(0 < r["relevance_score"] < 1 for r in results)
+    # Query syntax characters are matched literally, all terms must match
+    assert [r["document"].id for r in crud.search_documents(sqlite_session, 'soup "bread')] == [cooking.id]
+
+    crud.update_document(sqlite_session, once.id, {"content": "Nothing relevant here."})
+    crud.delete_document(sqlite_session, title.id)
+    assert crud.search_documents(sqlite_session, "transformer") == []
+
+
+def test_migrations_build_search_index(tmp_path, monkeypatch):
+    from pathlib import Path
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine, text
+    from app.core.config import settings
+
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config(str(Path(__file__).parents[2] / "alembic.ini"))
+    command.upgrade(config, "0003")
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO documents (id, document_type, status, title, content, word_count, created_at) "
+            "VALUES ('a', 'TEXT', 'COMPLETED', 't', 'migrated search works', 3, '2026-01-01')"
+        ))
+        assert len(conn.execute(text("SELECT rowid FROM documents_fts WHERE documents_fts MATCH 'search'")).all()) == 1
+
+    # Rows with inline bodies are re-indexed and get a preview
+    command.upgrade(config, "head")
+    with engine.begin() as conn:
+        hits = conn.execute(text("SELECT rowid FROM documents_fts WHERE documents_fts MATCH 'search'")).all()
+        preview = conn.execute(text("SELECT content_preview FROM documents")).scalar()
+    engine.dispose()
+    assert len(hits) == 1
+    assert preview == "migrated search works"
+
+
+def test_list_and_get_do_not_load_content(sqlite_session):
+    from app.db import crud
+
+    doc = _add(sqlite_session, "Big", "x" * 10000 + "tail")
+    sqlite_session.expunge_all()
+
+    rows = crud.list_documents(sqlite_session)
+    assert rows[0].title == "Big" and "content" not in rows[0]._fields
+    assert rows[0].content_preview == "x" * 200 + "..."
+
+    lazy = crud.get_document(sqlite_session, doc.id)
+    assert "content" not in lazy.__dict__
+    assert crud.read_content(lazy) == "x" * 10000 + "tail"
+
+    assert crud.get_content_length(sqlite_session, doc.id) == 10004
+    assert crud.get_content_slice(sqlite_session, doc.id, 10000, 100) == "tail"
+
+
+def test_bodies_live_in_blob_store(sqlite_session, blob_store):
+    from sqlalchemy import text
+    from app.core.blob_store import make_blob_ref
+    from app.db import crud
+
+    body = "".join(f"sentence {i} with ünïcode. " for i in range(500))
+    first = _add(sqlite_session, "One", body)
+    second = crud.create_document(sqlite_session, {
+        "document_type": "text", "title": "Two", "content": body, "word_count": 1, "content_hash": "other"
+    })
+
+    assert first.content_ref == second.content_ref == make_blob_ref(body)
+    assert sqlite_session.execute(text("SELECT content FROM documents")).scalars().all() == [None, None]
+    assert blob_store.read_range(first.content_ref, 1000, 3000) == body[1000:4000]
+    assert blob_store.read_range(first.content_ref, len(body) - 5, 100) == body[-5:]
+
+    # Bodies outlive their documents until a GC pass finds them unreferenced
+    crud.delete_document(sqlite_session, first.id)
+    assert crud.collect_blob_garbage(sqlite_session, grace_seconds=0) == 0
+    assert blob_store.exists(second.content_ref)
+    crud.delete_document(sqlite_session, second.id)
+    assert blob_store.exists(second.content_ref)
+    assert crud.collect_blob_garbage(sqlite_session, grace_seconds=3600) == 0
+    assert crud.collect_blob_garbage(sqlite_session, grace_seconds=0) == 1
+    assert not blob_store.exists(second.content_ref)
+
+
+def test_blob_gc_spares_bodies_put_again(sqlite_session, blob_store):
+    import os
+    import time
+    from app.db import crud
+
+    doc = _add(sqlite_session, "One", "shared body")
+    crud.delete_document(sqlite_session, doc.id)
+    path = blob_store._path(doc.content_ref)
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+    # A create of the same body found the blob and has not committed its row yet
+    assert blob_store.put("shared body") == doc.content_ref
+    assert crud.collect_blob_garbage(sqlite_session, grace_seconds=3600) == 0
+    assert blob_store.read(doc.content_ref) == "shared body"
+
+    # Renamed aside by a GC pass: put() writes it again
+    assert not blob_store.delete_if_idle(doc.content_ref, time.time() - 3600)
+    os.rename(path, f"{path}.gc")
+    blob_store.put("shared body")
+    assert blob_store.read(doc.content_ref) == "shared body"
+
+
+def test_search_fallback_matches_title_and_preview(sqlite_session, blob_store):
+    from app.db import crud
+
+    _add(sqlite_session, "Quantum notes", "entanglement basics")
+    _add(sqlite_session, "Other", "nothing relevant here")
+    statement = crud._search_statement("mysql", "quantum", 5)
+    titles = [doc.title for doc, _ in sqlite_session.execute(statement).all()]
+    assert titles == ["Quantum notes"]
+    statement = crud._search_statement("mysql", "entanglement", 5)
+    assert [doc.title for doc, _ in sqlite_session.execute(statement).all()] == ["Quantum notes"]
+
+
+def test_offload_inline_content(sqlite_session, blob_store):
+    from sqlalchemy import text
+    from app.db import crud
+
+    sqlite_session.execute(text(
+        "INSERT INTO documents (id, document_type, status, title, content, word_count, created_at) "
+        "VALUES ('0123456789abcdef0123456789abcdef', 'TEXT', 'COMPLETED', 'old', 'inline body', 2, '2026-01-01')"
+    ))
+    sqlite_session.commit()
+    doc = crud.get_document(sqlite_session, "0123456789abcdef0123456789abcdef")
+    assert crud.read_content(doc) == "inline body" and doc.content_ref is None
+
+    assert crud.offload_inline_content(sqlite_session) == 1
+    doc = crud.get_document(sqlite_session, "0123456789abcdef0123456789abcdef", with_content=True)
+    assert doc.content is None and blob_store.read(doc.content_ref) == "inline body"
+
+
+def test_keyset_pagination_and_counts(sqlite_session):
+    from datetime import datetime
+    from app.db import crud
+
+    same_time = datetime(2026, 1, 1)
+    for i in range(7):
+        doc = _add(sqlite_session, f"doc {i}", "text")
+        doc.created_at = same_time if i < 4 else datetime(2026, 1, 2 + i)
+        if i % 2:
+            doc.document_type = "url"
+    sqlite_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = crud.list_documents(sqlite_session, limit=3, cursor=cursor)
+        seen.extend(row.id for row in page)
+        if len(page) < 3:
+            break
+        cursor = crud.encode_cursor(page[-1].created_at, page[-1].id)
+
+    assert seen == [row.id for row in crud.list_documents(sqlite_session, limit=100)]
+    assert len(set(seen)) == 7
+    assert crud.count_documents(sqlite_session, document_type="url") == (3, False)
+
+    _add(sqlite_session, "new", "text")
+    assert crud.count_documents(sqlite_session) == (8, False)
+
+
+def test_async_crud_matches_sync(tmp_path):
+    import asyncio
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.db import async_crud, crud
+    from app.db.database import get_async_database_url
+    from app.db.models import Base
+
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    crud._invalidate_counts()
+
+    async def run():
+        engine = create_async_engine(get_async_database_url(url))
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            doc = await async_crud.create_document(db, {
+                "document_type": "text", "title": "Async", "content": "event loop friendly", "word_count": 3
+            })
+            assert (await async_crud.get_document(db, str(doc.id))).title == "Async"
+            assert await async_crud.get_document(db, "not-a-uuid") is None
+            assert [row.id for row in await async_crud.list_documents(db)] == [doc.id]
+            assert await async_crud.count_documents(db) == (1, False)
+            assert await async_crud.get_content_slice(db, doc.id, 6, 4) == "loop"
+            assert (await async_crud.search_documents(db, "loop"))[0]["document"].id == doc.id
+            assert await async_crud.delete_document(db, str(doc.id))
+            assert await async_crud.count_documents(db) == (0, False)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_create_documents_bulk_skips_duplicates(sqlite_session):
+    from app.db import crud
+
+    existing = crud.create_document(sqlite_session, {
+        "document_type": "text", "title": "Existing", "content": "already here",
+        "content_hash": "existing", "word_count": 2
+    })
+    batch = [
+        {"document_type": "text", "title": f"Note {i}", "content": f"bulk note {i}",
+         "content_hash": f"hash-{i}", "word_count": 3}
+        for i in range(3)
+    ]
+    batch.append(dict(batch[0]))  # Same content twice in one batch
+    batch.append({"document_type": "text", "title": "Dup", "content": "already here",
+                  "content_hash": existing.content_hash, "word_count": 2})
+    existing_hash = existing.content_hash
+
+    ids = crud.create_documents_bulk(sqlite_session, batch)
+    assert None not in ids[:3] and ids[3:] == [None, None]
+    assert crud.count_documents(sqlite_session) == (4, False)
+    assert crud.get_document_ids_by_hashes(sqlite_session, ["hash-0", existing_hash]) == {
+        "hash-0": ids[0], existing_hash: existing.id
+    }
+
+    hits = crud.search_documents(sqlite_session, "bulk note", max_results=10)
+    assert {r["document"].id for r in hits} == set(ids[:3])
+    assert crud.read_content(crud.get_document(sqlite_session, ids[2])) == "bulk note 2"
+
+
+class _ListVectorStore:
+    """In-memory stand-in exposing the two ChromaVectorStore methods transfer uses."""
+
+    def __init__(self, chunks=None):
+        self.chunks = list(chunks or [])
+
+    def iter_chunks(self, batch_size=500, include_embeddings=True):
+        for start in range(0, len(self.chunks), batch_size):
+            yield [dict(chunk) for chunk in self.chunks[start:start + batch_size]]
+
+    def upsert_chunks(self, chunks):
+        self.chunks.extend(chunks)
+
+
+def test_export_import_round_trip(sqlite_session, tmp_path):
+    import io
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db import crud, transfer
+    from app.db.models import Base
+
+    doc = crud.create_document(sqlite_session, {
+        "document_type": "text", "title": "Exported", "content": "body to move",
+        "content_hash": "exported", "word_count": 3, "extra_metadata": {"tag": "a"}
+    })
+    source = _ListVectorStore([{
+        "id": f"{doc.id}_chunk_0", "content": "body to move",
+        "metadata": {"document_id": str(doc.id), "chunk_index": 0}, "embedding": [0.5, -0.25]
+    }])
+    output = io.StringIO()
+    assert transfer.export_ndjson(sqlite_session, output, source, batch_size=1) == 3
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    Base.metadata.create_all(bind=engine)
+    target_db = sessionmaker(bind=engine)()
+    target = _ListVectorStore()
+    records = lambda: transfer.iter_ndjson_records(io.StringIO(output.getvalue()))
+    try:
+        counts = transfer.import_records(target_db, records(), target)
+        assert counts == {"documents_created": 1, "documents_skipped": 0, "chunks_imported": 1, "chunks_skipped": 0}
+        imported = crud.get_document(target_db, doc.id)
+        assert crud.read_content(imported) == "body to move"
+        assert imported.extra_metadata == {"tag": "a"} and imported.created_at == doc.created_at
+        assert target.chunks == source.chunks
+
+        # Importing again skips documents already present, and their chunks
+        counts = transfer.import_records(target_db, records(), target)
+        assert counts["documents_skipped"] == 1 and counts["chunks_skipped"] == 1
+    finally:
+        target_db.close()
+        engine.dispose()
+
+    with pytest.raises(ValueError):
+        transfer.import_records(sqlite_session, [{"type": "document"}], target)
+
+
+def test_import_same_export_twice(sqlite_session, tmp_path):
+    import io
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db import crud, transfer
+    from app.db.models import Base
+
+    # Documents from before content hashing have no content_hash
+    legacy = crud.create_document(sqlite_session, {
+        "document_type": "text", "title": "Legacy", "content": "old body", "word_count": 2
+    })
+    assert legacy.content_hash is None
+    source = _ListVectorStore([{
+        "id": f"{legacy.id}_chunk_0", "content": "old body",
+        "metadata": {"document_id": str(legacy.id), "chunk_index": 0}, "embedding": [1.0, 0.0]
+    }])
+    output = io.StringIO()
+    transfer.export_ndjson(sqlite_session, output, source)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    Base.metadata.create_all(bind=engine)
+    target_db = sessionmaker(bind=engine)()
+    target = _ListVectorStore()
+    try:
+        first = transfer.import_records(target_db, transfer.iter_ndjson_records(io.StringIO(output.getvalue())), target)
+        second = transfer.import_records(target_db, transfer.iter_ndjson_records(io.StringIO(output.getvalue())), target)
+        assert (first["documents_created"], first["chunks_imported"]) == (1, 1)
+        assert (second["documents_skipped"], second["chunks_skipped"]) == (1, 1)
+        assert crud.count_documents(target_db) == (1, False) and len(target.chunks) == 1
+    finally:
+        target_db.close()
+        engine.dispose()
+
+    # The same row twice in one batch, and again in a later one
+    row = {"id": legacy.id, "document_type": "text", "title": "Legacy", "content": "old body", "word_count": 2}
+    assert crud.create_documents_bulk(sqlite_session, [dict(row), dict(row)]) == [None, None]
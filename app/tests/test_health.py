@@ -0,0 +1,19 @@
+def test_readiness_waits_for_warm_up():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.v1.endpoints import health
+    from app.rag import warmup
+
+    app = FastAPI()
+    app.include_router(health.router)
+    client = TestClient(app)
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["ready"] is False
+
+    warmup.mark_ready()
+    try:
+        assert client.get("/health/ready").json()["ready"] is True
+    finally:
+        warmup._status["ready"] = False
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+from pathlib import Path
+
+# Loaded on first use only; importing any of these at startup costs seconds
+HEAVY_MODULES = ("torch", "sentence_transformers", "chromadb", "llama_index", "tiktoken", "google.generativeai")
+IMPORT_TIME_BUDGET = 3.0  # Seconds to import the whole API in a fresh interpreter
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(" ".join(sys.modules))
+"""
+
+
+def _slowest_imports(importtime_log: str, count: int = 10) -> str:
+    rows = []
+    for line in importtime_log.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return ", ".join(f"{name} {us / 1e6:.2f}s" for us, name in sorted(rows, reverse=True)[:count])
+
+
+def test_api_import_stays_light():
+    root = Path(__file__).resolve().parents[2]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=root, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    seconds, modules = result.stdout.strip().splitlines()[-2:]
+
+    loaded = [name for name in HEAVY_MODULES if name in modules.split()]
+    assert not loaded, f"imported at startup: {loaded}"
+    assert float(seconds) < IMPORT_TIME_BUDGET, (
+        f"importing main took {float(seconds):.2f}s; slowest: {_slowest_imports(result.stderr)}"
+    )
@@ -1,3 +1,216 @@
 def test_parse_pdf():
     from app.ingestion.pdf_parser import parse_pdf
     assert "Dummy PDF" in parse_pdf("file.pdf")
+
+
+def test_clean_text_matches_multi_pass_reference():
+    import random
+    from app.ingestion.cleaner import (
+        clean_text, clean_text_stream, StreamingCleaner,
+        remove_urls, remove_special_chars, remove_extra_whitespace
+    )
+
+    def reference(text):
+        return remove_extra_whitespace(remove_special_chars(remove_urls(text))).strip()
+
+    vocab = ["word", "http://a.b/c", "www.x.org", "http", "www.", "naïve", "—", "\t", " ", "\n",
+             " ", "\xa0", "\x1c", "(ok)", "it's", "x-y", "h", "t", "p", "w", "."]
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice(vocab) for _ in range(rng.randint(0, 80)))
+        pieces, i = [], 0
+        while i < len(text):
+            step = rng.randint(1, 6)
+            pieces.append(text[i:i + step])
+            i += step
+        cleaner = StreamingCleaner(max_carry=rng.choice([4, 8, 1024]))
+        streamed = "".join(cleaner.feed(p) for p in pieces) + cleaner.finish()
+
+        assert clean_text(text) == reference(text)
+        assert "".join(clean_text_stream(pieces)) == reference(text)
+        assert streamed == reference(text)
+
+
+class _FlakyPipeline:
+    """Indexes nothing; fails while ``failing`` is set, like an embedding or vector store outage."""
+
+    def __init__(self):
+        self.failing = True
+        self.indexed = []
+
+    def index_document(self, content, document_id, metadata=None):
+        if self.failing:
+            return {"success": False, "error": "vector store unavailable"}
+        self.indexed.append(document_id)
+        return {"success": True, "document_id": document_id, "total_chunks": 1}
+
+
+class _PageScraper:
+    """Serves one page; every fetch after the first revalidates as 304 Not Modified."""
+
+    def __init__(self):
+        self.fetched = set()
+
+    async def scrape(self, url):
+        not_modified = url in self.fetched
+        self.fetched.add(url)
+        return {"url": url, "title": "Page", "content": "Scraped page body", "not_modified": not_modified}
+
+
+def _documents_client(tmp_path, monkeypatch, pipeline):
+    """Documents router on a temporary SQLite database; returns (client, engine)."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.api.v1.endpoints import documents
+    from app.core import blob_store, cache
+    from app.core.config import settings
+    from app.db import crud
+    from app.db.database import get_async_database_url, get_async_db
+    from app.db.models import Base
+
+    url = f"sqlite:///{tmp_path / 'ingest.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    crud._invalidate_counts()
+    engine = create_async_engine(get_async_database_url(url))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_db():
+        async with sessions() as db:
+            yield db
+
+    monkeypatch.setattr(documents, "get_pipeline", lambda: pipeline)
+    monkeypatch.setattr(settings, "RAW_DATA_DIR", str(tmp_path / "raw"))
+    monkeypatch.setattr(blob_store, "_blob_store", blob_store.BlobStore(str(tmp_path / "blobs")))
+    monkeypatch.setattr(cache, "_processed_cache", cache.DiskCache(str(tmp_path / "processed"), 1024 * 1024))
+
+    app = FastAPI()
+    app.include_router(documents.router)
+    app.dependency_overrides[get_async_db] = override_db
+    return TestClient(app), engine
+
+
+def test_duplicate_uploads_reindex_failed_documents(tmp_path, monkeypatch):
+    import asyncio
+    from app.api.v1.endpoints import documents
+
+    pipeline = _FlakyPipeline()
+    scraper = _PageScraper()
+    monkeypatch.setattr(documents, "get_async_scraper", lambda: scraper)
+    monkeypatch.setattr(documents, "parse_pdf", lambda path: "Parsed PDF body")
+    client, engine = _documents_client(tmp_path, monkeypatch, pipeline)
+
+    uploads = {
+        "file": lambda: client.post("/documents/upload", files={"file": ("paper.pdf", b"%PDF-1.4 same bytes", "application/pdf")}),
+        "text": lambda: client.post("/documents/text", json={"title": "Note", "content": "Same note body"}),
+        "url": lambda: client.post("/documents/url", json={"url": "https://example.com/page"}),
+    }
+    try:
+        for kind, upload in uploads.items():
+            pipeline.failing = True
+            failed = upload().json()
+            assert failed["status"] == "failed" and not failed["duplicate"], kind
+
+            # Same content again: the stored but unindexed document is indexed, not reported as a duplicate
+            pipeline.failing = False
+            retried = upload().json()
+            assert retried["document_id"] == failed["document_id"], kind
+            assert retried["status"] == "completed" and not retried["duplicate"], kind
+
+            duplicate = upload().json()
+            assert duplicate["document_id"] == failed["document_id"] and duplicate["duplicate"], kind
+            assert duplicate["status"] == "completed", kind
+        assert len(pipeline.indexed) == 3
+    finally:
+        asyncio.run(engine.dispose())
+
+
+def test_batch_delete_hides_chunks_then_removes_them(tmp_path, monkeypatch):
+    import asyncio
+    import pytest
+    from app.core.config import settings
+    from app.core.exceptions import DocumentNotFoundError
+    from app.rag.pipeline import RAGPipeline
+    from app.rag.vector_store import ChromaVectorStore
+    from app.tests.test_rag import _FakeClient, _chunks
+
+    class StorePipeline(RAGPipeline):
+        """Stores one chunk per document in a vector store over a fake Chroma client."""
+
+        def __init__(self, vector_store):
+            self.vector_store = vector_store
+
+        def index_document(self, content, document_id, metadata=None):
+            self.vector_store.upsert_chunks(_chunks(document_id, [[len(content), 1.0]]))
+            return {"success": True, "document_id": document_id, "total_chunks": 1}
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_TOMBSTONE_FLUSH", 1000)
+    monkeypatch.setattr(settings, "EXACT_SEARCH_MAX_CHUNKS", 0)
+    store = ChromaVectorStore("docs", str(tmp_path / "chroma"), client=_FakeClient())
+    client, engine = _documents_client(tmp_path, monkeypatch, StorePipeline(store))
+    try:
+        ids = [client.post("/documents/text", json={"title": f"Note {i}", "content": "x" * (i + 1)}).json()["document_id"]
+               for i in range(3)]
+        missing = "00000000-0000-0000-0000-000000000000"
+
+        response = client.post("/documents/delete", json={"document_ids": ids[:2] + [missing, "not-a-uuid"]})
+        assert response.status_code == 200
+        assert response.json() == {"deleted": 2, "not_found": [missing, "not-a-uuid"], "pending_chunk_removal": 2}
+
+        # Rows are gone; chunks are hidden from search but not removed yet
+        with pytest.raises(DocumentNotFoundError):
+            client.get(f"/documents/{ids[0]}")
+        assert client.get(f"/documents/{ids[2]}").status_code == 200
+        assert store.collection.count() == 3
+        hits = store.search([1.0, 1.0], top_k=10)
+        assert [metadata["document_id"] for metadata in hits["metadatas"]] == [ids[2]]
+
+        assert store.compact()["chunks_deleted"] == 2
+        assert store.collection.count() == 1
+    finally:
+        asyncio.run(engine.dispose())
+
+
+def test_disk_cache_accounting_and_eviction(tmp_path):
+    import os
+    import time
+    from app.core.cache import DiskCache
+
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.set("aa1", "x" * 1000)
+    size = cache.get_stats()["total_bytes"]
+    assert size > 0
+
+    # Overwriting an entry replaces its size instead of adding to it
+    cache.set("aa1", "x" * 1000)
+    cache.set("aa1", "x" * 1000)
+    assert cache.get_stats()["total_bytes"] == size == cache._scan_size()
+
+    # Over budget: least recently used entries go first, down to 90% of it
+    random_text = lambda seed: "".join(chr(97 + (i * seed) % 26) for i in range(2000))
+    cache = DiskCache(str(tmp_path / "lru"), max_bytes=10 ** 6)
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.set(key, random_text(i + 7))
+        os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.get("aa1") is not None  # Now the most recently used
+    cache.max_bytes = cache.get_stats()["total_bytes"] - 1
+    cache.set("dd4", random_text(11))
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") is not None and cache.get("dd4") is not None
+    assert cache.get_stats()["total_bytes"] == cache._scan_size() <= cache.max_bytes
+
+
+def test_disk_cache_treats_corrupted_entry_as_miss(tmp_path):
+    import os
+    from app.core.cache import DiskCache
+
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.set("aa1", {"text": "cached"})
+    with open(cache._path("aa1"), "wb") as f:
+        f.write(b"not gzip")
+
+    assert cache.get("aa1") is None
+    assert not os.path.exists(cache._path("aa1"))
+    assert cache.get_or_set("aa1", lambda: {"text": "recomputed"}) == {"text": "recomputed"}
+    assert cache.get("aa1") == {"text": "recomputed"}
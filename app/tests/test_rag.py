@@ -2,3 +2,922 @@ def test_pipeline():
     from app.rag.pipeline import ingest_source
     store = ingest_source("hello world", "text")
     assert store is not None
+
+
+def test_matrix_cache_exact_search(tmp_path):
+    import numpy as np
+    from app.rag.matrix_cache import DocumentMatrixCache, exact_search
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 8)).astype(np.float32)
+    ids = [f"doc_chunk_{i}" for i in range(50)]
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ids, embeddings.tolist()
+
+    cache = DocumentMatrixCache(str(tmp_path), max_open=1)
+    matrix, matrix_ids = cache.get("doc", load)
+    assert matrix_ids == ids and matrix.dtype == np.float32 and len(loads) == 1
+
+    query = rng.normal(size=8)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    hits = exact_search([cache.get("doc", load)], query.tolist(), top_k=5)
+    assert [chunk_id for chunk_id, _ in hits] == [ids[i] for i in expected]
+    assert all(0 <= distance <= 2 for _, distance in hits)
+
+    # Evicted from the open maps, reopened from disk without reloading
+    cache.get("other", lambda: ([], []))
+    cache.get("other2", lambda: (["x"], [[1.0] * 8]))
+    assert cache.get("doc", load)[1] == ids and len(loads) == 1
+
+    cache.invalidate("doc")
+    cache.get("doc", load)
+    assert len(loads) == 2
+
+    # Another worker re-indexes the document: the open map is not reused
+    other_worker = DocumentMatrixCache(str(tmp_path), max_open=1)
+    other_worker.invalidate("doc")
+    other_worker.get("doc", lambda: (ids[:3], embeddings[:3].tolist()))
+    assert cache.get("doc", load)[1] == ids[:3] and len(loads) == 2
+
+    # Too large for exact search: remembered on disk until invalidated
+    assert cache.get("big", lambda: None) is None
+    assert other_worker.get("big", load) is None and len(loads) == 2
+    other_worker.invalidate("big")
+    assert cache.get("big", load)[1] == ids and len(loads) == 3
+
+
+def test_store_search_uses_exact_tier_for_small_documents(tmp_path, monkeypatch):
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "EXACT_SEARCH_MAX_CHUNKS", 5)
+    rng = np.random.default_rng(4)
+    client = _FakeClient()
+    store = ChromaVectorStore("docs", str(tmp_path), client=client)
+    ann_queries = []
+    query_ann = store.collection.query
+
+    def counting_query(*args, **kwargs):
+        ann_queries.append(kwargs.get("where"))
+        return query_ann(*args, **kwargs)
+
+    monkeypatch.setattr(store.collection, "query", counting_query)
+    small = rng.normal(size=(4, 8))
+    store.upsert_chunks(_chunks("small", small))
+    store.upsert_chunks(_chunks("large", rng.normal(size=(8, 8))))
+    query = rng.normal(size=8)
+
+    def cosine_order(vectors):
+        vectors = np.asarray(vectors)
+        scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        return [f"small_chunk_{i}" for i in np.argsort(-scores)]
+
+    # Filtered to a small document: brute force, same ranking as ANN would give
+    results = store.search(query.tolist(), top_k=3, filter_metadata={"document_id": "small"})
+    assert results["ids"] == cosine_order(small)[:3] and not ann_queries
+    assert all(metadata["document_id"] == "small" for metadata in results["metadatas"])
+
+    # Over EXACT_SEARCH_MAX_CHUNKS: ANN
+    results = store.search(query.tolist(), top_k=3, filter_metadata={"document_id": "large"})
+    assert len(results["ids"]) == 3 and ann_queries == [{"document_id": "large"}]
+    results = store.search(query.tolist(), top_k=3, filter_metadata={"document_id": {"$in": ["small", "large"]}})
+    assert len(ann_queries) == 2
+
+    # Shrunk under the limit: exact again
+    store.delete_chunks_from("large", 5)
+    store.search(query.tolist(), top_k=3, filter_metadata={"document_id": "large"})
+    assert len(ann_queries) == 2
+
+    # Re-indexed with new embeddings: the cached matrix is rebuilt, in this worker and in others
+    other_worker = ChromaVectorStore("docs", str(tmp_path), client=client)
+    assert other_worker.search(query.tolist(), top_k=4, filter_metadata={"document_id": "small"})["ids"] == cosine_order(small)
+    replaced = -small
+    store.upsert_chunks(_chunks("small", replaced))
+    for worker in (store, other_worker):
+        results = worker.search(query.tolist(), top_k=4, filter_metadata={"document_id": "small"})
+        assert results["ids"] == cosine_order(replaced)
+
+    # Trimmed tail chunks leave exact results
+    store.delete_chunks_from("small", 2)
+    for worker in (store, other_worker):
+        assert sorted(worker.search(query.tolist(), top_k=4, filter_metadata={"document_id": "small"})["ids"]) == [
+            "small_chunk_0", "small_chunk_1"
+        ]
+    assert len(ann_queries) == 2
+
+
+def test_binary_index_shortlist_and_rescore(tmp_path):
+    import numpy as np
+    from app.rag.binary_index import BinaryIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 64)).astype(np.float32)
+    chunks = [
+        {"id": f"c{i}", "metadata": {"document_id": f"d{i % 10}"}, "embedding": vector.tolist()}
+        for i, vector in enumerate(vectors)
+    ]
+    index = BinaryIndex(str(tmp_path / "binary"))
+    assert not index.load()
+    assert index.build([chunks[:128], chunks[128:]], total=300) == 300
+    assert index.codes.shape == (300, 8)  # 64 dims -> 8 bytes per vector
+
+    query = vectors[7] + rng.normal(scale=0.1, size=64)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = [f"c{i}" for i in np.argsort(-(normalized @ query))[:5]]
+    # A shortlist of every row rescored in full precision is exact
+    assert [chunk_id for chunk_id, _ in index.search(query, 5, candidates=300)] == expected
+    assert index.search(query, 5, candidates=50)[0][0] == "c7"
+
+    # Excluded documents never come back; chunks added since the build do
+    assert all(chunk_id != "c7" for chunk_id, _ in index.search(query, 5, 50, exclude_document_ids=["d7"]))
+    index.add([{"id": "new", "metadata": {"document_id": "d99"}, "embedding": query.tolist()}])
+    assert index.search(query, 1, candidates=50)[0][0] == "new"
+
+    reopened = BinaryIndex(str(tmp_path / "binary"))
+    assert reopened.load() and len(reopened) == 300
+
+
+class _FakeCollection:
+    """In-memory stand-in for a Chroma collection: the calls and filters the vector store makes."""
+
+    def __init__(self, name, metadata=None, client=None):
+        self.name, self.metadata, self.client = name, metadata, client
+        self.records = {}
+        self.upsert_sizes = []  # Number of records in each upsert call
+
+    def count(self):
+        return len(self.records)
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.upsert_sizes.append(len(ids))
+        for chunk_id, document, embedding, metadata in zip(ids, documents, embeddings, metadatas):
+            self.records[chunk_id] = (document, dict(metadata), list(embedding))
+
+    def add(self, ids, documents, embeddings, metadatas):
+        duplicates = [chunk_id for chunk_id in ids if chunk_id in self.records]
+        if duplicates:
+            raise ValueError(f"Expected IDs to be unique, found duplicates of: {', '.join(duplicates)}")
+        self.upsert(ids, documents, embeddings, metadatas)
+
+    @classmethod
+    def _matches(cls, metadata, where):
+        for key, condition in (where or {}).items():
+            if key == "$and":
+                if not all(cls._matches(metadata, part) for part in condition):
+                    return False
+                continue
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            (op, operand), = condition.items()
+            if not {"$eq": lambda: value == operand, "$in": lambda: value in operand,
+                    "$nin": lambda: value not in operand, "$gte": lambda: value >= operand}[op]():
+                return False
+        return True
+
+    def _select(self, ids=None, where=None):
+        chunk_ids = list(self.records) if ids is None else [i for i in ids if i in self.records]
+        return [i for i in chunk_ids if self._matches(self.records[i][1], where)]
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        selected = self._select(ids, where)[offset:None if limit is None else offset + limit]
+        return {
+            "ids": selected,
+            "documents": [self.records[i][0] for i in selected],
+            "metadatas": [self.records[i][1] for i in selected],
+            "embeddings": [self.records[i][2] for i in selected]
+        }
+
+    def delete(self, ids=None, where=None):
+        for chunk_id in self._select(ids, where):
+            del self.records[chunk_id]
+
+    def modify(self, name=None, metadata=None):
+        if name is not None:
+            if name in self.client.collections:
+                raise ValueError(f"Collection {name} already exists")
+            self.client.collections[name] = self.client.collections.pop(self.name)
+            self.name = name
+        if metadata is not None:
+            self.metadata = metadata
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        import numpy as np
+
+        query = np.asarray(query_embeddings[0], dtype=float)
+        scored = []
+        for chunk_id in self._select(where=where):
+            vector = np.asarray(self.records[chunk_id][2], dtype=float)
+            scored.append((1 - float(vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query))), chunk_id))
+        hits = sorted(scored)[:n_results]
+        return {
+            "ids": [[chunk_id for _, chunk_id in hits]],
+            "distances": [[distance for distance, _ in hits]],
+            "documents": [[self.records[chunk_id][0] for _, chunk_id in hits]],
+            "metadatas": [[self.records[chunk_id][1] for _, chunk_id in hits]]
+        }
+
+
+class _FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, _FakeCollection(name, metadata, self))
+
+    def create_collection(self, name, metadata=None):
+        if name in self.collections:
+            raise ValueError(f"Collection {name} already exists")
+        self.collections[name] = _FakeCollection(name, metadata, self)
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def get_max_batch_size(self):
+        return 1000
+
+
+def _chunks(document_id, vectors, **metadata):
+    return [
+        {"id": f"{document_id}_chunk_{i}", "content": f"{document_id} {i}",
+         "metadata": {"document_id": document_id, "chunk_index": i, **metadata}, "embedding": list(vector)}
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def test_binary_search_skips_deleted_chunks(tmp_path, monkeypatch):
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "BINARY_SEARCH_CANDIDATES", 4)
+
+    rng = np.random.default_rng(0)
+    store = ChromaVectorStore("docs", str(tmp_path), client=_FakeClient())
+    query = rng.normal(size=32)
+    # "near" holds the query's nearest neighbours, "far" the rest
+    store.upsert_chunks(_chunks("near", query + rng.normal(scale=0.1, size=(4, 32))))
+    store.upsert_chunks(_chunks("far", rng.normal(size=(20, 32))))
+    assert store.build_binary_index() == 24
+    assert {store.collection.get(ids=[i])["metadatas"][0]["document_id"]
+            for i in store.search_binary(query.tolist(), top_k=4)["ids"]} == {"near"}
+
+    # Shortlist as small as top_k: deleted chunks must not take its places
+    store.delete_document("near")
+    store.delete_chunks_from("far", 18)
+    results = store.search_binary(query.tolist(), top_k=4)
+    assert len(results["ids"]) == 4 and all(i.startswith("far_") for i in results["ids"])
+    assert not {"far_chunk_18", "far_chunk_19"} & {i for i, _ in store.binary_index.search(query, 20, candidates=4)}
+
+    # A deleted chunk written again is searchable again
+    store.upsert_chunks(_chunks("near", [query]))
+    assert store.search_binary(query.tolist(), top_k=1)["ids"] == ["near_chunk_0"]
+
+
+def test_binary_index_build_keeps_writes_it_may_have_missed(tmp_path):
+    import numpy as np
+    from app.rag.binary_index import BinaryIndex
+
+    rng = np.random.default_rng(1)
+
+    def chunk(chunk_id, vector):
+        return {"id": chunk_id, "metadata": {"document_id": chunk_id}, "embedding": vector.tolist()}
+
+    index = BinaryIndex(str(tmp_path / "binary"))
+    old = [chunk(f"c{i}", rng.normal(size=16)) for i in range(4)]
+    assert index.build([old], total=4) == 4
+    index.add([chunk("c0", rng.normal(size=16)), chunk("gone", rng.normal(size=16))])
+
+    def batches():
+        yield old
+        # Written while the build reads the store: the build may hold the old vector or none
+        index.add([chunk("c1", rng.normal(size=16)), chunk("late", rng.normal(size=16))])
+
+    assert index.build(batches(), total=4) == 4
+    # c0 was written before the build and is in it; "gone" was written before but not read
+    assert [entry[0] for entry in index._added] == ["gone", "c1", "late"]
+
+
+def test_binary_index_builds_are_shared_by_workers(tmp_path):
+    import os
+    import threading
+    import time
+    import numpy as np
+    from app.core.file_lock import file_lock
+    from app.rag.binary_index import BinaryIndex
+
+    rng = np.random.default_rng(2)
+    chunks = [
+        {"id": f"c{i}", "metadata": {"document_id": "d"}, "embedding": rng.normal(size=16).tolist()}
+        for i in range(6)
+    ]
+    directory = str(tmp_path / "binary")
+    first, second = BinaryIndex(directory), BinaryIndex(directory)
+    assert first.build([chunks[:4]], total=4) == 4
+    assert second.refresh() and len(second) == 4
+
+    # A rebuild is swapped in atomically and reaches the other worker on refresh
+    assert first.build([chunks], total=6) == 6
+    assert second.refresh() and len(second) == 6
+    assert len([name for name in os.listdir(directory) if name != BinaryIndex.CURRENT]) == 2
+
+    # A worker waiting behind a build that started after it asked reuses that build
+    consumed = []
+
+    def batches():
+        consumed.append(True)
+        yield chunks[:2]
+
+    with file_lock(f"{directory}.lock"):
+        waiting = threading.Thread(target=lambda: second.build(batches(), total=2))
+        waiting.start()
+        time.sleep(0.2)
+        version = f"{time.time_ns():020d}-0"
+        first._write_version(version, [chunks[:5]], total=5)
+        first._swap_in(version, first._current_version())
+    waiting.join(timeout=5)
+    assert not consumed and len(second) == 5
+
+
+def test_binary_search_drops_chunks_deleted_by_another_worker(tmp_path, monkeypatch):
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "BINARY_SEARCH_CANDIDATES", 4)
+
+    rng = np.random.default_rng(3)
+    client = _FakeClient()
+    store = ChromaVectorStore("docs", str(tmp_path), client=client)
+    other = ChromaVectorStore("docs", str(tmp_path), client=client)
+    query = rng.normal(size=32)
+    store.upsert_chunks(_chunks("near", query + rng.normal(scale=0.1, size=(4, 32))))
+    store.upsert_chunks(_chunks("far", rng.normal(size=(20, 32))))
+    assert store.build_binary_index() == 24
+
+    # The other worker's deletion is not in this worker's index, but never costs results
+    other.collection.delete(where={"document_id": "near"})
+    results = store.search_binary(query.tolist(), top_k=4)
+    assert len(results["ids"]) == 4 and all(i.startswith("far_") for i in results["ids"])
+    assert other.search_binary(query.tolist(), top_k=4)["ids"] == results["ids"]
+
+
+def _indexing_pipeline(store, embedder):
+    """A RAGPipeline over ``store`` and ``embedder`` that makes a chunk of each word."""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.rag.pipeline import RAGPipeline
+
+    class WordChunker:
+        def chunk_document(self, content, document_id, metadata):
+            words = content.split()
+            return [{"document_id": document_id, "chunk_index": i, "total_chunks": len(words),
+                     "content": word, "metadata": metadata} for i, word in enumerate(words)]
+
+    pipeline = object.__new__(RAGPipeline)
+    pipeline.vector_store, pipeline.embedder, pipeline.chunker = store, embedder, WordChunker()
+    pipeline._writer = ThreadPoolExecutor(max_workers=1)
+    return pipeline
+
+
+def test_upsert_chunks_writes_bounded_batches(tmp_path):
+    from app.rag.vector_store import ChromaVectorStore
+
+    store = ChromaVectorStore("docs", str(tmp_path), batch_size=4, client=_FakeClient())
+    chunks = _chunks("doc", [[float(i), 1.0] for i in range(10)])
+    store.upsert_chunks(chunks)
+    assert store.collection.upsert_sizes == [4, 4, 2]
+
+    # Writing the same IDs again replaces them
+    store.upsert_chunks(_chunks("doc", [[1.0, float(i)] for i in range(10)]))
+    assert store.collection.upsert_sizes == [4, 4, 2, 4, 4, 2]
+    assert store.collection.count() == 10
+    assert store.collection.get(ids=["doc_chunk_3"])["embeddings"] == [[1.0, 3.0]]
+
+
+def test_indexing_writes_a_batch_while_embedding_the_next(tmp_path, monkeypatch):
+    import threading
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_BATCH_SIZE", 2)
+    store = ChromaVectorStore("docs", str(tmp_path), client=_FakeClient())
+    second_batch_embedding = threading.Event()
+    overlapped = []
+    upsert = store.collection.upsert
+
+    def slow_upsert(**kwargs):
+        if not overlapped:
+            # The first write only finishes once the next batch is being embedded
+            overlapped.append(second_batch_embedding.wait(timeout=5))
+        upsert(**kwargs)
+
+    class Embedder:
+        calls = 0
+
+        def embed_chunks(self, batch):
+            Embedder.calls += 1
+            if Embedder.calls == 2:
+                second_batch_embedding.set()
+            return [[float(len(chunk["content"])), 1.0] for chunk in batch]
+
+    monkeypatch.setattr(store.collection, "upsert", slow_upsert)
+    pipeline = _indexing_pipeline(store, Embedder())
+    result = pipeline.index_document("one two three four five six", "doc")
+    assert result["success"] and result["total_chunks"] == 6 and result["embedding_dim"] == 2
+    assert overlapped == [True]
+    assert store.collection.upsert_sizes == [2, 2, 2]
+
+    # A shorter re-index overwrites the first chunks and trims the stale tail
+    assert pipeline.index_document("seven eight", "doc")["success"]
+    assert store.collection.get()["ids"] == ["doc_chunk_0", "doc_chunk_1"]
+    assert store.collection.get()["documents"] == ["seven", "eight"]
+
+
+def test_indexing_stops_at_a_failed_write(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_BATCH_SIZE", 2)
+    store = ChromaVectorStore("docs", str(tmp_path), client=_FakeClient())
+    embedded = []
+
+    class Embedder:
+        def embed_chunks(self, batch):
+            embedded.append([chunk["content"] for chunk in batch])
+            return [[1.0, 1.0] for _ in batch]
+
+    def failing_upsert(**kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(store.collection, "upsert", failing_upsert)
+    result = _indexing_pipeline(store, Embedder()).index_document("one two three four five six", "doc")
+    assert result == {"success": False, "error": "disk full"}
+    # The failure surfaced before the third batch was embedded
+    assert embedded == [["one", "two"], ["three", "four"]]
+
+
+def test_hnsw_params_apply_collection_overrides(monkeypatch):
+    from app.core.config import settings
+    from app.rag.vector_store import hnsw_metadata, hnsw_params
+
+    monkeypatch.setattr(settings, "HNSW_M", 32)
+    monkeypatch.setattr(settings, "HNSW_COLLECTION_OVERRIDES", {"docs__pdf": {"search_ef": 64}})
+    assert hnsw_params("docs") == {"M": 32, "construction_ef": settings.HNSW_CONSTRUCTION_EF,
+                                   "search_ef": settings.HNSW_SEARCH_EF}
+    assert hnsw_params("docs__pdf") == {"M": 32, "construction_ef": settings.HNSW_CONSTRUCTION_EF, "search_ef": 64}
+    assert hnsw_metadata("docs__pdf")["hnsw:search_ef"] == 64
+    assert hnsw_metadata("docs__pdf")["hnsw:space"] == "cosine"
+
+
+def test_rebuild_collection_copies_then_swaps(tmp_path):
+    import pytest
+    from app.rag.vector_store import ChromaVectorStore, collection_hnsw_params, rebuild_collection
+
+    client = _FakeClient()
+    store = ChromaVectorStore("docs", str(tmp_path), client=client)
+    store.upsert_chunks(_chunks("doc", [[float(i), 1.0] for i in range(7)]))
+    old = store.collection
+    before = collection_hnsw_params(old)
+    params = {"M": 48, "construction_ef": 200, "search_ef": 80}
+
+    result = rebuild_collection(client, "docs", params=params, batch_size=3)
+    assert result == {"collection": "docs", "chunks": 7, "before": before, "after": params}
+    rebuilt = client.get_collection("docs")
+    assert rebuilt is not old and collection_hnsw_params(rebuilt) == params
+    assert rebuilt.get()["ids"] == old.get()["ids"] and rebuilt.records == old.records
+    assert rebuilt.upsert_sizes == [3, 3, 1]
+    # The old collection is kept as the backup, and blocks another rebuild until deleted
+    assert client.get_collection("docs__previous") is old
+    assert sorted(client.list_collections()) == ["docs", "docs__previous"]
+    with pytest.raises(ValueError, match="docs__previous"):
+        rebuild_collection(client, "docs", params=params)
+
+    client.delete_collection("docs__previous")
+    rebuild_collection(client, "docs", params=params, keep_previous=False)
+    assert client.list_collections() == ["docs"]
+
+
+def test_rebuild_collection_aborts_when_counts_differ(tmp_path):
+    import pytest
+    from app.rag.vector_store import ChromaVectorStore, collection_hnsw_params, rebuild_collection
+
+    client = _FakeClient()
+    store = ChromaVectorStore("docs", str(tmp_path), client=client)
+    store.upsert_chunks(_chunks("doc", [[float(i), 1.0] for i in range(4)]))
+    source = store.collection
+    get = source.get
+
+    def get_then_write(**kwargs):
+        batch = get(**kwargs)
+        if not batch["ids"] and "late_chunk_0" not in source.records:
+            # Ingestion still running: a chunk lands after the copy read the last batch
+            store.upsert_chunks(_chunks("late", [[1.0, 1.0]]))
+        return batch
+
+    source.get = get_then_write
+    with pytest.raises(RuntimeError, match="aborted"):
+        rebuild_collection(client, "docs", params={"M": 48, "construction_ef": 200, "search_ef": 80}, batch_size=10)
+    # The partial copy is dropped and the source left in place
+    assert client.list_collections() == ["docs"]
+    assert client.get_collection("docs") is source and source.count() == 5
+    assert collection_hnsw_params(source) != {"M": 48, "construction_ef": 200, "search_ef": 80}
+
+
+def test_tombstones_flush_and_compaction(tmp_path, monkeypatch):
+    import os
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "VECTOR_STORE_TOMBSTONE_FLUSH", 3)
+    monkeypatch.setattr(settings, "SEARCH_MODE", "hnsw")
+    rng = np.random.default_rng(1)
+    client = _FakeClient()
+    store = ChromaVectorStore("docs", str(tmp_path), client=client)
+    for document_id in ["a", "b", "c", "d"]:
+        store.upsert_chunks(_chunks(document_id, rng.normal(size=(3, 8))))
+
+    # Tombstoned documents disappear from searches before their chunks are removed
+    assert store.tombstone_documents(["a", "b", "a"]) == 2
+    assert store.collection.count() == 12
+    hits = store.search(rng.normal(size=8).tolist(), top_k=12)
+    assert {metadata["document_id"] for metadata in hits["metadatas"]} == {"c", "d"}
+
+    # The log survives a restart
+    reopened = ChromaVectorStore("docs", str(tmp_path), client=client)
+    assert reopened.get_stats()["tombstoned_documents"] == 2
+
+    assert reopened.flush_tombstones() == 6
+    assert reopened.collection.count() == 6
+    assert reopened.get_stats()["tombstoned_documents"] == 0
+    with open(os.path.join(str(tmp_path), "docs.tombstones"), encoding="utf-8") as f:
+        assert f.read() == ""
+
+    # Reaching VECTOR_STORE_TOMBSTONE_FLUSH removes the chunks at once
+    reopened.tombstone_documents(["c"])
+    assert reopened.collection.count() == 6
+    reopened.tombstone_documents(["d", "e", "f"])
+    assert reopened.collection.count() == 0
+
+    # Compaction flushes what is left and leaves Chroma's SQLite file alone
+    reopened.upsert_chunks(_chunks("g", rng.normal(size=(2, 8))))
+    reopened.tombstone_documents(["g"])
+    result = reopened.compact()
+    assert result["chunks_deleted"] == 2
+    assert result["reclaimable_bytes"] == 0
+    assert not os.path.exists(os.path.join(str(tmp_path), "chroma.sqlite3"))
+    assert reopened.get_stats()["last_compaction"] == result
+
+
+def test_tombstone_log_is_shared_by_workers(tmp_path, monkeypatch):
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore
+
+    monkeypatch.setattr(settings, "EXACT_SEARCH_MAX_CHUNKS", 0)
+    rng = np.random.default_rng(3)
+    client = _FakeClient()
+    # Two API workers: separate stores (and tombstone sets) over the same directory
+    first = ChromaVectorStore("docs", str(tmp_path), client=client)
+    second = ChromaVectorStore("docs", str(tmp_path), client=client)
+    for document_id in ["a", "b", "c"]:
+        first.upsert_chunks(_chunks(document_id, rng.normal(size=(2, 8))))
+    query = rng.normal(size=8).tolist()
+
+    def found(store):
+        return {metadata["document_id"] for metadata in store.search(query, top_k=10)["metadatas"]}
+
+    first.tombstone_documents(["a"])
+    assert found(second) == {"b", "c"}
+
+    # A flush in one worker removes what it deleted, not what another tombstones meanwhile
+    second.tombstone_documents(["b"])
+    assert found(first) == {"c"}
+    delete = first.collection.delete
+
+    def delete_while_tombstoning(ids=None, where=None):
+        delete(ids=ids, where=where)
+        second.tombstone_documents(["c"])
+
+    monkeypatch.setattr(first.collection, "delete", delete_while_tombstoning)
+    assert first.flush_tombstones() == 4
+    assert found(first) == found(second) == set()
+    assert first.get_stats()["tombstoned_documents"] == second.get_stats()["tombstoned_documents"] == 1
+
+    monkeypatch.setattr(first.collection, "delete", delete)
+    assert second.flush_tombstones() == 2
+    assert first.get_stats()["tombstoned_documents"] == 0
+    assert first.collection.count() == 0
+
+
+def test_vacuum_sqlite_reclaims_freed_pages(tmp_path):
+    import sqlite3
+    from app.rag.vector_store import _free_sqlite_bytes, vacuum_sqlite
+
+    connection = sqlite3.connect(str(tmp_path / "chroma.sqlite3"))
+    connection.execute("CREATE TABLE embeddings (id INTEGER PRIMARY KEY, vector BLOB)")
+    connection.executemany("INSERT INTO embeddings (vector) VALUES (?)", [(b"x" * 3072,) for _ in range(500)])
+    connection.commit()
+    connection.execute("DELETE FROM embeddings")
+    connection.commit()
+    connection.close()
+
+    assert _free_sqlite_bytes(str(tmp_path)) > 0
+    result = vacuum_sqlite(str(tmp_path))
+    assert result["bytes_after"] < result["bytes_before"]
+    assert result["bytes_reclaimed"] == result["bytes_before"] - result["bytes_after"]
+    assert _free_sqlite_bytes(str(tmp_path)) == 0
+    assert vacuum_sqlite(str(tmp_path / "missing"))["bytes_before"] == 0
+
+
+def test_sharded_store_routes_and_merges(tmp_path, monkeypatch):
+    import zlib
+    import numpy as np
+    from app.core.config import settings
+    from app.rag.vector_store import ChromaVectorStore, ShardedVectorStore, reshard
+
+    monkeypatch.setattr(settings, "EXACT_SEARCH_MAX_CHUNKS", 0)
+    rng = np.random.default_rng(2)
+    client = _FakeClient()
+
+    # The unsharded collection a deployment starts with
+    source = ChromaVectorStore("docs", str(tmp_path), client=client)
+    tenants = {"d0": "acme", "d1": "acme", "d2": "globex", "d3": None}
+    for document_id, tenant in tenants.items():
+        metadata = {"tenant": tenant} if tenant else {}
+        source.upsert_chunks(_chunks(document_id, rng.normal(size=(5, 16)), **metadata))
+
+    # By metadata key: one shard per value, missing values in "default"
+    store = ShardedVectorStore("tenant", collection_name="docs", persist_directory=str(tmp_path), client=client)
+    assert reshard(source, store, batch_size=3) == 20
+    shards = store.get_stats()["shards"]
+    assert {name: stats["total_chunks"] for name, stats in shards.items()} == {"acme": 10, "globex": 5, "default": 5}
+    assert {"docs__acme", "docs__globex", "docs__default"} <= set(client.collections)
+
+    query = rng.normal(size=16)
+    pinned = store.search(query.tolist(), top_k=20, filter_metadata={"tenant": "globex"})
+    assert {metadata["document_id"] for metadata in pinned["metadatas"]} == {"d2"}
+
+    # Fanned out: the merged top-k is the global top-k, nearest first
+    expected = source.search(query.tolist(), top_k=7)
+    merged = store.search(query.tolist(), top_k=7)
+    assert merged["ids"] == expected["ids"]
+    assert merged["distances"] == sorted(merged["distances"])
+
+    # Reopened, existing shards are found before anything is written
+    reopened = ShardedVectorStore("tenant", collection_name="docs", persist_directory=str(tmp_path), client=client)
+    assert reopened.search(query.tolist(), top_k=7)["ids"] == expected["ids"]
+
+    # By hash of the document ID
+    hashed = ShardedVectorStore("hash", shard_count=3, collection_name="hashed",
+                                persist_directory=str(tmp_path), client=client)
+    reshard(source, hashed)
+    for document_id in tenants:
+        shard = hashed._shards[f"h{zlib.crc32(document_id.encode('utf-8')) % 3:02d}"]
+        assert len(shard.get_document_chunks(document_id)) == 5
+        assert hashed._shards_for_document(document_id) == [shard]
+    assert hashed.search(query.tolist(), top_k=7)["ids"] == expected["ids"]
+    assert {metadata["document_id"] for metadata in
+            hashed.search(query.tolist(), top_k=20, filter_metadata={"document_id": "d1"})["metadatas"]} == {"d1"}
+    assert hashed.delete_document("d1") == 5
+    assert hashed.get_stats()["total_chunks"] == 15
+
+
+def test_embedding_server_batches_clients(tmp_path):
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    from app.rag.embedding import E5Embedder
+    from app.rag.embedding_server import EmbeddingServer
+
+    batch_sizes = []
+
+    def encode(texts, priority):
+        batch_sizes.append(len(texts))
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+    socket_path = str(tmp_path / "embed.sock")
+    server = EmbeddingServer(encode, socket_path, max_batch=64, max_wait_ms=50)
+    ready = threading.Event()
+    running = {}
+
+    async def serve():
+        running["loop"], running["task"] = asyncio.get_running_loop(), asyncio.current_task()
+        await server.serve(ready)
+
+    def run():
+        try:
+            asyncio.run(serve())  # Cancels the connection handlers on the way out
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        assert ready.wait(5)
+        # A thin client: no model is loaded in this process
+        embedder = E5Embedder(socket_path=socket_path)
+        assert embedder.model is None
+        assert embedder.embed_query("abc")[0] == len("query: abc")
+        assert [e[0] for e in embedder.embed_chunks([{"content": "a"}, {"content": "bb"}])] == [10, 11]
+
+        batch_sizes.clear()
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda n: embedder.embed_batch(["x" * n] * 3), range(8)))
+        assert [[e[0] for e in result] for result in results] == [[len("passage: ") + n] * 3 for n in range(8)]
+        # Concurrent requests share model calls
+        assert sum(batch_sizes) == 24 and len(batch_sizes) < 8
+    finally:
+        running["loop"].call_soon_threadsafe(running["task"].cancel)
+        thread.join(5)
+
+
+def test_embedding_scheduler_runs_queries_between_ingest_slices():
+    import threading
+    import numpy as np
+    from app.rag.embedding_scheduler import EmbeddingScheduler
+
+    calls, threads = [], []
+    release = threading.Event()
+
+    def encode(texts):
+        calls.append(texts)
+        release.wait(5)
+        return np.array([[float(text[-1])] for text in texts])
+
+    scheduler = EmbeddingScheduler(encode, ingest_slice=2, ingest_threads=1, set_threads=threads.append, query_threads=4)
+    ingest_result = []
+    ingest = threading.Thread(target=lambda: ingest_result.append(scheduler.embed([f"p{i}" for i in range(6)], "ingest")))
+    ingest.start()
+    while not calls:  # First slice running
+        pass
+    query = threading.Thread(target=lambda: scheduler.embed(["q7"], "query"))
+    query.start()
+    while scheduler.get_stats()["queued"] < 1:
+        pass
+    release.set()
+    ingest.join(5)
+    query.join(5)
+
+    # The query ran after the first slice, not after the whole ingest
+    assert calls == [["p0", "p1"], ["q7"], ["p2", "p3"], ["p4", "p5"]]
+    assert ingest_result[0][:, 0].tolist() == [0, 1, 2, 3, 4, 5]
+    assert threads == [1, 4, 1]
+    stats = scheduler.get_stats()
+    assert stats["ingest"]["jobs"] == 3 and stats["ingest"]["texts"] == 6
+    assert stats["query"]["jobs"] == 1 and stats["query"]["queue_wait_ms"]["max"] > 0
+
+
+def test_llm_response_cache(tmp_path):
+    from app.core.cache import DiskCache, ResponseCache
+    from app.core.single_flight import SingleFlight
+    from app.rag.llm import GeminiLLM
+
+    class _Model:
+        model_name = "models/gemini-2.5-flash"
+        calls = 0
+
+        def generate_content(self, prompt, generation_config):
+            _Model.calls += 1
+            return type("Response", (), {"text": f"answer {_Model.calls}"})()
+
+    llm = GeminiLLM.__new__(GeminiLLM)
+    llm.flash_model = llm.pro_model = _Model()
+    llm.cache = ResponseCache(DiskCache(str(tmp_path / "llm"), 1024 * 1024), ttl=60)
+    llm.in_flight = SingleFlight()
+
+    assert llm.generate("route", tier="flash", temperature=0) == "answer 1"
+    assert llm.generate("route", tier="flash", temperature=0) == "answer 1"
+    # Parameters are part of the key
+    assert llm.generate("route", tier="flash", temperature=0, max_tokens=10) == "answer 2"
+    # Sampled responses are not cached unless opted in
+    assert llm.generate("route", tier="flash") == "answer 3"
+    assert llm.generate("route", tier="flash") == "answer 4"
+    assert llm.generate("route", tier="flash", cache=True) == "answer 5"
+    assert llm.generate("route", tier="flash", cache=True) == "answer 5"
+
+    # Expired entries are misses
+    key = ResponseCache.make_key("old", "models/gemini-2.5-flash", 0, None)
+    llm.cache.cache.set(key, {"created": 0, "text": "stale"})
+    assert llm.generate("old", tier="flash", temperature=0) == "answer 6"
+
+    stats = llm.cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["skipped"]) == (2, 4, 1, 2)
+
+
+
+def test_llm_coalesces_identical_calls_in_flight():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core.single_flight import SingleFlight
+    from app.rag.llm import GeminiLLM
+
+    release = threading.Event()
+    calls = []
+
+    class _Model:
+        model_name = "models/gemini-2.5-flash"
+
+        def generate_content(self, prompt, generation_config):
+            calls.append(prompt)
+            release.wait(5)
+            if prompt == "fail":
+                raise RuntimeError("quota exceeded")
+            return type("Response", (), {"text": f"answer to {prompt}"})()
+
+    llm = GeminiLLM.__new__(GeminiLLM)
+    llm.flash_model = llm.pro_model = _Model()
+    llm.cache = None
+    llm.in_flight = SingleFlight()
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(llm.generate, prompt, "flash") for prompt in ["q"] * 5 + ["fail"] * 3]
+        while llm.in_flight.get_stats()["coalesced"] < 6:
+            pass
+        release.set()
+        assert [f.result() for f in futures[:5]] == ["answer to q"] * 5
+        assert all(isinstance(f.exception(), RuntimeError) for f in futures[5:])
+
+    assert sorted(calls) == ["fail", "q"]
+    assert llm.in_flight.get_stats() == {"executed": 2, "coalesced": 6, "in_flight": 0}
+    # Finished calls are not remembered
+    assert llm.generate("q", "flash") == "answer to q" and len(calls) == 3
+
+
+def test_pipeline_coalesces_identical_queries_in_flight():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core.single_flight import SingleFlight
+    from app.rag.pipeline import RAGPipeline
+
+    release = threading.Event()
+    retrievals = []
+
+    class _Retriever:
+        def retrieve(self, query, top_k, filter_metadata, **kwargs):
+            retrievals.append((query, top_k, filter_metadata["document_id"]))
+            release.wait(5)
+            return []
+
+    pipeline = object.__new__(RAGPipeline)
+    pipeline.retriever = _Retriever()
+    pipeline.in_flight = SingleFlight()
+
+    # A filter skips document routing; top_k other than 5 keeps the parameters as given
+    calls = [(3, "d1")] * 4 + [(4, "d1")] * 2 + [(3, "d2")] * 2
+    with ThreadPoolExecutor(len(calls)) as pool:
+        futures = [
+            pool.submit(pipeline.query, "what is x", top_k=top_k, filter_metadata={"document_id": document_id})
+            for top_k, document_id in calls
+        ]
+        while pipeline.in_flight.get_stats()["coalesced"] < 5:
+            pass
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert sorted(retrievals) == [("what is x", 3, "d1"), ("what is x", 3, "d2"), ("what is x", 4, "d1")]
+    assert all(result == results[0] for result in results) and results[0]["sources"] == []
+    # Each caller gets its own copy of the shared answer
+    assert len({id(result) for result in results}) == len(calls)
+    assert pipeline.in_flight.get_stats() == {"executed": 3, "coalesced": 5, "in_flight": 0}
+
+
+def test_pipeline_singleton_is_built_once(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.rag import pipeline
+
+    built = []
+
+    class SlowPipeline:
+        def __init__(self):
+            time.sleep(0.05)
+            built.append(self)
+
+    monkeypatch.setattr(pipeline, "RAGPipeline", SlowPipeline)
+    monkeypatch.setattr(pipeline, "_pipeline", None)
+    barrier = threading.Barrier(8)
+
+    def build():
+        barrier.wait()
+        return pipeline.get_pipeline()
+
+    # Warm-up thread and first requests racing to build the pipeline
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: build(), range(8)))
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
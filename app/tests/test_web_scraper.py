@@ -0,0 +1,211 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+PAGE = b"<html><head><title>Local Page</title></head><body><p>Hello scraper</p><script>x=1</script></body></html>"
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def processed_cache(tmp_path, monkeypatch):
+    from app.core import cache
+    monkeypatch.setattr(cache, "_processed_cache", cache.DiskCache(str(tmp_path / "processed"), 1024 * 1024))
+
+
+@pytest.fixture
+def local_server():
+    _Handler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_async_scraper_revalidates_with_etag(local_server, tmp_path):
+    from app.core.cache import DiskCache
+    from app.ingestion.web_scraper import AsyncWebScraper
+
+    async def run():
+        async with AsyncWebScraper(cache=DiskCache(str(tmp_path / "http"), 1024 * 1024)) as scraper:
+            first = await scraper.scrape(f"{local_server}/page")
+            second = await scraper.scrape(f"{local_server}/page")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["title"] == "Local Page"
+    assert first["content"] == "Local Page Hello scraper"
+    assert not first["not_modified"]
+    assert second["not_modified"]
+    assert second["content"] == first["content"]
+    assert _Handler.requests_seen == [None, ETAG]
+
+
+def test_async_scraper_survives_a_new_event_loop(local_server):
+    from app.ingestion.web_scraper import AsyncWebScraper
+
+    scraper = AsyncWebScraper()
+
+    async def scrape():
+        result = await scraper.scrape(f"{local_server}/page")
+        return result, scraper._client, scraper._host_limits["127.0.0.1:" + local_server.rsplit(":", 1)[1]]
+
+    # Each asyncio.run is a new loop, as in a worker thread or a second test client
+    first, first_client, first_limit = asyncio.run(scrape())
+    second, second_client, second_limit = asyncio.run(scrape())
+    assert first["content"] == second["content"] == "Local Page Hello scraper"
+    assert first_client is not second_client
+    assert first_limit is not second_limit
+    asyncio.run(scraper.aclose())
+
+
+def test_async_scraper_scrape_many(local_server, tmp_path):
+    from app.core.cache import DiskCache
+    from app.ingestion.web_scraper import AsyncWebScraper
+
+    urls = [f"{local_server}/page/{i}" for i in range(5)]
+
+    async def run():
+        async with AsyncWebScraper(per_host_limit=2, cache=DiskCache(str(tmp_path / "http"), 1024 * 1024)) as scraper:
+            return await scraper.scrape_many(urls)
+
+    results = asyncio.run(run())
+    assert [r["url"] for r in results] == urls
+    assert all(r["content"] == "Local Page Hello scraper" for r in results)
+
+
+SITE = {
+    "/": b'<html><title>Home</title><body>Home <a href="/a">A</a> <a href="/b#top">B</a> <a href="/private">P</a> <a href="https://elsewhere.test/">X</a></body></html>',
+    "/a": b'<html><title>A</title><body>Page A <a href="/c">C</a></body></html>',
+    "/b": b'<html><title>B</title><body>Page B</body></html>',
+    "/c": b'<html><title>C</title><body>Page C</body></html>',
+    "/private": b'<html><title>P</title><body>Private</body></html>',
+    "/robots.txt": b"User-agent: *\nDisallow: /private\n",
+}
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = SITE.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain" if self.path.endswith(".txt") else "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SiteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_crawler_follows_links_within_depth(local_site, tmp_path):
+    from app.core.cache import DiskCache
+    from app.ingestion.crawler import SiteCrawler, load_crawl_progress
+    from app.ingestion.web_scraper import AsyncWebScraper
+
+    ingested = []
+
+    async def on_batch(pages):
+        ingested.extend(page["url"] for page in pages)
+        return {"created": len(pages), "duplicates": 0}
+
+    async def run():
+        async with AsyncWebScraper(cache=DiskCache(str(tmp_path / "http"), 1024 * 1024)) as scraper:
+            crawler = SiteCrawler(
+                scraper=scraper,
+                on_batch=on_batch,
+                checkpoint_path=str(tmp_path / "crawl.json"),
+                max_depth=1,
+                delay=0,
+                batch_size=2
+            )
+            return await crawler.crawl(urls=[f"{local_site}/"])
+
+    progress = asyncio.run(run())
+    # /c is two links deep, /private is blocked by robots.txt, elsewhere.test is off-domain
+    assert sorted(ingested) == sorted(f"{local_site}{path}" for path in ["/", "/a", "/b"])
+    assert progress["status"] == "completed"
+    assert progress["documents_created"] == 3
+    assert load_crawl_progress(str(tmp_path / "crawl.json"))["queued"] == 0
+
+
+def test_crawler_retries_failed_ingest_on_resume(local_site, tmp_path):
+    from app.core.cache import DiskCache
+    from app.ingestion.crawler import SiteCrawler, load_crawl_progress
+    from app.ingestion.web_scraper import AsyncWebScraper
+
+    ingested = []
+
+    async def failing_batch(pages):
+        raise RuntimeError("database is down")
+
+    async def partly_failing_batch(pages):
+        failed = {page["url"]: "no chunks" for page in pages if page["url"].endswith("/b")}
+        ingested.extend(page["url"] for page in pages if page["url"] not in failed)
+        return {"created": len(pages) - len(failed), "duplicates": 0, "failed": failed}
+
+    async def run(on_batch, urls):
+        async with AsyncWebScraper(cache=DiskCache(str(tmp_path / "http"), 1024 * 1024)) as scraper:
+            crawler = SiteCrawler(
+                scraper=scraper,
+                on_batch=on_batch,
+                checkpoint_path=str(tmp_path / "crawl.json"),
+                max_depth=1,
+                delay=0,
+                batch_size=2
+            )
+            return await crawler.crawl(urls=urls)
+
+    progress = asyncio.run(run(failing_batch, [f"{local_site}/"]))
+    assert progress["documents_created"] == 0 and progress["queued"] == 3
+
+    # Resuming ingests the pages whose batches failed; a page that failed to index stays queued
+    progress = asyncio.run(run(partly_failing_batch, []))
+    assert sorted(ingested) == sorted(f"{local_site}{path}" for path in ["/", "/a"])
+    assert progress["documents_created"] == 2
+    assert load_crawl_progress(str(tmp_path / "crawl.json"))["queued"] == 1
+
+
+def test_lxml_extractor_matches_bs4_and_strips_boilerplate():
+    from app.ingestion.html_extract import BS4Extractor, LxmlExtractor
+
+    html = (
+        "<html><head><title>Doc</title><style>p{}</style></head><body>"
+        "<nav><a href='/x'>Menu</a></nav><main><p>Main &amp; text</p></main>"
+        "<footer>Footer</footer><script>var x;</script></body></html>"
+    )
+    assert LxmlExtractor().extract(html) == BS4Extractor().extract(html)
+    assert LxmlExtractor(main_content=True).extract(html) == {"title": "Doc", "content": "Main & text"}
@@ -0,0 +1,106 @@
+"""Evaluate binary-quantized search against exact search and Chroma's HNSW.
+
+Usage:
+    python -m benchmarks.binary_search                   # chunks of the configured vector store
+    python -m benchmarks.binary_search --synthetic 100000 --dim 768
+    python -m benchmarks.binary_search --candidates 100 200 400 --no-hnsw
+
+Holds out ``--queries`` vectors as queries and computes their exact top-k
+with NumPy. Reports recall@k, p50/p99 latency and bytes held in memory per
+vector for the binary index at each shortlist size and, when chromadb is
+installed, for an HNSW collection built with the configured parameters.
+"""
+import argparse
+import importlib
+import os
+import tempfile
+import time
+import numpy as np
+from app.core.config import settings
+from app.rag.binary_index import BinaryIndex
+from benchmarks.hnsw_sweep import exact_top_k, load_corpus, synthetic_corpus
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return latencies[len(latencies) // 2] * 1000, latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+
+
+def report(name: str, recall: float, latencies, bytes_per_vector: float) -> None:
+    p50, p99 = percentiles(latencies)
+    print(f"{name:<22} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f} {bytes_per_vector:>10.0f}")
+
+
+def evaluate_binary(vectors, queries, truth, k: int, candidates: int, directory: str) -> None:
+    index = BinaryIndex(os.path.join(directory, "index"))
+    if not index.load():
+        batches = (
+            [{"id": str(i), "metadata": {"document_id": str(i)}, "embedding": vector}
+             for i, vector in enumerate(vectors[start:start + 1000], start)]
+            for start in range(0, len(vectors), 1000)
+        )
+        index.build(batches, len(vectors))
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = index.search(query, k, candidates)
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(chunk_id) for chunk_id, _ in result} & set(expected.tolist()))
+    report(f"binary ({candidates} cand.)", hits / truth.size, latencies, index.codes.shape[1])
+
+
+def evaluate_hnsw(chromadb, vectors, queries, truth, k: int) -> None:
+    from app.rag.vector_store import hnsw_metadata
+
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection("binary_search_benchmark", metadata=hnsw_metadata("binary_search_benchmark"))
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        collection.add(ids=[str(i) for i in range(start, start + len(batch))], embeddings=batch.tolist())
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(map(int, result["ids"][0])) & set(expected.tolist()))
+    # float32 vectors plus HNSW links (2 * M neighbours on layer 0, 4 bytes each)
+    report("chroma hnsw", hits / truth.size, latencies, vectors.shape[1] * 4 + 2 * settings.HNSW_M * 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, help="Use this many generated vectors instead of the corpus")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of generated vectors")
+    parser.add_argument("--limit", type=int, default=200000, help="Maximum corpus vectors to load")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    parser.add_argument("--no-hnsw", action="store_true", help="Skip the Chroma HNSW comparison")
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.synthetic, args.dim) if args.synthetic else load_corpus(args.limit)
+    if len(vectors) <= args.queries:
+        parser.error(f"need more than {args.queries} vectors, have {len(vectors)}")
+    order = np.random.default_rng(1).permutation(len(vectors))
+    queries, vectors = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    truth = exact_top_k(vectors, queries, args.k)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+    print(f"{'search':<22} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'RAM B/vec':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for candidates in args.candidates:
+            evaluate_binary(vectors, queries, truth, args.k, candidates, directory)
+
+    if not args.no_hnsw:
+        try:
+            chromadb = importlib.import_module("chromadb")
+        except ModuleNotFoundError:
+            print("chroma hnsw             (chromadb not installed)")
+        else:
+            evaluate_hnsw(chromadb, vectors, queries, truth, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Sweep HNSW parameters: recall@k against exact search vs query latency.
+
+Usage:
+    python -m benchmarks.hnsw_sweep                      # chunks of the configured vector store
+    python -m benchmarks.hnsw_sweep --synthetic 20000 --dim 768
+    python -m benchmarks.hnsw_sweep --m 16 32 --construction-ef 100 200 --search-ef 10 40 100
+
+Vectors are loaded from the vector store (with their embeddings) or
+generated. ``--queries`` of them are held out as queries and their exact
+top-k, computed with NumPy, is the ground truth. Every parameter combination
+is built in a throwaway in-memory Chroma collection, and each query is timed
+one at a time like the API issues them.
+"""
+import argparse
+import itertools
+import time
+import numpy as np
+
+
+def load_corpus(limit: int) -> np.ndarray:
+    from app.rag.vector_store import get_vector_store
+
+    vectors = []
+    for batch in get_vector_store().iter_chunks(batch_size=1000):
+        vectors.extend(chunk["embedding"] for chunk in batch)
+        if len(vectors) >= limit:
+            break
+    return np.asarray(vectors[:limit], dtype=np.float32)
+
+
+def synthetic_corpus(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Clustered, like embeddings of documents on a handful of topics
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 200, 1), dim))
+    labels = rng.integers(0, len(centers), size=count)
+    return (centers[labels] + rng.normal(scale=0.6, size=(count, dim))).astype(np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run(client, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, params: dict) -> dict:
+    name = "hnsw_sweep_" + "_".join(str(value) for value in params.values())
+    collection = client.create_collection(
+        name,
+        metadata={"hnsw:space": "cosine", **{f"hnsw:{key}": value for key, value in params.items()}}
+    )
+    try:
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), 1000):
+            batch = vectors[offset:offset + 1000]
+            collection.add(ids=[str(i) for i in range(offset, offset + len(batch))], embeddings=batch.tolist())
+        build_seconds = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - start)
+            hits += len(set(map(int, result["ids"][0])) & set(expected.tolist()))
+    finally:
+        client.delete_collection(name)
+
+    latencies.sort()
+    return {
+        "build": build_seconds,
+        "recall": hits / truth.size,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, help="Use this many generated vectors instead of the corpus")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of generated vectors")
+    parser.add_argument("--limit", type=int, default=50000, help="Maximum corpus vectors to load")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 40, 100])
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.synthetic, args.dim) if args.synthetic else load_corpus(args.limit)
+    if len(vectors) <= args.queries:
+        parser.error(f"need more than {args.queries} vectors, have {len(vectors)}")
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries, vectors = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    truth = exact_top_k(vectors, queries, args.k)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+    print(f"{'M':>4} {'constr_ef':>9} {'search_ef':>9} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    import chromadb
+    client = chromadb.EphemeralClient()
+    for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef):
+        params = {"M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+        result = run(client, vectors, queries, truth, args.k, params)
+        print(
+            f"{m:>4} {construction_ef:>9} {search_ef:>9} {result['build']:>8.1f} "
+            f"{result['recall']:>9.3f} {result['p50']:>8.2f} {result['p99']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark HTML extraction backends over a corpus of saved pages.
+
+Usage:
+    python -m benchmarks.html_extraction --corpus data/html_corpus
+    python -m benchmarks.html_extraction --save https://example.com/a https://example.com/b --corpus data/html_corpus
+
+Every ``*.html`` file under the corpus directory is extracted with each
+backend. Throughput is reported in pages/s and MB/s, and parity is the
+word-level similarity of each backend's text against the bs4 baseline.
+"""
+import argparse
+import difflib
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from app.ingestion.html_extract import BS4Extractor, LxmlExtractor
+
+
+def load_corpus(corpus_dir: str) -> list[tuple[str, str]]:
+    pages = []
+    for path in sorted(Path(corpus_dir).rglob("*.html")):
+        pages.append((path.name, path.read_text(encoding="utf-8", errors="replace")))
+    return pages
+
+
+def save_pages(urls: list[str], corpus_dir: str) -> None:
+    import requests
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    for i, url in enumerate(urls):
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        path = os.path.join(corpus_dir, f"page_{i:05d}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"saved {url} -> {path}")
+
+
+def time_backend(extractor, pages, repeat: int) -> tuple[float, list[dict]]:
+    outputs = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [extractor.extract(html) for _, html in pages]
+    return (time.perf_counter() - start) / repeat, outputs
+
+
+def parity(baseline: list[dict], candidate: list[dict]) -> list[float]:
+    scores = []
+    for base, other in zip(baseline, candidate):
+        matcher = difflib.SequenceMatcher(None, base["content"].split(), other["content"].split(), autojunk=False)
+        scores.append(matcher.ratio())
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="Directory of saved *.html pages")
+    parser.add_argument("--save", nargs="*", default=[], help="Download these URLs into the corpus first")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.corpus)
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit(f"No *.html files found in {args.corpus}")
+    total_mb = sum(len(html.encode("utf-8")) for _, html in pages) / 1e6
+
+    backends = [("bs4", BS4Extractor())]
+    try:
+        backends.append(("lxml", LxmlExtractor()))
+        backends.append(("lxml-main", LxmlExtractor(main_content=True)))
+    except RuntimeError as e:
+        print(f"skipping lxml backends: {e}")
+
+    print(f"{len(pages)} pages, {total_mb:.1f} MB, {args.repeat} passes\n")
+    print(f"{'backend':<10} {'pages/s':>10} {'MB/s':>8} {'speedup':>8} {'parity mean':>12} {'parity min':>11}")
+
+    baseline_seconds, baseline_outputs = None, None
+    for name, extractor in backends:
+        seconds, outputs = time_backend(extractor, pages, args.repeat)
+        if baseline_outputs is None:
+            baseline_seconds, baseline_outputs = seconds, outputs
+        scores = parity(baseline_outputs, outputs)
+        print(
+            f"{name:<10} {len(pages) / seconds:>10.1f} {total_mb / seconds:>8.2f} "
+            f"{baseline_seconds / seconds:>7.2f}x {statistics.mean(scores):>12.3f} {min(scores):>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
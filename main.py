@@ -12,7 +12,11 @@ from app.core.exceptions import (
     DocumentProcessingError
 )
 from app.api.v1.schemas import ErrorResponse
-from app.db.database import init_db
+from app.db.database import init_db, close_db
+from app.ingestion.web_scraper import close_async_scraper
+from app.rag.vector_store import run_compaction
+from app.rag.warmup import mark_ready, warm_up
+import asyncio
 import os
 from app.api.v1.endpoints import health, documents, query
 
@@ -30,9 +34,26 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.CACHE_DIR, exist_ok=True)
     print(f"✅ {settings.APP_NAME} v{settings.APP_VERSION} started successfully!")
     print(f"📚 API Documentation: http://{settings.API_HOST}:{settings.API_PORT}/docs")
+    # Warm up in the background: /health answers at once, /health/ready once warm
+    warming = None
+    if settings.WARM_UP_ON_STARTUP:
+        print("🔥 Warming up models and indexes...")
+        warming = asyncio.create_task(asyncio.to_thread(warm_up))
+    else:
+        mark_ready()
+    compaction = None
+    if settings.VECTOR_STORE_COMPACTION_INTERVAL > 0:
+        compaction = asyncio.create_task(run_compaction(settings.VECTOR_STORE_COMPACTION_INTERVAL))
     yield
     # Shutdown (if needed)
     print("Shutting down...")
+    if compaction is not None:
+        compaction.cancel()
+    if warming is not None:
+        # The worker thread can't be interrupted: let a warm-up still loading finish
+        await warming
+    await close_async_scraper()
+    await close_db()
 
 
 